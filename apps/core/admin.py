@@ -0,0 +1,14 @@
+from django.contrib import admin
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    """Настройка отображения фоновых задач. Задачу в состоянии failed можно вернуть в очередь."""
+
+    list_display = ('id', 'name', 'status', 'attempts', 'run_after', 'locked_by', 'created_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('locked_by', 'locked_at', 'last_error', 'created_at')
+    ordering = ('-id',)
+
+
+admin.site.register(Job, JobAdmin)
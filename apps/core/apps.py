@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.core'
+
+    def ready(self):
+        """Подключает учет запросов к БД для показателей HTTP-запросов."""
+        from apps.core import instrumentation  # noqa: F401
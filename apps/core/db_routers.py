@@ -0,0 +1,64 @@
+import contextvars
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+@dataclass
+class DatabaseRoutingState:
+    """Состояние маршрутизации запросов к БД в рамках обработки HTTP-запроса."""
+
+    # Чтение выполняется из основной БД: была запись в текущем запросе или недавно в этой сессии.
+    use_primary: bool = False
+    # В текущем запросе была запись.
+    has_writes: bool = False
+
+
+database_routing_state: contextvars.ContextVar[DatabaseRoutingState | None] = contextvars.ContextVar(
+    'database_routing_state', default=None
+)
+
+
+class PrimaryReplicaRouter:
+    """
+    Направляет чтение моделей указанных приложений в реплику, запись - в основную БД.
+
+    Из реплики читаются только запросы при обработке HTTP-запроса (см. database_routing_middleware).
+    Команды управления и обработчики фоновых задач читают из основной БД, т.к. обычно читают
+    результаты своих записей. При обработке HTTP-запроса чтение выполняется из основной БД внутри
+    транзакции основной БД, после записи в текущем запросе и в течение короткого времени после записи
+    в той же сессии, чтобы пользователь видел результат своих изменений независимо от задержки
+    репликации. Если реплика не настроена, маршрутизация не меняется.
+    """
+
+    @staticmethod
+    def _replica_alias() -> str | None:
+        """Возвращает псевдоним реплики, если она настроена."""
+        alias = getattr(settings, 'DATABASE_REPLICA_ALIAS', 'replica')
+        return alias if alias in settings.DATABASES else None
+
+    def db_for_read(self, model, **hints) -> str | None:
+        """Возвращает псевдоним БД для чтения."""
+        replica_alias = self._replica_alias()
+        if replica_alias is None or model._meta.app_label not in settings.DATABASE_REPLICA_APP_LABELS:
+            return None
+
+        state = database_routing_state.get()
+        if state is None or state.use_primary or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        return replica_alias
+
+    def db_for_write(self, model, **hints) -> str:
+        """Возвращает псевдоним БД для записи и переключает чтение текущего запроса на основную БД."""
+        if state := database_routing_state.get():
+            state.use_primary = True
+            state.has_writes = True
+
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool | None:
+        """Разрешает связи между объектами основной БД и реплики."""
+        aliases = {DEFAULT_DB_ALIAS, self._replica_alias()}
+        return True if obj1._state.db in aliases and obj2._state.db in aliases else None
@@ -0,0 +1,109 @@
+import datetime
+from collections.abc import Awaitable, Callable
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth import decorators as auth_decorators
+from django.contrib.auth import REDIRECT_FIELD_NAME
+from django.contrib.auth.views import redirect_to_login
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def login_required(view_func: Callable) -> Callable:
+    """
+    Проверяет, что пользователь авторизован, иначе перенаправляет на страницу входа.
+
+    В отличие от django.contrib.auth.decorators.login_required поддерживает асинхронные представления:
+    пользователь загружается через request.auser() и сохраняется в request.user, чтобы шаблоны
+    не обращались к БД синхронно.
+    """
+    if not iscoroutinefunction(view_func):
+        return auth_decorators.login_required(view_func)
+
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path(), redirect_field_name=REDIRECT_FIELD_NAME)
+
+        request.user = user
+
+        return await view_func(request, *args, **kwargs)
+
+    return wrapper
+
+
+def api_login_required(view_func: Callable) -> Callable:
+    """
+    Проверяет, что пользователь авторизован, иначе возвращает JSON-ответ с кодом 401.
+
+    Поддерживает синхронные и асинхронные представления, как и login_required.
+    """
+
+    def unauthorized_response() -> JsonResponse:
+        return JsonResponse({'errors': {'__all__': ['Требуется авторизация']}}, status=401)
+
+    if iscoroutinefunction(view_func):
+
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            user = await request.auser()
+            if not user.is_authenticated:
+                return unauthorized_response()
+
+            request.user = user
+
+            return await view_func(request, *args, **kwargs)
+
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return unauthorized_response()
+
+        return view_func(request, *args, **kwargs)
+
+    return wrapper
+
+
+def acondition(
+    etag_func: Callable[..., Awaitable[str | None]] | None = None,
+    last_modified_func: Callable[..., Awaitable[datetime.datetime | None]] | None = None,
+) -> Callable:
+    """
+    Аналог django.views.decorators.http.condition для асинхронных представлений.
+
+    Функции вычисления ETag и даты изменения также асинхронные, поэтому могут обращаться к БД.
+    """
+
+    def decorator(view_func: Callable) -> Callable:
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            res_last_modified = None
+            if last_modified_func and (dt := await last_modified_func(request, *args, **kwargs)):
+                if not timezone.is_aware(dt):
+                    dt = timezone.make_aware(dt, datetime.timezone.utc)
+                res_last_modified = int(dt.timestamp())
+
+            res_etag = await etag_func(request, *args, **kwargs) if etag_func else None
+            res_etag = quote_etag(res_etag) if res_etag is not None else None
+
+            response = get_conditional_response(request, etag=res_etag, last_modified=res_last_modified)
+            if response is None:
+                response = await view_func(request, *args, **kwargs)
+
+            if request.method in ('GET', 'HEAD'):
+                if res_last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(res_last_modified)
+                if res_etag:
+                    response.headers.setdefault('ETag', res_etag)
+
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,84 @@
+import contextvars
+import time
+from dataclasses import dataclass, field
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates, Template
+
+
+@dataclass
+class RequestMetrics:
+    """Показатели обработки HTTP-запроса."""
+
+    started_at: float = field(default_factory=time.perf_counter)
+    queries_count: int = 0
+    # Длительность запросов к БД и отрисовки шаблонов, секунд.
+    db_time: float = 0.0
+    template_time: float = 0.0
+
+    @property
+    def total_time(self) -> float:
+        """Длительность обработки запроса с момента создания показателей, секунд."""
+        return time.perf_counter() - self.started_at
+
+
+request_metrics: contextvars.ContextVar[RequestMetrics | None] = contextvars.ContextVar('request_metrics', default=None)
+
+
+def _db_execute_wrapper(execute, sql, params, many, context):
+    """Учитывает запрос к БД в показателях текущего HTTP-запроса."""
+    metrics = request_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+
+    started_at = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries_count += 1
+        metrics.db_time += time.perf_counter() - started_at
+
+
+@receiver(connection_created)
+def db_execute_wrapper_install(sender, connection, **kwargs) -> None:
+    """
+    Подключает учет запросов к соединению с БД.
+
+    Соединения принадлежат потокам, а асинхронные представления обращаются к БД из других потоков,
+    поэтому учет подключается к каждому соединению, а показатели берутся из контекста запроса.
+    """
+    if _db_execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_db_execute_wrapper)
+
+
+class InstrumentedTemplate(Template):
+    """Шаблон, учитывающий длительность отрисовки в показателях текущего HTTP-запроса."""
+
+    def render(self, context=None, request=None) -> str:
+        """Отрисовывает шаблон."""
+        metrics = request_metrics.get()
+        if metrics is None:
+            return super().render(context, request)
+
+        started_at = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - started_at
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Шаблонизатор Django с учетом длительности отрисовки шаблонов."""
+
+    def from_string(self, template_code) -> InstrumentedTemplate:
+        """Создает шаблон из строки."""
+        return InstrumentedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name) -> InstrumentedTemplate:
+        """Загружает шаблон."""
+        return InstrumentedTemplate(super().get_template(template_name).template, self)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Количество запросов к БД при обработке HTTP-запроса превысило бюджет представления."""
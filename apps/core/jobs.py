@@ -0,0 +1,234 @@
+import datetime
+import logging
+import os
+import socket
+import traceback
+from collections.abc import Callable, Iterable
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from apps.core.metrics import Counter, Histogram
+from apps.core.models import Job, JobStatuses
+
+logger = logging.getLogger('apps.core.jobs')
+
+JOBS_PROCESSED = Counter(
+    'core_jobs_processed_total',
+    'Количество выполнений фоновых задач по имени и результату (success, retry, failed, lock_lost).',
+    labelnames=('name', 'result'),
+)
+JOB_SECONDS = Histogram(
+    'core_job_duration_seconds',
+    'Длительность выполнения фоновой задачи по имени, секунд.',
+    labelnames=('name',),
+)
+
+_job_handlers: dict[str, Callable[..., None]] = {}
+
+
+class JobLockLost(Exception):
+    """Задача передана другому обработчику по истечении JOBS_LOCK_TIMEOUT, результат выполнения отменяется."""
+
+
+def job_handler(name: str) -> Callable[[Callable[..., None]], Callable[..., None]]:
+    """
+    Регистрирует функцию как обработчик фоновых задач с именем name.
+
+    Обработчик получает аргументы задачи как именованные и выполняется в транзакции вместе с удалением
+    задачи, поэтому при ошибке его изменения в БД откатываются и задача выполняется повторно целиком.
+    Модули с обработчиками подключаются в AppConfig.ready приложения.
+    """
+
+    def decorator(func: Callable[..., None]) -> Callable[..., None]:
+        if name in _job_handlers:
+            raise ValueError(f'Обработчик фоновых задач {name} уже зарегистрирован')
+
+        _job_handlers[name] = func
+        return func
+
+    return decorator
+
+
+def _job_create_kwargs(
+    *, name: str, payload: dict | None, run_after: datetime.datetime | None, max_attempts: int | None
+) -> dict:
+    """Проверяет имя обработчика и возвращает значения полей новой задачи."""
+    if name not in _job_handlers:
+        raise LookupError(f'Обработчик фоновых задач {name} не зарегистрирован')
+
+    return {
+        'name': name,
+        'payload': payload or {},
+        'run_after': run_after or timezone.now(),
+        'max_attempts': max_attempts or getattr(settings, 'JOBS_MAX_ATTEMPTS', 5),
+    }
+
+
+def job_enqueue(
+    *,
+    name: str,
+    payload: dict | None = None,
+    run_after: datetime.datetime | None = None,
+    max_attempts: int | None = None,
+) -> Job:
+    """
+    Добавляет фоновую задачу в очередь.
+
+    Задача сохраняется в текущей транзакции и становится доступна обработчикам только после ее фиксации,
+    а при откате транзакции отменяется вместе с изменениями, которые ее породили.
+    """
+    return Job.objects.create(
+        **_job_create_kwargs(name=name, payload=payload, run_after=run_after, max_attempts=max_attempts)
+    )
+
+
+async def ajob_enqueue(
+    *,
+    name: str,
+    payload: dict | None = None,
+    run_after: datetime.datetime | None = None,
+    max_attempts: int | None = None,
+) -> Job:
+    """Асинхронный вариант job_enqueue."""
+    return await Job.objects.acreate(
+        **_job_create_kwargs(name=name, payload=payload, run_after=run_after, max_attempts=max_attempts)
+    )
+
+
+def jobs_bulk_enqueue(*, name: str, payloads: Iterable[dict], max_attempts: int | None = None) -> list[Job]:
+    """Добавляет в очередь задачи одного обработчика с разными аргументами одним запросом, как job_enqueue."""
+    return Job.objects.bulk_create(
+        Job(**_job_create_kwargs(name=name, payload=payload, run_after=None, max_attempts=max_attempts))
+        for payload in payloads
+    )
+
+
+def job_worker_id() -> str:
+    """Возвращает идентификатор обработчика задач текущего процесса."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _jobs_stale_release(*, now: datetime.datetime) -> int:
+    """
+    Возвращает в очередь брошенные задачи. Возвращает их количество.
+
+    Задачи в состоянии running, выполнение которых началось раньше JOBS_LOCK_TIMEOUT секунд назад,
+    считаются брошенными завершившимся обработчиком и выполняются повторно. Результат обработчика,
+    который продолжает выполнять такую задачу, отменяется (см. JobLockLost).
+    """
+    lock_timeout = datetime.timedelta(seconds=getattr(settings, 'JOBS_LOCK_TIMEOUT', 5 * 60))
+
+    return Job.objects.filter(status=JobStatuses.RUNNING, locked_at__lt=now - lock_timeout).update(
+        status=JobStatuses.PENDING, locked_by='', locked_at=None
+    )
+
+
+def _jobs_ready_queryset(*, now: datetime.datetime) -> QuerySet:
+    """Задачи, готовые к выполнению, в порядке выполнения по индексу (status, run_after, id)."""
+    return Job.objects.filter(status=JobStatuses.PENDING, run_after__lte=now).order_by('run_after', 'id')
+
+
+def jobs_claim(*, batch_size: int, worker_id: str) -> list[Job]:
+    """
+    Захватывает до batch_size готовых к выполнению задач для обработчика worker_id.
+
+    Перед отбором брошенные задачи возвращаются в очередь, поэтому отбираются только ожидающие задачи
+    по одному диапазону индекса без сортировки. Задачи захватываются условным запросом UPDATE,
+    который повторно проверяет готовность задачи, поэтому одну задачу захватывает только один
+    из одновременно работающих обработчиков. В PostgreSQL отбор выполняется с SELECT ... FOR UPDATE
+    SKIP LOCKED, и обработчики не выбирают одни и те же задачи. Захваченные задачи определяются
+    по идентификатору обработчика и времени захвата.
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        _jobs_stale_release(now=now)
+
+        jobs = _jobs_ready_queryset(now=now)
+        if connection.features.has_select_for_update_skip_locked:
+            jobs = jobs.select_for_update(skip_locked=True)
+
+        job_ids = list(jobs.values_list('id', flat=True)[:batch_size])
+        if not job_ids:
+            return []
+
+        _jobs_ready_queryset(now=now).filter(id__in=job_ids).update(
+            status=JobStatuses.RUNNING, locked_by=worker_id, locked_at=now
+        )
+
+    return list(Job.objects.filter(id__in=job_ids, locked_by=worker_id, locked_at=now).order_by('run_after', 'id'))
+
+
+def _job_retry_delay(*, attempts: int) -> datetime.timedelta:
+    """Задержка перед повторной попыткой, растущая вдвое с каждой неудачной попыткой."""
+    delay = getattr(settings, 'JOBS_RETRY_DELAY', 10) * 2 ** (attempts - 1)
+
+    return datetime.timedelta(seconds=min(delay, getattr(settings, 'JOBS_RETRY_MAX_DELAY', 60 * 60)))
+
+
+def job_run(*, job: Job, worker_id: str) -> str:
+    """
+    Выполняет захваченную задачу и возвращает результат: success, retry, failed или lock_lost.
+
+    Успешно выполненная задача удаляется в транзакции обработчика. После ошибки задача откладывается
+    на время, растущее с каждой попыткой, а после max_attempts попыток переводится в состояние failed.
+    """
+    try:
+        with JOB_SECONDS.time(name=job.name), transaction.atomic():
+            handler = _job_handlers.get(job.name)
+            if handler is None:
+                raise LookupError(f'Обработчик фоновых задач {job.name} не зарегистрирован')
+
+            handler(**job.payload)
+
+            if not Job.objects.filter(id=job.id, locked_by=worker_id, locked_at=job.locked_at).delete()[0]:
+                raise JobLockLost(job.id)
+    except JobLockLost:
+        logger.warning('%s выполнена другим обработчиком, результат отменен', job)
+        result = 'lock_lost'
+    except Exception:
+        logger.exception('Ошибка выполнения: %s', job)
+        attempts = job.attempts + 1
+        result = 'failed' if attempts >= job.max_attempts else 'retry'
+
+        Job.objects.filter(id=job.id, locked_by=worker_id, locked_at=job.locked_at).update(
+            status=JobStatuses.FAILED if result == 'failed' else JobStatuses.PENDING,
+            attempts=attempts,
+            run_after=timezone.now() + _job_retry_delay(attempts=attempts),
+            locked_by='',
+            locked_at=None,
+            last_error=traceback.format_exc(),
+        )
+    else:
+        result = 'success'
+
+    JOBS_PROCESSED.inc(name=job.name, result=result)
+
+    return result
+
+
+def jobs_run_batch(*, batch_size: int = 100, worker_id: str | None = None) -> int:
+    """Захватывает и выполняет пакет готовых задач. Возвращает количество захваченных задач."""
+    worker_id = worker_id or job_worker_id()
+    jobs = jobs_claim(batch_size=batch_size, worker_id=worker_id)
+
+    for job in jobs:
+        job_run(job=job, worker_id=worker_id)
+
+    return len(jobs)
+
+
+def jobs_run_pending(*, batch_size: int = 100, worker_id: str | None = None) -> int:
+    """
+    Выполняет пакетами все готовые задачи, в том числе добавленные при выполнении других задач.
+
+    Задачи, отложенные после ошибки, не ожидаются. Возвращает количество выполненных попыток.
+    """
+    processed_count = 0
+    while batch_processed_count := jobs_run_batch(batch_size=batch_size, worker_id=worker_id):
+        processed_count += batch_processed_count
+
+    return processed_count
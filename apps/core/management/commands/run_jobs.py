@@ -0,0 +1,47 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.core.jobs import job_worker_id, jobs_run_batch, jobs_run_pending
+
+
+class Command(BaseCommand):
+    """Выполняет фоновые задачи из очереди в БД."""
+
+    help = (
+        'Выполняет фоновые задачи из очереди в БД пакетами. Если готовых задач нет, ожидает --interval секунд. '
+        'Можно запускать несколько обработчиков одновременно. По сигналам SIGTERM и SIGINT завершается '
+        'после выполнения текущего пакета.'
+    )
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды."""
+        parser.add_argument('--batch-size', type=int, default=100, help='количество задач в пакете')
+        parser.add_argument('--interval', type=float, default=1.0, help='пауза при пустой очереди, секунд')
+        parser.add_argument('--once', action='store_true', help='выполнить готовые задачи и завершиться')
+        parser.add_argument('--worker-id', help='идентификатор обработчика, по умолчанию хост и номер процесса')
+
+    def handle(self, *args, **options):
+        """Выполняет команду."""
+        worker_id = options['worker_id'] or job_worker_id()
+
+        if options['once']:
+            processed_count = jobs_run_pending(batch_size=options['batch_size'], worker_id=worker_id)
+            self.stdout.write(f'Выполнено попыток: {processed_count}')
+            return
+
+        stop_event = threading.Event()
+        for signal_number in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signal_number, lambda *_args: stop_event.set())
+
+        self.stdout.write(f'Обработчик {worker_id} запущен')
+        while not stop_event.is_set():
+            # Соединение с БД переиспользуется между пакетами с учетом CONN_MAX_AGE, как между HTTP-запросами.
+            close_old_connections()
+            if not jobs_run_batch(batch_size=options['batch_size'], worker_id=worker_id):
+                stop_event.wait(options['interval'])
+
+        close_old_connections()
+        self.stdout.write(f'Обработчик {worker_id} остановлен')
@@ -0,0 +1,270 @@
+import atexit
+import bisect
+import glob
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger('apps.core.metrics')
+
+# Границы интервалов гистограмм длительности по умолчанию, секунд.
+DEFAULT_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_registry: dict[str, 'Metric'] = {}
+# Поток записи значений метрик процесса в файл, запускается при первом изменении метрики.
+_flush_thread: threading.Thread | None = None
+
+
+class Metric:
+    """Базовый класс метрики с набором меток."""
+
+    TYPE = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        if name in _registry:
+            raise ValueError(f'Метрика {name} уже зарегистрирована')
+
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], object] = {}
+        _registry[name] = self
+
+    def _label_values(self, labels: dict[str, object]) -> tuple[str, ...]:
+        """Возвращает значения меток в порядке labelnames."""
+        if not self.labelnames:
+            return ()
+
+        return tuple([str(labels[x]) for x in self.labelnames])
+
+    def _reset(self) -> None:
+        """Сбрасывает значения метрики."""
+        self._values = {}
+
+
+class Counter(Metric):
+    """Монотонно возрастающий счетчик."""
+
+    TYPE = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """Увеличивает счетчик."""
+        key = self._label_values(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        if _flush_thread is None:
+            _flush_thread_start()
+
+
+class Histogram(Metric):
+    """Гистограмма наблюдаемых значений с фиксированными границами интервалов."""
+
+    TYPE = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_DURATION_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        """Учитывает наблюдаемое значение."""
+        key = self._label_values(labels)
+        # Значения: количества по интервалам (последний - больше всех границ), сумма и количество.
+        bucket_index = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            values[bucket_index] += 1
+            values[-2] += value
+            values[-1] += 1
+        if _flush_thread is None:
+            _flush_thread_start()
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Учитывает длительность выполнения блока."""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, **labels)
+
+
+def _metrics_dir() -> str | None:
+    """Каталог файлов метрик процессов."""
+    return getattr(settings, 'METRICS_DIR', None)
+
+
+def _snapshot() -> dict:
+    """Возвращает копию значений метрик процесса."""
+    with _lock:
+        return {
+            metric.name: [[list(key), value] for key, value in metric._values.items()] for metric in _registry.values()
+        }
+
+
+def flush() -> None:
+    """Записывает значения метрик процесса в файл каталога METRICS_DIR."""
+    metrics_dir = _metrics_dir()
+    if not metrics_dir:
+        return
+
+    os.makedirs(metrics_dir, exist_ok=True)
+
+    # Файл заменяется атомарно, чтобы экспозиция не прочитала его частично.
+    file_descriptor, temp_path = tempfile.mkstemp(dir=metrics_dir, prefix='.metrics_')
+    with os.fdopen(file_descriptor, 'w') as file:
+        json.dump(_snapshot(), file)
+    os.replace(temp_path, os.path.join(metrics_dir, f'metrics_{os.getpid()}.json'))
+
+
+def _flush_loop() -> None:
+    """Записывает значения метрик процесса в файл каждые METRICS_FLUSH_INTERVAL секунд."""
+    while True:
+        time.sleep(getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0))
+        try:
+            flush()
+        except OSError:
+            logger.exception('Ошибка записи метрик в файл')
+
+
+def _flush_thread_start() -> None:
+    """
+    Запускает поток записи значений метрик в файл, если задана настройка METRICS_DIR.
+
+    Запись выполняется вне обработки запросов, поэтому значения бездействующего процесса
+    тоже попадают в файл не позже чем через METRICS_FLUSH_INTERVAL секунд.
+    """
+    global _flush_thread
+
+    if not _metrics_dir():
+        return
+
+    with _lock:
+        if _flush_thread is None:
+            _flush_thread = threading.Thread(target=_flush_loop, name='metrics-flush', daemon=True)
+            _flush_thread.start()
+
+
+def _reset_after_fork() -> None:
+    """
+    Сбрасывает значения, унаследованные дочерним процессом, чтобы не учитывать их дважды.
+
+    Поток записи в дочерний процесс не переходит и запускается в нем заново.
+    """
+    global _flush_thread
+
+    _flush_thread = None
+    for metric in _registry.values():
+        metric._reset()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+atexit.register(flush)
+
+
+def _collect() -> dict[str, dict[tuple[str, ...], object]]:
+    """Возвращает значения метрик, просуммированные по процессам."""
+    metrics_dir = _metrics_dir()
+    if not metrics_dir:
+        snapshots = [_snapshot()]
+    else:
+        flush()
+        snapshots = []
+        for path in glob.glob(os.path.join(metrics_dir, 'metrics_*.json')):
+            try:
+                with open(path) as file:
+                    snapshots.append(json.load(file))
+            except (OSError, ValueError):
+                continue
+
+    collected = {name: {} for name in _registry}
+    for snapshot in snapshots:
+        for name, items in snapshot.items():
+            if name not in collected:
+                continue
+
+            metric_values = collected[name]
+            for key, value in items:
+                key = tuple(key)
+                if isinstance(value, list):
+                    total = metric_values.setdefault(key, [0] * len(value))
+                    metric_values[key] = [x + y for x, y in zip(total, value, strict=True)]
+                else:
+                    metric_values[key] = metric_values.get(key, 0) + value
+
+    return collected
+
+
+def _escape_label_value(value: str) -> str:
+    """Экранирует значение метки."""
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames: tuple[str, ...], label_values: tuple[str, ...], **extra: str) -> str:
+    """Форматирует метки в формате экспозиции."""
+    pairs = [*zip(labelnames, label_values, strict=True), *extra.items()]
+    if not pairs:
+        return ''
+
+    escaped = (f'{x}="{_escape_label_value(y)}"' for x, y in pairs)
+
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    """Форматирует значение в формате экспозиции."""
+    if math.isinf(value):
+        return '+Inf'
+
+    return repr(float(value))
+
+
+def exposition() -> str:
+    """
+    Возвращает значения метрик в текстовом формате экспозиции Prometheus.
+
+    Значения накапливаются в памяти процесса. Если задана настройка METRICS_DIR, процесс фоновым потоком
+    каждые METRICS_FLUSH_INTERVAL секунд, при запросе экспозиции и при завершении записывает свои значения
+    в файл metrics_<pid>.json этого каталога, а экспозиция суммирует значения всех файлов. Так метрики
+    корректны при нескольких процессах (gunicorn, uvicorn --workers) без общего хранилища.
+    Файлы завершившихся процессов продолжают учитываться, поэтому каталог следует очищать
+    перед запуском приложения.
+    """
+    lines = []
+
+    for name, metric_values in _collect().items():
+        metric = _registry[name]
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.TYPE}')
+
+        for label_values, value in sorted(metric_values.items()):
+            if metric.TYPE == Histogram.TYPE:
+                cumulative_count = 0
+                for upper_bound, bucket_count in zip((*metric.buckets, math.inf), value, strict=False):
+                    cumulative_count += bucket_count
+                    labels = _format_labels(metric.labelnames, label_values, le=_format_value(upper_bound))
+                    lines.append(f'{name}_bucket{labels} {_format_value(cumulative_count)}')
+
+                labels = _format_labels(metric.labelnames, label_values)
+                lines.append(f'{name}_sum{labels} {_format_value(value[-2])}')
+                lines.append(f'{name}_count{labels} {_format_value(value[-1])}')
+            else:
+                lines.append(f'{name}{_format_labels(metric.labelnames, label_values)} {_format_value(value)}')
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,181 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpRequest, HttpResponseBase
+from django.utils.decorators import sync_and_async_middleware
+
+from apps.core.db_routers import DatabaseRoutingState, database_routing_state
+from apps.core.instrumentation import QueryBudgetExceeded, RequestMetrics, request_metrics
+from apps.core.metrics import Histogram
+
+logger = logging.getLogger('apps.core.requests')
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds',
+    'Длительность обработки HTTP-запроса по имени представления, методу и классу кода ответа, секунд.',
+    labelnames=('view', 'method', 'status'),
+)
+
+# Ключ сессии со временем, до которого чтение выполняется из основной БД.
+DATABASE_PRIMARY_UNTIL_SESSION_KEY = '_database_primary_until'
+
+
+def _routing_state_from_session(session) -> DatabaseRoutingState:
+    """Создает состояние маршрутизации запроса по сессии."""
+    return DatabaseRoutingState(use_primary=session.get(DATABASE_PRIMARY_UNTIL_SESSION_KEY, 0) > time.time())
+
+
+def _session_primary_until_update(session, state: DatabaseRoutingState) -> None:
+    """Продлевает чтение из основной БД для сессии после записи."""
+    if state.has_writes:
+        session[DATABASE_PRIMARY_UNTIL_SESSION_KEY] = time.time() + settings.DATABASE_REPLICA_STICKY_TIMEOUT
+
+
+@sync_and_async_middleware
+def database_routing_middleware(get_response):
+    """
+    Устанавливает состояние маршрутизации запросов к БД на время обработки запроса.
+
+    После записи в БД чтение в той же сессии выполняется из основной БД в течение
+    DATABASE_REPLICA_STICKY_TIMEOUT секунд. Должен располагаться после SessionMiddleware.
+    """
+    if iscoroutinefunction(get_response):
+
+        async def async_middleware(request):
+            # Сессия загружается из БД синхронно.
+            state = await sync_to_async(_routing_state_from_session)(request.session)
+            token = database_routing_state.set(state)
+            try:
+                response = await get_response(request)
+            finally:
+                database_routing_state.reset(token)
+
+            _session_primary_until_update(request.session, state)
+
+            return response
+
+        return async_middleware
+
+    def middleware(request):
+        state = _routing_state_from_session(request.session)
+        token = database_routing_state.set(state)
+        try:
+            response = get_response(request)
+        finally:
+            database_routing_state.reset(token)
+
+        _session_primary_until_update(request.session, state)
+
+        return response
+
+    return middleware
+
+
+def request_query_budget(*, view_name: str | None, method: str) -> int | None:
+    """
+    Возвращает бюджет запросов к БД для представления из REQUEST_QUERY_BUDGETS.
+
+    Бюджет для метода запроса ('<представление>:<метод>') имеет приоритет над бюджетом представления.
+    """
+    budgets = getattr(settings, 'REQUEST_QUERY_BUDGETS', {})
+
+    return budgets.get(f'{view_name}:{method}', budgets.get(view_name))
+
+
+def _request_metrics_report(request: HttpRequest, response: HttpResponseBase, metrics: RequestMetrics) -> None:
+    """
+    Записывает показатели запроса в журнал, заголовок Server-Timing и метрику длительности,
+    проверяет бюджет запросов к БД.
+    """
+    view_name = request.resolver_match.view_name if request.resolver_match else None
+    total_time = metrics.total_time
+
+    HTTP_REQUEST_SECONDS.observe(
+        total_time, view=view_name or '', method=request.method, status=f'{response.status_code // 100}xx'
+    )
+
+    logger.debug(
+        'method=%s path=%s view=%s status=%s queries=%d db_ms=%.1f template_ms=%.1f total_ms=%.1f',
+        request.method,
+        request.path,
+        view_name,
+        response.status_code,
+        metrics.queries_count,
+        metrics.db_time * 1000,
+        metrics.template_time * 1000,
+        total_time * 1000,
+        extra={
+            'view': view_name,
+            'status': response.status_code,
+            'queries': metrics.queries_count,
+            'db_ms': metrics.db_time * 1000,
+            'template_ms': metrics.template_time * 1000,
+            'total_ms': total_time * 1000,
+        },
+    )
+
+    if getattr(settings, 'REQUEST_METRICS_SERVER_TIMING', False):
+        server_timing = ', '.join(
+            [
+                f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries_count} queries"',
+                f'tpl;dur={metrics.template_time * 1000:.1f}',
+                f'total;dur={total_time * 1000:.1f}',
+            ]
+        )
+        if response.has_header('Server-Timing'):
+            server_timing = f'{response["Server-Timing"]}, {server_timing}'
+        response['Server-Timing'] = server_timing
+
+    queries_budget = request_query_budget(view_name=view_name, method=request.method)
+    if queries_budget is not None and metrics.queries_count > queries_budget:
+        message = (
+            f'Представление {view_name} выполнило {metrics.queries_count} запросов к БД '
+            f'при бюджете {queries_budget}: {request.method} {request.path}'
+        )
+        if getattr(settings, 'REQUEST_QUERY_BUDGETS_RAISE', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+@sync_and_async_middleware
+def request_metrics_middleware(get_response):
+    """
+    Учитывает количество и длительность запросов к БД, длительность отрисовки шаблонов и обработки запроса.
+
+    Показатели сохраняются в request.request_metrics, записываются в журнал apps.core.requests с уровнем DEBUG
+    и при REQUEST_METRICS_SERVER_TIMING в заголовок Server-Timing. Для представлений из REQUEST_QUERY_BUDGETS проверяется бюджет
+    запросов к БД: при превышении пишется предупреждение, а при REQUEST_QUERY_BUDGETS_RAISE
+    выбрасывается QueryBudgetExceeded (для тестов). Для потокового ответа учитывается только
+    время до его создания. Должен располагаться первым, чтобы учитывать запросы других middleware.
+    """
+    if iscoroutinefunction(get_response):
+
+        async def async_middleware(request):
+            request.request_metrics = metrics = RequestMetrics()
+            token = request_metrics.set(metrics)
+            try:
+                response = await get_response(request)
+            finally:
+                request_metrics.reset(token)
+
+            _request_metrics_report(request, response, metrics)
+
+            return response
+
+        return async_middleware
+
+    def middleware(request):
+        request.request_metrics = metrics = RequestMetrics()
+        token = request_metrics.set(metrics)
+        try:
+            response = get_response(request)
+        finally:
+            request_metrics.reset(token)
+
+        _request_metrics_report(request, response, metrics)
+
+        return response
+
+    return middleware
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.12 on 2026-10-17 21:27
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, verbose_name='имя обработчика')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='аргументы обработчика')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает выполнения'), ('running', 'Выполняется'), ('failed', 'Завершилась ошибкой')], default='pending', max_length=16, verbose_name='состояние')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='количество неудачных попыток')),
+                ('max_attempts', models.PositiveIntegerField(default=5, verbose_name='максимальное количество попыток')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='выполнить не раньше')),
+                ('locked_by', models.CharField(blank=True, max_length=255, verbose_name='обработчик, выполняющий задачу')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='дата начала выполнения')),
+                ('last_error', models.TextField(blank=True, verbose_name='последняя ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='дата добавления')),
+            ],
+            options={
+                'verbose_name': 'фоновая задача',
+                'verbose_name_plural': 'фоновые задачи',
+                'ordering': ('id',),
+                'indexes': [models.Index(fields=['status', 'run_after', 'id'], name='core_job_status_run_after')],
+            },
+        ),
+    ]
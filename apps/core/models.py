@@ -0,0 +1,43 @@
+from django.db import models
+from django.utils import timezone
+
+
+class JobStatuses(models.TextChoices):
+    """Состояния фоновой задачи."""
+
+    PENDING = 'pending', 'Ожидает выполнения'
+    RUNNING = 'running', 'Выполняется'
+    FAILED = 'failed', 'Завершилась ошибкой'
+
+
+class Job(models.Model):
+    """
+    Фоновая задача, выполняемая командой run_jobs (см. apps.core.jobs).
+
+    Успешно выполненные задачи удаляются, задачи, исчерпавшие попытки, остаются в состоянии failed.
+    """
+
+    name = models.CharField(verbose_name='имя обработчика', max_length=255)
+    payload = models.JSONField(verbose_name='аргументы обработчика', default=dict, blank=True)
+    status = models.CharField(
+        verbose_name='состояние', max_length=16, choices=JobStatuses.choices, default=JobStatuses.PENDING
+    )
+    attempts = models.PositiveIntegerField(verbose_name='количество неудачных попыток', default=0)
+    max_attempts = models.PositiveIntegerField(verbose_name='максимальное количество попыток', default=5)
+    run_after = models.DateTimeField(verbose_name='выполнить не раньше', default=timezone.now)
+    locked_by = models.CharField(verbose_name='обработчик, выполняющий задачу', max_length=255, blank=True)
+    locked_at = models.DateTimeField(verbose_name='дата начала выполнения', null=True, blank=True)
+    last_error = models.TextField(verbose_name='последняя ошибка', blank=True)
+    created_at = models.DateTimeField(verbose_name='дата добавления', auto_now_add=True)
+
+    class Meta:
+        """Настройки модели."""
+
+        verbose_name = 'фоновая задача'
+        verbose_name_plural = 'фоновые задачи'
+        ordering = ('id',)
+        indexes = (models.Index(fields=('status', 'run_after', 'id'), name='core_job_status_run_after'),)
+
+    def __str__(self):
+        """Строковое представление объекта."""
+        return f'Задача № {self.id}: {self.name}'
@@ -0,0 +1,193 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Model, Q, QuerySet
+
+CURSOR_DIRECTION_NEXT = 'n'
+CURSOR_DIRECTION_PREVIOUS = 'p'
+
+
+class InvalidCursor(ValueError):
+    """Некорректный курсор страницы."""
+
+
+@dataclass
+class KeysetPage:
+    """Страница объектов при пагинации по ключу."""
+
+    object_list: list[Model]
+    next_cursor: str | None = None
+    previous_cursor: str | None = None
+    estimated_total: int | None = None
+
+    def __iter__(self):
+        """Итерирует объекты страницы."""
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        """Количество объектов на странице."""
+        return len(self.object_list)
+
+    @property
+    def has_next(self) -> bool:
+        """Есть следующая страница."""
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self) -> bool:
+        """Есть предыдущая страница."""
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self) -> bool:
+        """Есть другие страницы."""
+        return self.has_next or self.has_previous
+
+
+class KeysetPaginator:
+    """
+    Пагинатор по ключу сортировки (keyset pagination).
+
+    В отличие от django.core.paginator.Paginator не выполняет COUNT(*) и OFFSET: каждая страница
+    выбирается условием по значениям ключа последнего показанного объекта, поэтому стоимость
+    запроса не зависит от номера страницы. Ключ сортировки должен однозначно упорядочивать объекты,
+    например ('-created_at', '-id').
+    """
+
+    def __init__(
+        self, queryset: QuerySet, ordering: Sequence[str], per_page: int, with_estimated_total: bool = False
+    ) -> None:
+        """Инициализирует пагинатор."""
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.with_estimated_total = with_estimated_total
+        self.fields = [x.lstrip('-') for x in self.ordering]
+
+    def get_page(self, cursor: str | None = None) -> KeysetPage:
+        """Возвращает страницу по курсору. Некорректный курсор считается ссылкой на первую страницу."""
+        queryset, is_backward, is_first = self._page_queryset(cursor)
+        page = self._make_page(list(queryset), is_backward=is_backward, is_first=is_first)
+
+        if self.with_estimated_total:
+            page.estimated_total = estimate_count(self.queryset)
+
+        return page
+
+    async def aget_page(self, cursor: str | None = None) -> KeysetPage:
+        """Асинхронный вариант get_page."""
+        queryset, is_backward, is_first = self._page_queryset(cursor)
+        page = self._make_page([x async for x in queryset], is_backward=is_backward, is_first=is_first)
+
+        if self.with_estimated_total:
+            page.estimated_total = await sync_to_async(estimate_count)(self.queryset)
+
+        return page
+
+    def _page_queryset(self, cursor: str | None) -> tuple[QuerySet, bool, bool]:
+        """
+        Возвращает запрос объектов страницы с одним лишним объектом для проверки наличия следующей страницы.
+
+        Также возвращает признаки обхода в обратном порядке и запроса первой страницы.
+        """
+        try:
+            direction, values = self._decode_cursor(cursor) if cursor else (CURSOR_DIRECTION_NEXT, None)
+        except InvalidCursor:
+            direction, values = CURSOR_DIRECTION_NEXT, None
+
+        is_backward = direction == CURSOR_DIRECTION_PREVIOUS
+        ordering = [self._reverse_order(x) for x in self.ordering] if is_backward else list(self.ordering)
+
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._keyset_condition(values, is_backward=is_backward))
+
+        return queryset[: self.per_page + 1], is_backward, values is None
+
+    def _make_page(self, object_list: list[Model], *, is_backward: bool, is_first: bool) -> KeysetPage:
+        """Формирует страницу из результата запроса _page_queryset."""
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[: self.per_page]
+
+        if is_backward:
+            object_list.reverse()
+            # Переход назад всегда выполняется с последующей страницы.
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, not is_first
+
+        page = KeysetPage(object_list=object_list)
+        if object_list and has_next:
+            page.next_cursor = self._encode_cursor(CURSOR_DIRECTION_NEXT, object_list[-1])
+        if object_list and has_previous:
+            page.previous_cursor = self._encode_cursor(CURSOR_DIRECTION_PREVIOUS, object_list[0])
+
+        return page
+
+    def _keyset_condition(self, values: list, *, is_backward: bool) -> Q:
+        """Возвращает условие выбора объектов, следующих за ключом в порядке обхода."""
+        condition = Q()
+        equal_condition = Q()
+
+        for order, field, value in zip(self.ordering, self.fields, values, strict=True):
+            is_descending = order.startswith('-') != is_backward
+            condition |= equal_condition & Q(**{f'{field}__{"lt" if is_descending else "gt"}': value})
+            equal_condition &= Q(**{field: value})
+
+        return condition
+
+    def _encode_cursor(self, direction: str, instance: Model) -> str:
+        """Кодирует курсор по значениям ключа объекта."""
+        # Значения сериализуются без потери точности, иначе сравнение по ключу даст пропуски и повторы.
+        values = [self.queryset.model._meta.get_field(x).value_to_string(instance) for x in self.fields]
+        data = json.dumps([direction, values], separators=(',', ':'))
+
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    def _decode_cursor(self, cursor: str) -> tuple[str, list]:
+        """Декодирует курсор в направление обхода и значения ключа."""
+        try:
+            direction, raw_values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            values = [
+                self.queryset.model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.fields, raw_values, strict=True)
+            ]
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, ValidationError) as exc:
+            raise InvalidCursor(cursor) from exc
+
+        if direction not in (CURSOR_DIRECTION_NEXT, CURSOR_DIRECTION_PREVIOUS):
+            raise InvalidCursor(cursor)
+
+        return direction, values
+
+    @staticmethod
+    def _reverse_order(order: str) -> str:
+        """Возвращает обратный порядок сортировки по полю."""
+        return order[1:] if order.startswith('-') else f'-{order}'
+
+
+def estimate_count(queryset: QuerySet) -> int | None:
+    """
+    Возвращает оценку количества объектов по плану запроса без выполнения COUNT(*).
+
+    Оценка доступна только для PostgreSQL, для остальных СУБД возвращается None.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return plan[0]['Plan']['Plan Rows']
@@ -0,0 +1,91 @@
+import heapq
+import math
+import random
+from collections.abc import Collection, Sequence
+
+# Количество попыток выбора на один элемент при выборке без возвращения отбраковкой повторов.
+REJECTION_SAMPLING_ATTEMPTS_PER_ITEM = 4
+
+
+class WeightedSampler:
+    """
+    Взвешенная случайная выборка индексов по дереву Фенвика.
+
+    Дерево строится за O(n) и не изменяется при выборке, поэтому один объект можно использовать
+    из нескольких потоков. Выбор одного индекса с вероятностью, пропорциональной весу, выполняется
+    за O(log n), выборка k индексов без возвращения - в среднем за O(k log n).
+    """
+
+    def __init__(self, weights: Sequence[float]) -> None:
+        self.weights = [max(float(x), 0.0) for x in weights]
+        self.positive_count = sum(1 for x in self.weights if x > 0)
+
+        # Индексы дерева начинаются с 1.
+        self._tree = [0.0, *self.weights]
+        for index in range(1, len(self._tree)):
+            parent_index = index + (index & -index)
+            if parent_index < len(self._tree):
+                self._tree[parent_index] += self._tree[index]
+
+        self.total = math.fsum(self.weights)
+        self._top_bit = 1 << (len(self.weights).bit_length() - 1) if self.weights else 0
+
+    def __len__(self) -> int:
+        """Количество элементов."""
+        return len(self.weights)
+
+    def _find(self, value: float) -> int:
+        """Возвращает индекс элемента, на который приходится значение накопленной суммы весов."""
+        position = 0
+        bit = self._top_bit
+        while bit:
+            next_position = position + bit
+            if next_position < len(self._tree) and self._tree[next_position] <= value:
+                position = next_position
+                value -= self._tree[next_position]
+            bit >>= 1
+
+        # Из-за погрешности округления позиция может указывать на элемент с нулевым весом в конце.
+        index = min(position, len(self.weights) - 1)
+        while index > 0 and not self.weights[index]:
+            index -= 1
+
+        return index
+
+    def choice(self, rng: random.Random = random) -> int:
+        """Возвращает случайный индекс с вероятностью, пропорциональной весу."""
+        if not self.positive_count:
+            raise IndexError('Нет элементов с положительным весом')
+
+        return self._find(rng.random() * self.total)
+
+    def sample(self, k: int, *, exclude: Collection[int] = (), rng: random.Random = random) -> list[int]:
+        """
+        Возвращает до k различных индексов, выбранных без возвращения с вероятностями, пропорциональными весам.
+
+        Элементы с нулевым весом и индексы из exclude не выбираются. Повторы отбраковываются; если за
+        отведенное число попыток набрать k индексов не удалось (веса сосредоточены на немногих элементах),
+        оставшиеся индексы выбираются методом Эфраимидиса - Спиракиса за O(n log k).
+        """
+        available_count = self.positive_count - sum(1 for x in set(exclude) if 0 <= x < len(self) and self.weights[x])
+        k = min(k, available_count)
+        if k <= 0:
+            return []
+
+        selected: dict[int, None] = {}
+        for _x in range(k * REJECTION_SAMPLING_ATTEMPTS_PER_ITEM):
+            index = self.choice(rng)
+            if index not in selected and index not in exclude:
+                selected[index] = None
+                if len(selected) == k:
+                    return list(selected)
+
+        excluded = selected.keys() | set(exclude)
+        keys = (
+            (rng.random() ** (1 / weight), index)
+            for index, weight in enumerate(self.weights)
+            if weight and index not in excluded
+        )
+        selected.update(dict.fromkeys(x for _key, x in heapq.nlargest(k - len(selected), keys)))
+
+        return list(selected)
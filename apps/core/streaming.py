@@ -0,0 +1,74 @@
+import csv
+from collections.abc import AsyncIterable, AsyncIterator, Iterable, Iterator, Sequence
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import QuerySet
+from django.http import HttpRequest, StreamingHttpResponse
+
+
+class _LineBuffer:
+    """Буфер для csv.writer, возвращающий записанную строку вместо записи."""
+
+    def write(self, value: str) -> str:
+        """Возвращает строку."""
+        return value
+
+
+def csv_lines(rows: Iterable[Sequence], *, header: Sequence[str]) -> Iterator[str]:
+    """Возвращает строки CSV с заголовком."""
+    writer = csv.writer(_LineBuffer())
+
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+async def acsv_lines(rows: AsyncIterable[Sequence], *, header: Sequence[str]) -> AsyncIterator[str]:
+    """Асинхронный вариант csv_lines."""
+    writer = csv.writer(_LineBuffer())
+
+    yield writer.writerow(header)
+    async for row in rows:
+        yield writer.writerow(row)
+
+
+async def _aqueryset_iterator(queryset: QuerySet, *, chunk_size: int) -> AsyncIterator:
+    """
+    Асинхронно перебирает строки запроса, читая их частями по chunk_size.
+
+    QuerySet.aiterator() выполняет запросы values_list в потоке цикла событий, поэтому синхронный
+    итератор запроса продвигается в потоке для синхронного кода.
+    """
+    rows = queryset.iterator(chunk_size=chunk_size)
+
+    def next_chunk() -> list:
+        return list(islice(rows, chunk_size))
+
+    while chunk := await sync_to_async(next_chunk)():
+        for row in chunk:
+            yield row
+
+
+def streaming_csv_response(
+    request: HttpRequest, *, queryset: QuerySet, header: Sequence[str], filename: str, chunk_size: int = 2000
+) -> StreamingHttpResponse:
+    """
+    Возвращает потоковый ответ в формате CSV со строками запроса values_list.
+
+    Строки читаются из БД частями по chunk_size (в PostgreSQL - через курсор на стороне сервера),
+    поэтому потребление памяти не зависит от количества строк. Django загружает в память содержимое
+    потокового ответа целиком, если тип итератора не соответствует обработчику (WSGI или ASGI),
+    поэтому для ASGI используется асинхронный итератор.
+    """
+    if isinstance(request, ASGIRequest):
+        content = acsv_lines(_aqueryset_iterator(queryset, chunk_size=chunk_size), header=header)
+    else:
+        content = csv_lines(queryset.iterator(chunk_size=chunk_size), header=header)
+
+    return StreamingHttpResponse(
+        content,
+        content_type='text/csv; charset=utf-8',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
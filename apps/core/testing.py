@@ -0,0 +1,126 @@
+import json
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import QuerySet
+from django.http import HttpRequest, HttpResponseBase
+from django.test import override_settings
+
+from apps.core.instrumentation import RequestMetrics
+from apps.core.jobs import jobs_run_pending
+from apps.core.models import Job
+
+
+SQLITE_SORT_PREFIX = 'USE TEMP B-TREE'
+POSTGRESQL_SORT_NODES = ('Sort', 'Incremental Sort')
+
+
+def _sqlite_query_plan_problems(connection, sql: str, params, *, is_filtered: bool) -> list[str]:
+    """Возвращает проблемы плана запроса SQLite."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        details = [row[-1] for row in cursor.fetchall()]
+
+    problems = [x for x in details if x.startswith(SQLITE_SORT_PREFIX) or x.startswith('MULTI-INDEX OR')]
+    if is_filtered:
+        problems += [x for x in details if x.startswith('SCAN ') and ' USING ' not in x]
+
+    return problems
+
+
+def _postgresql_query_plan_problems(connection, sql: str, params, *, is_filtered: bool) -> list[str]:
+    """Возвращает проблемы плана запроса PostgreSQL."""
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        # На небольших таблицах планировщик предпочитает полный просмотр даже при наличии индекса.
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    problems = []
+    nodes = [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        nodes.extend(node.get('Plans', []))
+
+        if node['Node Type'] in POSTGRESQL_SORT_NODES:
+            problems.append(f'{node["Node Type"]} ({", ".join(node.get("Sort Key", []))})')
+        elif node['Node Type'] == 'BitmapOr':
+            problems.append('BitmapOr')
+        elif is_filtered and node['Node Type'] == 'Seq Scan':
+            problems.append(f'Seq Scan on {node["Relation Name"]}')
+
+    return problems
+
+
+def query_plan_problems(queryset: QuerySet, *, is_filtered: bool = True) -> list[str]:
+    """
+    Возвращает проблемы плана запроса по EXPLAIN: сортировку результата, объединение нескольких
+    индексов по OR и, для запроса с условием отбора (is_filtered), полный просмотр таблицы.
+
+    Поддерживаются SQLite и PostgreSQL, план строится в БД, в которой выполняется запрос.
+    """
+    connection = connections[queryset.db]
+    sql, params = queryset.query.sql_with_params()
+
+    if connection.vendor == 'sqlite':
+        return _sqlite_query_plan_problems(connection, sql, params, is_filtered=is_filtered)
+    if connection.vendor == 'postgresql':
+        return _postgresql_query_plan_problems(connection, sql, params, is_filtered=is_filtered)
+
+    raise ValueError(f'СУБД {connection.vendor} не поддерживается')
+
+
+def _response_request(response: HttpResponseBase) -> HttpRequest:
+    """Возвращает запрос, на который получен ответ тестового клиента."""
+    return getattr(response, 'wsgi_request', None) or response.asgi_request
+
+
+def response_request_metrics(response: HttpResponseBase) -> RequestMetrics:
+    """Возвращает показатели обработки запроса по ответу тестового клиента."""
+    return _response_request(response).request_metrics
+
+
+def assert_response_queries(response: HttpResponseBase, *, max_queries: int) -> None:
+    """
+    Проверяет, что при обработке запроса выполнено не больше max_queries запросов к БД.
+
+    Учитываются запросы из всех потоков, в том числе из асинхронных представлений,
+    в отличие от assertNumQueries, который учитывает только соединение текущего потока.
+    """
+    request = _response_request(response)
+    queries_count = request.request_metrics.queries_count
+
+    assert queries_count <= max_queries, (
+        f'{request.method} {request.path}: выполнено {queries_count} запросов к БД, допустимо не больше {max_queries}'
+    )
+
+
+def query_budgets_enforced(**budgets: int) -> override_settings:
+    """
+    Включает проверку бюджетов запросов к БД с исключением QueryBudgetExceeded при превышении.
+
+    Используется как декоратор или контекстный менеджер. Бюджеты из REQUEST_QUERY_BUDGETS
+    можно переопределить по именам представлений.
+    """
+    return override_settings(
+        REQUEST_QUERY_BUDGETS={**getattr(settings, 'REQUEST_QUERY_BUDGETS', {}), **budgets},
+        REQUEST_QUERY_BUDGETS_RAISE=True,
+    )
+
+
+def jobs_run_all() -> int:
+    """
+    Выполняет в текущем процессе все готовые фоновые задачи, как команда run_jobs --once.
+
+    Ошибка любой задачи приводит к AssertionError с ее трассировкой, а не к отложенной повторной попытке.
+    Возвращает количество выполненных задач.
+    """
+    processed_count = jobs_run_pending()
+
+    failed_job = Job.objects.exclude(last_error='').order_by('id').first()
+    assert failed_job is None, f'{failed_job}: {failed_job.last_error}'
+
+    return processed_count
@@ -0,0 +1,519 @@
+import base64
+import datetime
+import json
+import math
+import os
+import random
+import tempfile
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import DEFAULT_DB_ALIAS, connection, router, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from apps.core import metrics
+from apps.core.db_routers import DatabaseRoutingState, database_routing_state
+from apps.core.jobs import _jobs_ready_queryset, job_enqueue, job_handler, job_run, jobs_claim, jobs_run_batch
+from apps.core.metrics import Counter, Histogram, exposition
+from apps.core.middleware import DATABASE_PRIMARY_UNTIL_SESSION_KEY, database_routing_middleware
+from apps.core.models import Job, JobStatuses
+from apps.core.pagination import InvalidCursor, KeysetPaginator, estimate_count
+from apps.core.sampling import WeightedSampler
+from apps.core.testing import query_plan_problems
+from apps.tasks.models import Task
+
+USER_CREATE_JOB_NAME = 'core.tests.user_create'
+FAILING_JOB_NAME = 'core.tests.failing'
+
+TEST_COUNTER = Counter('core_tests_events_total', 'Тестовый счетчик.', labelnames=('name',))
+TEST_HISTOGRAM = Histogram('core_tests_duration_seconds', 'Тестовая гистограмма.', buckets=(0.1, 1.0))
+
+
+@job_handler(USER_CREATE_JOB_NAME)
+def user_create(*, username: str) -> None:
+    User.objects.create_user(username=username)
+
+
+@job_handler(FAILING_JOB_NAME)
+def failing() -> None:
+    raise RuntimeError('Ошибка задачи')
+
+
+@override_settings(JOBS_LOCK_TIMEOUT=300, JOBS_RETRY_DELAY=10, JOBS_RETRY_MAX_DELAY=15, JOBS_MAX_ATTEMPTS=5)
+class JobsTests(TestCase):
+    """Захват и выполнение фоновых задач обработчиком в текущем процессе."""
+
+    def _job_retry_move(self, job: Job) -> None:
+        Job.objects.filter(id=job.id).update(run_after=timezone.now())
+
+    def test_claim(self):
+        jobs = [job_enqueue(name=USER_CREATE_JOB_NAME, payload={'username': f'user{x}'}) for x in range(3)]
+        job_enqueue(
+            name=USER_CREATE_JOB_NAME,
+            payload={'username': 'later'},
+            run_after=timezone.now() + datetime.timedelta(minutes=1),
+        )
+
+        claimed_jobs = jobs_claim(batch_size=2, worker_id='worker1')
+
+        self.assertEqual([x.id for x in claimed_jobs], [x.id for x in jobs[:2]])
+        self.assertEqual({(x.status, x.locked_by) for x in claimed_jobs}, {(JobStatuses.RUNNING, 'worker1')})
+        self.assertEqual([x.id for x in jobs_claim(batch_size=10, worker_id='worker2')], [jobs[2].id])
+        self.assertEqual(jobs_claim(batch_size=10, worker_id='worker3'), [])
+
+    def test_claim_query_plan(self):
+        jobs = _jobs_ready_queryset(now=timezone.now()).values_list('id', flat=True)[:100]
+
+        self.assertEqual(query_plan_problems(jobs), [])
+
+    def test_run(self):
+        job_enqueue(name=USER_CREATE_JOB_NAME, payload={'username': 'student'})
+
+        self.assertEqual(jobs_run_batch(worker_id='worker1'), 1)
+
+        self.assertTrue(User.objects.filter(username='student').exists())
+        self.assertFalse(Job.objects.exists())
+
+    def test_retry_backoff(self):
+        job = job_enqueue(name=FAILING_JOB_NAME)
+
+        for attempts, delay in ((1, 10), (2, 15)):
+            started_at = timezone.now()
+            with self.assertLogs('apps.core.jobs', level='ERROR'):
+                self.assertEqual(jobs_run_batch(worker_id='worker1'), 1)
+            job.refresh_from_db()
+
+            self.assertEqual(
+                (job.status, job.attempts, job.locked_by, job.locked_at), (JobStatuses.PENDING, attempts, '', None)
+            )
+            self.assertIn('RuntimeError: Ошибка задачи', job.last_error)
+            self.assertGreaterEqual(job.run_after, started_at + datetime.timedelta(seconds=delay))
+            self.assertLessEqual(job.run_after, timezone.now() + datetime.timedelta(seconds=delay))
+            # Отложенная задача не захватывается до наступления run_after.
+            self.assertEqual(jobs_run_batch(worker_id='worker1'), 0)
+
+            self._job_retry_move(job)
+
+    def test_failed_after_max_attempts(self):
+        job = job_enqueue(name=FAILING_JOB_NAME, max_attempts=2)
+
+        with self.assertLogs('apps.core.jobs', level='ERROR'):
+            self.assertEqual(
+                job_run(job=jobs_claim(batch_size=1, worker_id='worker1')[0], worker_id='worker1'), 'retry'
+            )
+            self._job_retry_move(job)
+            self.assertEqual(
+                job_run(job=jobs_claim(batch_size=1, worker_id='worker1')[0], worker_id='worker1'), 'failed'
+            )
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (JobStatuses.FAILED, 2))
+        self._job_retry_move(job)
+        self.assertEqual(jobs_claim(batch_size=1, worker_id='worker1'), [])
+
+    def test_stale_lock_takeover(self):
+        job_enqueue(name=USER_CREATE_JOB_NAME, payload={'username': 'student'})
+        [stale_job] = jobs_claim(batch_size=1, worker_id='worker1')
+
+        # Обработчик worker1 не завершил задачу за JOBS_LOCK_TIMEOUT.
+        self.assertEqual(jobs_claim(batch_size=1, worker_id='worker2'), [])
+        Job.objects.filter(id=stale_job.id).update(locked_at=timezone.now() - datetime.timedelta(seconds=301))
+        [job] = jobs_claim(batch_size=1, worker_id='worker2')
+        self.assertEqual((job.id, job.locked_by), (stale_job.id, 'worker2'))
+
+        with self.assertLogs('apps.core.jobs', level='WARNING'):
+            self.assertEqual(job_run(job=stale_job, worker_id='worker1'), 'lock_lost')
+        self.assertFalse(User.objects.filter(username='student').exists())
+
+        self.assertEqual(job_run(job=job, worker_id='worker2'), 'success')
+        self.assertTrue(User.objects.filter(username='student').exists())
+        self.assertFalse(Job.objects.exists())
+
+
+# Настроена отдельная тестовая БД реплики (schoolproj.settings_test).
+REPLICA_TEST_DATABASE_SEPARATE = 'replica' in settings.DATABASES and not settings.DATABASES['replica'].get(
+    'TEST', {}
+).get('MIRROR')
+
+
+@skipUnless(REPLICA_TEST_DATABASE_SEPARATE, 'требуется отдельная тестовая БД реплики, см. schoolproj.settings_test')
+class PrimaryReplicaRouterTests(TransactionTestCase):
+    """
+    Маршрутизация запросов между основной БД и репликой.
+
+    Тестовая БД реплики отдельная и не получает изменений основной БД, поэтому по результату чтения
+    видно, из какой БД оно выполнено. Тесты выполняются вне транзакции, в отличие от TestCase.
+    """
+
+    databases = {'default', 'replica'} if REPLICA_TEST_DATABASE_SEPARATE else {'default'}
+
+    def _task_create(self) -> Task:
+        return Task.objects.create(title='Задание', description='Описание')
+
+    @contextmanager
+    def _request_scope(self, state: DatabaseRoutingState | None = None) -> Iterator[DatabaseRoutingState]:
+        """Состояние маршрутизации при обработке HTTP-запроса, как в database_routing_middleware."""
+        state = state or DatabaseRoutingState()
+        token = database_routing_state.set(state)
+        try:
+            yield state
+        finally:
+            database_routing_state.reset(token)
+
+    def test_read_from_replica(self):
+        self._task_create()
+
+        with self._request_scope():
+            self.assertEqual(Task.objects.db, 'replica')
+            self.assertFalse(Task.objects.exists())
+            self.assertTrue(Task.objects.using(DEFAULT_DB_ALIAS).exists())
+            # Модели других приложений читаются из основной БД.
+            self.assertEqual(User.objects.db, DEFAULT_DB_ALIAS)
+
+    def test_read_from_primary_outside_request(self):
+        # Команды управления и обработчики фоновых задач читают результаты своих записей.
+        self._task_create()
+
+        self.assertEqual(Task.objects.db, DEFAULT_DB_ALIAS)
+        self.assertTrue(Task.objects.exists())
+
+    def test_write_to_primary(self):
+        with self._request_scope(DatabaseRoutingState(use_primary=True)):
+            self.assertEqual(router.db_for_write(Task), DEFAULT_DB_ALIAS)
+            task = self._task_create()
+
+        self.assertEqual(task._state.db, DEFAULT_DB_ALIAS)
+        self.assertFalse(Task.objects.using('replica').exists())
+
+    def test_read_from_primary_in_atomic(self):
+        self._task_create()
+
+        with self._request_scope():
+            with transaction.atomic():
+                self.assertEqual(Task.objects.db, DEFAULT_DB_ALIAS)
+                self.assertTrue(Task.objects.exists())
+
+            self.assertEqual(Task.objects.db, 'replica')
+
+    def test_read_from_primary_after_write_in_request(self):
+        with self._request_scope() as state:
+            self.assertEqual(Task.objects.db, 'replica')
+            self._task_create()
+
+            self.assertEqual((state.use_primary, state.has_writes), (True, True))
+            self.assertEqual(Task.objects.db, DEFAULT_DB_ALIAS)
+            self.assertTrue(Task.objects.exists())
+
+        # Состояние не переходит в следующий запрос.
+        with self._request_scope():
+            self.assertEqual(Task.objects.db, 'replica')
+
+    @override_settings(DATABASE_REPLICA_STICKY_TIMEOUT=60)
+    def test_read_from_primary_in_session_after_write(self):
+        def view(request):
+            if request.method == 'POST':
+                self._task_create()
+            return HttpResponse(Task.objects.db)
+
+        middleware = database_routing_middleware(view)
+        session = SessionStore()
+
+        def response_content(method: str) -> str:
+            request = getattr(RequestFactory(), method)('/')
+            request.session = session
+            return middleware(request).content.decode()
+
+        self.assertEqual(response_content('get'), 'replica')
+        self.assertEqual(response_content('post'), DEFAULT_DB_ALIAS)
+        self.assertGreater(session[DATABASE_PRIMARY_UNTIL_SESSION_KEY], time.time() + 50)
+        self.assertEqual(response_content('get'), DEFAULT_DB_ALIAS)
+
+        # Время чтения из основной БД после записи истекло.
+        session[DATABASE_PRIMARY_UNTIL_SESSION_KEY] = time.time() - 1
+        self.assertEqual(response_content('get'), 'replica')
+
+
+class MetricsTests(SimpleTestCase):
+    """Экспозиция метрик и суммирование значений процессов через файлы METRICS_DIR."""
+
+    def setUp(self):
+        TEST_COUNTER._reset()
+        TEST_HISTOGRAM._reset()
+
+    def _metric_lines(self, name: str) -> list[str]:
+        return [x for x in exposition().splitlines() if name in x]
+
+    def _metrics_file_write(self, metrics_dir: str, pid: int, snapshot: dict) -> None:
+        with open(os.path.join(metrics_dir, f'metrics_{pid}.json'), 'w') as file:
+            json.dump(snapshot, file)
+
+    @override_settings(METRICS_DIR=None)
+    def test_exposition_format(self):
+        TEST_COUNTER.inc(name='a"b')
+        TEST_COUNTER.inc(2, name='a"b')
+        TEST_COUNTER.inc(name='c')
+        for value in (0.05, 0.5, 5):
+            TEST_HISTOGRAM.observe(value)
+
+        self.assertTrue(exposition().endswith('\n'))
+        self.assertEqual(
+            self._metric_lines('core_tests_events_total'),
+            [
+                '# HELP core_tests_events_total Тестовый счетчик.',
+                '# TYPE core_tests_events_total counter',
+                'core_tests_events_total{name="a\\"b"} 3.0',
+                'core_tests_events_total{name="c"} 1.0',
+            ],
+        )
+        self.assertEqual(
+            self._metric_lines('core_tests_duration_seconds'),
+            [
+                '# HELP core_tests_duration_seconds Тестовая гистограмма.',
+                '# TYPE core_tests_duration_seconds histogram',
+                'core_tests_duration_seconds_bucket{le="0.1"} 1.0',
+                'core_tests_duration_seconds_bucket{le="1.0"} 2.0',
+                'core_tests_duration_seconds_bucket{le="+Inf"} 3.0',
+                f'core_tests_duration_seconds_sum {0.05 + 0.5 + 5!r}',
+                'core_tests_duration_seconds_count 3.0',
+            ],
+        )
+
+    def test_aggregation_across_processes(self):
+        with tempfile.TemporaryDirectory() as metrics_dir, self.settings(METRICS_DIR=metrics_dir):
+            self._metrics_file_write(
+                metrics_dir,
+                1,
+                {
+                    'core_tests_events_total': [[['a'], 2]],
+                    'core_tests_duration_seconds': [[[], [1, 0, 0, 0.05, 1]]],
+                    'core_tests_unknown_total': [[[], 1]],
+                },
+            )
+            self._metrics_file_write(
+                metrics_dir,
+                2,
+                {
+                    'core_tests_events_total': [[['a'], 3], [['b'], 1]],
+                    'core_tests_duration_seconds': [[[], [0, 1, 1, 5.5, 2]]],
+                },
+            )
+            with open(os.path.join(metrics_dir, 'metrics_3.json'), 'w') as file:
+                file.write('{')
+            # Значения текущего процесса записываются в файл при запросе экспозиции.
+            TEST_COUNTER.inc(name='a')
+
+            self.assertEqual(
+                self._metric_lines('core_tests_events_total')[2:],
+                ['core_tests_events_total{name="a"} 6.0', 'core_tests_events_total{name="b"} 1.0'],
+            )
+            self.assertEqual(
+                self._metric_lines('core_tests_duration_seconds')[2:],
+                [
+                    'core_tests_duration_seconds_bucket{le="0.1"} 1.0',
+                    'core_tests_duration_seconds_bucket{le="1.0"} 2.0',
+                    'core_tests_duration_seconds_bucket{le="+Inf"} 3.0',
+                    f'core_tests_duration_seconds_sum {0.05 + 5.5!r}',
+                    'core_tests_duration_seconds_count 3.0',
+                ],
+            )
+            self.assertNotIn('core_tests_unknown_total', exposition())
+            self.assertTrue(os.path.exists(os.path.join(metrics_dir, f'metrics_{os.getpid()}.json')))
+
+    def test_flush_without_exposition(self):
+        with (
+            tempfile.TemporaryDirectory() as metrics_dir,
+            self.settings(METRICS_DIR=metrics_dir, METRICS_FLUSH_INTERVAL=0.01),
+        ):
+            TEST_COUNTER.inc(name='a')
+
+            path = os.path.join(metrics_dir, f'metrics_{os.getpid()}.json')
+            values = None
+            deadline = time.monotonic() + 5
+            while values != [[['a'], 1]] and time.monotonic() < deadline:
+                time.sleep(0.01)
+                if os.path.exists(path):
+                    with open(path) as file:
+                        values = json.load(file)['core_tests_events_total']
+
+            self.assertIsNotNone(metrics._flush_thread)
+            self.assertEqual(values, [[['a'], 1]])
+
+
+class KeysetPaginatorTests(TestCase):
+    """Пагинация по ключу сортировки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Task.objects.bulk_create(Task(title=f'Задание {x}', description='Описание') for x in range(7))
+        # Одинаковые значения первого поля ключа упорядочиваются по идентификатору.
+        created_at = timezone.now()
+        for index, task in enumerate(Task.objects.order_by('id')):
+            Task.objects.filter(id=task.id).update(created_at=created_at - datetime.timedelta(seconds=index // 3))
+        cls.tasks = list(Task.objects.order_by('-created_at', '-id'))
+
+    def _paginator(self, **kwargs) -> KeysetPaginator:
+        return KeysetPaginator(Task.objects.all(), ordering=('-created_at', '-id'), per_page=3, **kwargs)
+
+    def test_pages(self):
+        paginator = self._paginator()
+
+        first_page = paginator.get_page()
+        self.assertEqual(list(first_page), self.tasks[:3])
+        self.assertEqual((first_page.has_previous, first_page.has_next), (False, True))
+
+        middle_page = paginator.get_page(first_page.next_cursor)
+        self.assertEqual(list(middle_page), self.tasks[3:6])
+        self.assertEqual((middle_page.has_previous, middle_page.has_next), (True, True))
+
+        last_page = paginator.get_page(middle_page.next_cursor)
+        self.assertEqual(list(last_page), self.tasks[6:])
+        self.assertEqual((last_page.has_previous, last_page.has_next), (True, False))
+
+        previous_page = paginator.get_page(last_page.previous_cursor)
+        self.assertEqual(list(previous_page), self.tasks[3:6])
+        self.assertEqual(previous_page.next_cursor, middle_page.next_cursor)
+
+        previous_page = paginator.get_page(previous_page.previous_cursor)
+        self.assertEqual(list(previous_page), self.tasks[:3])
+        self.assertEqual((previous_page.has_previous, previous_page.has_next), (False, True))
+
+    def test_single_page(self):
+        page = KeysetPaginator(Task.objects.all(), ordering=('id',), per_page=10).get_page()
+
+        self.assertEqual(list(page), sorted(self.tasks, key=lambda x: x.id))
+        self.assertFalse(page.has_other_pages)
+
+    def test_equal_keys(self):
+        paginator = KeysetPaginator(Task.objects.all(), ordering=('-created_at', 'id'), per_page=2)
+        expected_tasks = list(Task.objects.order_by('-created_at', 'id'))
+
+        tasks, cursor = [], None
+        while True:
+            page = paginator.get_page(cursor)
+            tasks.extend(page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+        self.assertEqual(tasks, expected_tasks)
+
+    def test_invalid_cursor(self):
+        paginator = self._paginator()
+        next_cursor = paginator.get_page().next_cursor
+
+        def encode(data: object) -> str:
+            return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+        for cursor in (
+            'не курсор',
+            next_cursor[:-2],
+            encode(['x', ['2024-01-01T00:00:00+00:00', '1']]),
+            encode(['n', ['не дата', '1']]),
+            encode(['n', ['2024-01-01T00:00:00+00:00']]),
+            encode({'n': 1}),
+        ):
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(InvalidCursor):
+                    paginator._decode_cursor(cursor)
+
+                page = paginator.get_page(cursor)
+                self.assertEqual(list(page), self.tasks[:3])
+                self.assertFalse(page.has_previous)
+
+    async def test_aget_page(self):
+        page = await self._paginator().aget_page()
+
+        self.assertEqual(page.object_list, self.tasks[:3])
+
+    def test_estimated_total(self):
+        page = self._paginator(with_estimated_total=True).get_page()
+
+        if connection.vendor == 'postgresql':
+            self.assertIsInstance(page.estimated_total, int)
+        else:
+            self.assertIsNone(page.estimated_total)
+            self.assertIsNone(estimate_count(Task.objects.all()))
+
+
+class WeightedSamplerTests(SimpleTestCase):
+    """Взвешенная выборка индексов по дереву Фенвика."""
+
+    def setUp(self):
+        self.rng = random.Random(0)
+
+    def _prefix_sum(self, sampler: WeightedSampler, count: int) -> float:
+        """Сумма весов первых count элементов по дереву."""
+        total = 0.0
+        while count:
+            total += sampler._tree[count]
+            count -= count & -count
+        return total
+
+    def test_prefix_sums(self):
+        for size in (1, 2, 7, 8, 9, 100):
+            weights = [self.rng.choice((0, -1, self.rng.random() * 10)) for _x in range(size)]
+            sampler = WeightedSampler(weights)
+            clipped_weights = [max(x, 0) for x in weights]
+
+            with self.subTest(size=size):
+                for count in range(size + 1):
+                    self.assertAlmostEqual(self._prefix_sum(sampler, count), math.fsum(clipped_weights[:count]))
+                self.assertAlmostEqual(sampler.total, math.fsum(clipped_weights))
+                self.assertEqual(sampler.positive_count, sum(1 for x in clipped_weights if x))
+
+    def test_find(self):
+        sampler = WeightedSampler([1, 0, 2, 0, 3, 0])
+
+        for value, index in ((0, 0), (0.99, 0), (1, 2), (2.99, 2), (3, 4), (5.99, 4), (6, 4)):
+            self.assertEqual(sampler._find(value), index)
+
+    def test_choice_distribution(self):
+        sampler = WeightedSampler([1, 0, 3])
+
+        counts = [0] * 3
+        for _x in range(4000):
+            counts[sampler.choice(self.rng)] += 1
+
+        self.assertEqual(counts[1], 0)
+        self.assertAlmostEqual(counts[2] / 4000, 0.75, delta=0.03)
+
+    def test_zero_weights(self):
+        sampler = WeightedSampler([0, 1, 0, 2, 0])
+
+        for _x in range(100):
+            self.assertIn(sampler.choice(self.rng), (1, 3))
+        self.assertEqual(sorted(sampler.sample(5, rng=self.rng)), [1, 3])
+
+        self.assertEqual(WeightedSampler([0, 0]).sample(1), [])
+        self.assertEqual(WeightedSampler([]).sample(1), [])
+        with self.assertRaises(IndexError):
+            WeightedSampler([0, 0]).choice()
+
+    def test_sample(self):
+        weights = [self.rng.choice((0, 1, 5, 100)) for _x in range(50)]
+        # Веса, сосредоточенные на одном элементе, требуют выборки без отбраковки повторов.
+        concentrated_weights = [1e6, *[1e-6] * 20]
+
+        for sampler_weights in (weights, concentrated_weights):
+            sampler = WeightedSampler(sampler_weights)
+            positive_indexes = {x for x, weight in enumerate(sampler_weights) if weight}
+            exclude = set(list(positive_indexes)[:3]) | {-1, len(sampler_weights)}
+
+            for count in (0, 1, 5, 10, len(sampler_weights), len(sampler_weights) + 1):
+                with self.subTest(weights=len(sampler_weights), count=count):
+                    indexes = sampler.sample(count, rng=self.rng)
+                    self.assertEqual(len(indexes), min(count, len(positive_indexes)))
+                    self.assertEqual(len(set(indexes)), len(indexes))
+                    self.assertLessEqual(set(indexes), positive_indexes)
+
+                    indexes = sampler.sample(count, exclude=exclude, rng=self.rng)
+                    self.assertEqual(len(indexes), min(count, len(positive_indexes - exclude)))
+                    self.assertEqual(len(set(indexes)), len(indexes))
+                    self.assertLessEqual(set(indexes), positive_indexes - exclude)
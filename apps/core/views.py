@@ -0,0 +1,25 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpRequest, HttpResponse
+from django.views.decorators.http import require_GET
+
+from apps.core.metrics import exposition
+
+
+@require_GET
+def metrics(request: HttpRequest) -> HttpResponse:
+    """
+    Метрики приложения в текстовом формате экспозиции Prometheus.
+
+    Если задан METRICS_TOKEN, запрос должен содержать заголовок Authorization: Bearer <токен>.
+    Без токена метрики доступны только в режиме отладки.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return HttpResponse(status=401, headers={'WWW-Authenticate': 'Bearer'})
+    elif not settings.DEBUG:
+        raise Http404
+
+    return HttpResponse(exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
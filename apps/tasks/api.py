@@ -0,0 +1,222 @@
+import json
+
+from django import forms
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.http import HttpRequest, JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.http import require_GET, require_POST
+
+from apps.core.decorators import api_login_required
+from apps.tasks.forms import ExamIncorrectWordAnswerForm, ExamOptionsQuestionForm
+from apps.tasks.models import (
+    EXAM_EXPIRED_MESSAGE,
+    EXAM_QUESTION_ALREADY_ANSWERED_MESSAGE,
+    EXAM_QUESTION_MODEL_BY_TYPE,
+    ExamIncorrectWordQuestion,
+    ExamOptionsQuestion,
+    QuestionTypes,
+    Task,
+    UserExam,
+)
+from apps.tasks.services.selectors.tasks import aexam_get_prev_and_next_question
+from apps.tasks.services.tasks import (
+    aexam_options_question_answer_set,
+    aexam_options_question_incorrect_word_answer_set,
+    aexam_set_finished_at,
+    exam_create_by_task,
+)
+
+
+def _errors_response(errors: dict[str, list[str]], status: int = 400) -> JsonResponse:
+    """Ответ с ошибками в формате {поле: [сообщения]}."""
+    return JsonResponse({'errors': errors}, status=status)
+
+
+def _not_found_response() -> JsonResponse:
+    """Ответ об отсутствии объекта."""
+    return _errors_response({NON_FIELD_ERRORS: ['Объект не найден']}, status=404)
+
+
+def _already_answered_response() -> JsonResponse:
+    """Ответ о том, что на вопрос уже получен ответ."""
+    return _errors_response({NON_FIELD_ERRORS: [EXAM_QUESTION_ALREADY_ANSWERED_MESSAGE]}, status=409)
+
+
+def _expired_response() -> JsonResponse:
+    """Ответ о том, что время испытания истекло."""
+    return _errors_response({NON_FIELD_ERRORS: [EXAM_EXPIRED_MESSAGE]}, status=403)
+
+
+def _form_errors(form: forms.BaseForm) -> dict[str, list[str]]:
+    """Ошибки формы в формате ответа API."""
+    return {field: [x['message'] for x in errors] for field, errors in form.errors.get_json_data().items()}
+
+
+def _validation_error_errors(exc: ValidationError) -> dict[str, list[str]]:
+    """Ошибки исключения ValidationError в формате ответа API."""
+    return exc.message_dict if hasattr(exc, 'error_dict') else {NON_FIELD_ERRORS: exc.messages}
+
+
+def _request_data(request: HttpRequest) -> dict | None:
+    """Данные запроса в формате JSON. Для некорректного тела запроса возвращает None."""
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+
+    return data if isinstance(data, dict) else None
+
+
+def _exam_payload(exam: UserExam) -> dict:
+    """Данные испытания с текущим результатом."""
+    return {
+        'id': exam.id,
+        'task_id': exam.task_id,
+        'questions_count': exam.questions_count,
+        'answered_questions_count': exam.answered_questions_count,
+        'correct_answers_count': exam.correct_answers_count,
+        'is_finished': exam.is_finished(),
+    }
+
+
+def _question_payload(question: ExamIncorrectWordQuestion | ExamOptionsQuestion) -> dict:
+    """Данные вопроса испытания. Правильный ответ не передается."""
+    payload = {
+        'type': question.QUESTION_TYPE,
+        'id': question.id,
+        'exam_id': question.exam_id,
+        'position': question.position,
+        'is_finished': question.is_finished,
+    }
+
+    if question.QUESTION_TYPE == QuestionTypes.INCORRECT_WORD:
+        payload['incorrect_word'] = question.incorrect_word
+    else:
+        payload['question'] = question.question
+        # Имена вариантов совпадают с полями формы ответа.
+        payload['options'] = [
+            {'name': f'selected_{answer_field}', 'text': getattr(question, option_field)}
+            for option_field, answer_field in question.OPTION_AND_ANSWER_PAIR_FIELDS
+            if getattr(question, option_field).strip()
+        ]
+
+    return payload
+
+
+async def _aexam_question_get(
+    request: HttpRequest, question_type: str, question_id: int
+) -> ExamIncorrectWordQuestion | ExamOptionsQuestion | None:
+    """Возвращает вопрос испытания текущего пользователя."""
+    if question_type not in QuestionTypes:
+        return None
+
+    exam_question_model = EXAM_QUESTION_MODEL_BY_TYPE[question_type]
+
+    return await exam_question_model.objects.filter(id=question_id, exam__user=request.user).afirst()
+
+
+@api_login_required
+@require_POST
+def exam_api_run(request: HttpRequest, task_id: int) -> JsonResponse:
+    """Запускает испытание, возвращает испытание и первый вопрос."""
+    task = Task.objects.filter(id=task_id).first()
+    if task is None:
+        return _not_found_response()
+
+    try:
+        exam, first_exam_question = exam_create_by_task(task=task, user=request.user)
+    except ValidationError as exc:
+        return _errors_response(_validation_error_errors(exc))
+
+    return JsonResponse(
+        {
+            'exam': _exam_payload(exam),
+            'question': _question_payload(first_exam_question) if first_exam_question else None,
+        },
+        status=201,
+    )
+
+
+@api_login_required
+@require_GET
+@ensure_csrf_cookie
+async def exam_api_question(request: HttpRequest, question_type: str, question_id: int) -> JsonResponse:
+    """
+    Возвращает вопрос испытания и текущий результат.
+
+    Устанавливает cookie с CSRF-токеном, который передается в заголовке X-CSRFToken при ответе.
+    """
+    exam_question = await _aexam_question_get(request, question_type, question_id)
+    if exam_question is None:
+        return _not_found_response()
+
+    exam = await UserExam.objects.aget(id=exam_question.exam_id)
+
+    return JsonResponse({'exam': _exam_payload(exam), 'question': _question_payload(exam_question)})
+
+
+@api_login_required
+@require_POST
+async def exam_api_answer(request: HttpRequest, question_type: str, question_id: int) -> JsonResponse:
+    """
+    Фиксирует ответ на вопрос испытания.
+
+    Возвращает правильность ответа, текущий результат и следующий вопрос, поэтому на каждый ответ
+    выполняется один запрос. После ответа на последний вопрос испытание завершается. Если ответ
+    на вопрос уже был получен, возвращается код 409, если время испытания истекло - код 403.
+    """
+    exam_question = await _aexam_question_get(request, question_type, question_id)
+    if exam_question is None:
+        return _not_found_response()
+
+    data = _request_data(request)
+    if data is None:
+        return _errors_response({NON_FIELD_ERRORS: ['Тело запроса должно быть объектом JSON']})
+
+    if exam_question.is_finished:
+        return _already_answered_response()
+
+    if question_type == QuestionTypes.OPTIONS:
+        answer_form = ExamOptionsQuestionForm(data, instance=exam_question)
+        if not answer_form.is_valid():
+            return _errors_response(_form_errors(answer_form))
+
+        is_answered = await aexam_options_question_answer_set(question=exam_question, **answer_form.cleaned_data)
+    else:
+        answer_form = ExamIncorrectWordAnswerForm(data)
+        if not answer_form.is_valid():
+            return _errors_response(_form_errors(answer_form))
+
+        is_answered = await aexam_options_question_incorrect_word_answer_set(
+            question=exam_question, letter_index=answer_form.cleaned_data['letter_index']
+        )
+
+    if not is_answered:
+        # Ответ не сохраняется после истечения времени испытания или если он был получен
+        # одновременно с текущим запросом.
+        expires_at = await UserExam.objects.filter(id=exam_question.exam_id).values_list('expires_at', flat=True).aget()
+        if expires_at and expires_at <= timezone.now():
+            return _expired_response()
+
+        return _already_answered_response()
+
+    _x, next_question_ref = await aexam_get_prev_and_next_question(question=exam_question)
+    exam = await UserExam.objects.aget(id=exam_question.exam_id)
+
+    next_question = None
+    if next_question_ref:
+        next_question = await EXAM_QUESTION_MODEL_BY_TYPE[next_question_ref.question_type].objects.aget(
+            id=next_question_ref.id
+        )
+    elif not exam.is_finished():
+        # Испытание могло быть завершено ранее, в том числе по истечении времени.
+        await aexam_set_finished_at(exam=exam)
+
+    return JsonResponse(
+        {
+            'answer_is_correct': exam_question.answer_is_correct,
+            'exam': _exam_payload(exam),
+            'next_question': _question_payload(next_question) if next_question else None,
+        }
+    )
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class TasksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.tasks'
+
+    def ready(self):
+        """Подключает обработчики сигналов и фоновых задач приложения."""
+        from apps.tasks import jobs, signals  # noqa: F401
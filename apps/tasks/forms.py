@@ -1,6 +1,10 @@
+import datetime
+
 from django import forms
+from django.utils import timezone
 
 from apps.tasks.models import ExamOptionsQuestion
+from apps.tasks.services.tasks import exam_options_question_answer_set
 
 
 class ExamOptionsQuestionForm(forms.ModelForm):
@@ -21,3 +25,75 @@ class ExamOptionsQuestionForm(forms.ModelForm):
             'selected_option2_is_true': forms.CheckboxInput(),
             'selected_option3_is_true': forms.CheckboxInput(),
         }
+
+    def save(self, commit: bool = True) -> ExamOptionsQuestion:
+        """
+        Сохраняет ответ на вопрос и учитывает его в счетчиках испытания.
+
+        Ответ сохраняется условным обновлением и не перезаписывает ранее полученный ответ.
+        """
+        if not commit:
+            return super().save(commit=False)
+
+        exam_options_question_answer_set(question=self.instance, **self.cleaned_data)
+
+        return self.instance
+
+
+class ExamIncorrectWordAnswerForm(forms.Form):
+    """Форма ответа на вопрос с некорректным словом."""
+
+    letter_index = forms.IntegerField(label='номер неправильной буквы', min_value=0)
+
+
+class ExamResultsExportForm(forms.Form):
+    """Форма параметров выгрузки результатов испытаний."""
+
+    ROWS_EXAMS = 'exams'
+    ROWS_QUESTIONS = 'questions'
+
+    rows = forms.ChoiceField(
+        label='строки выгрузки',
+        choices=((ROWS_EXAMS, 'испытания'), (ROWS_QUESTIONS, 'отвеченные вопросы')),
+        required=False,
+    )
+    task = forms.IntegerField(label='идентификатор задания', min_value=1, required=False)
+    user = forms.IntegerField(label='идентификатор пользователя', min_value=1, required=False)
+    created_from = forms.DateField(label='испытания с даты', required=False)
+    created_to = forms.DateField(label='испытания по дату включительно', required=False)
+
+    def clean(self) -> dict:
+        """Проверяет период выгрузки."""
+        cleaned_data = super().clean()
+
+        created_from, created_to = cleaned_data.get('created_from'), cleaned_data.get('created_to')
+        if created_from and created_to and created_from > created_to:
+            raise forms.ValidationError('Начало периода не может быть позже окончания')
+
+        return cleaned_data
+
+    @property
+    def per_question(self) -> bool:
+        """Выгрузка по одной строке на отвеченный вопрос."""
+        return self.cleaned_data['rows'] == self.ROWS_QUESTIONS
+
+    def get_export_filters(self) -> dict:
+        """
+        Возвращает фильтры для запросов выгрузки.
+
+        Даты переводятся в границы суток текущего часового пояса, чтобы условие
+        по дате создания испытания использовало индекс.
+        """
+        created_from, created_to = self.cleaned_data['created_from'], self.cleaned_data['created_to']
+
+        return {
+            'task_id': self.cleaned_data['task'],
+            'user_id': self.cleaned_data['user'],
+            'created_from': _day_start(created_from) if created_from else None,
+            'created_before': _day_start(created_to + datetime.timedelta(days=1)) if created_to else None,
+        }
+
+
+def _day_start(day: datetime.date) -> datetime.datetime:
+    """Начало суток в текущем часовом поясе."""
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
@@ -0,0 +1,29 @@
+from apps.core.jobs import job_handler
+from apps.tasks.models import UserExam
+from apps.tasks.services.tasks import (
+    EXAM_FINALIZE_JOB_NAME,
+    exam_result_page_cache_warm,
+    exam_results_materialize,
+    exam_set_finalized_at,
+)
+from apps.tasks.services.user_blank_weights import user_blank_weights_update
+
+
+@job_handler(EXAM_FINALIZE_JOB_NAME)
+def exam_finalize(*, exam_id: int) -> None:
+    """
+    Обрабатывает завершенное испытание.
+
+    Пересчитывает результаты испытания, обновляет веса заготовок пользователя для стратегии
+    spaced_repetition и сохраняет в общем кэше страницу результатов и снимок вопросов испытания.
+    Для удаленного или уже обработанного испытания ничего не выполняется, поэтому повторное
+    выполнение задачи не учитывает ответы в весах заготовок дважды.
+    """
+    if not exam_set_finalized_at(exam_id=exam_id):
+        return
+
+    counters_changed = exam_results_materialize(exam_id=exam_id)
+
+    exam = UserExam.objects.select_related('task').get(id=exam_id)
+    user_blank_weights_update(exam=exam)
+    exam_result_page_cache_warm(exam=exam, replace=counters_changed)
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from apps.tasks.models import UserExam
+
+
+class Command(BaseCommand):
+    """Пересчитывает счетчики вопросов и ответов испытаний."""
+
+    help = 'Пересчитывает счетчики вопросов и ответов испытаний по сохраненным вопросам.'
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды."""
+        parser.add_argument('--batch-size', type=int, default=500, help='количество испытаний в пакете')
+
+    def handle(self, *args, **options):
+        """Выполняет команду."""
+        batch_size = options['batch_size']
+        updated_count = 0
+        last_exam_id = 0
+
+        while True:
+            exam_ids = list(
+                UserExam.objects.filter(id__gt=last_exam_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not exam_ids:
+                break
+
+            # Счетчики вычисляются в БД одним запросом на пакет испытаний.
+            updated_count += (
+                UserExam.objects.filter(id__in=exam_ids)
+                .with_results()
+                .update(
+                    questions_count=F('computed_questions_count'),
+                    answered_questions_count=F('computed_answered_questions_count'),
+                    correct_answers_count=F('computed_correct_answers_count'),
+                )
+            )
+            last_exam_id = exam_ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'Обновлено испытаний: {updated_count}'))
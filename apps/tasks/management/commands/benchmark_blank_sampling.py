@@ -0,0 +1,68 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from apps.tasks.models import IncorrectWordQuestionBlank, OptionsQuestionBlank, Task
+from apps.tasks.services.selectors.blanks import BLANK_SAMPLING_STRATEGIES
+
+
+class Command(BaseCommand):
+    """Сравнивает стратегии случайной выборки заготовок вопросов."""
+
+    help = 'Сравнивает стратегии случайной выборки заготовок вопросов с загрузкой всего пула заготовок.'
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды."""
+        parser.add_argument('--task', type=int, help='идентификатор существующего задания')
+        parser.add_argument('--blanks', type=int, default=10000, help='количество заготовок каждого типа')
+        parser.add_argument('--count', type=int, default=20, help='количество выбираемых заготовок')
+        parser.add_argument('--repeat', type=int, default=20, help='количество повторов для каждой стратегии')
+
+    def handle(self, *args, **options):
+        """Выполняет команду."""
+        with transaction.atomic():
+            task = Task.objects.get(id=options['task']) if options['task'] else self._seed_task(options['blanks'])
+
+            for strategy_name, strategy in BLANK_SAMPLING_STRATEGIES.items():
+                timings = []
+                for _x in range(options['repeat']):
+                    with CaptureQueriesContext(connection) as queries:
+                        started_at = time.perf_counter()
+                        strategy(task=task, count=options['count'])
+                        timings.append(time.perf_counter() - started_at)
+
+                self.stdout.write(
+                    f'{strategy_name:>10}: median {statistics.median(timings) * 1000:.2f} ms, '
+                    f'max {max(timings) * 1000:.2f} ms, queries {len(queries)}'
+                )
+
+            # Тестовые данные не сохраняются.
+            transaction.set_rollback(True)
+
+    def _seed_task(self, blanks_count: int) -> Task:
+        """Создает задание с заготовками вопросов."""
+        task = Task.objects.create(title='benchmark', description='benchmark')
+        IncorrectWordQuestionBlank.objects.bulk_create(
+            IncorrectWordQuestionBlank(
+                task=task, correct_word=f'касса{x}', incorrect_word=f'каса{x}', incorrect_letter_index=4
+            )
+            for x in range(blanks_count)
+        )
+        OptionsQuestionBlank.objects.bulk_create(
+            OptionsQuestionBlank(
+                task=task,
+                question=f'вопрос {x}',
+                option1='да',
+                option1_is_true=True,
+                option2='нет',
+                option2_is_true=False,
+                option3='возможно',
+                option3_is_true=False,
+            )
+            for x in range(blanks_count)
+        )
+
+        return task
@@ -0,0 +1,62 @@
+import statistics
+import time
+
+from django.core.handlers.base import BaseHandler
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from apps.tasks.models import Task
+
+
+class Command(BaseCommand):
+    """Сравнивает задержку запроса к БД с постоянными соединениями и без них."""
+
+    help = (
+        'Имитирует жизненный цикл HTTP-запроса (сигналы request_started и request_finished, при которых '
+        'Django открывает и закрывает соединения) с одним запросом к БД и сравнивает задержку '
+        'при соединении на каждый запрос и постоянных соединениях.'
+    )
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды."""
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='псевдоним БД')
+        parser.add_argument('--requests', type=int, default=200, help='количество запросов в каждом режиме')
+
+    def handle(self, *args, **options):
+        """Выполняет команду."""
+        connection = connections[options['database']]
+        settings_dict = connection.settings_dict
+        original_settings = {x: settings_dict[x] for x in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+
+        modes = [
+            ('соединение на запрос', {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}),
+            ('постоянное соединение', {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': False}),
+            ('постоянное соединение с проверкой', {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True}),
+        ]
+
+        try:
+            for mode_name, mode_settings in modes:
+                connection.close()
+                settings_dict.update(mode_settings)
+
+                timings = [self._request(connection.alias) for _x in range(options['requests'])]
+                self.stdout.write(
+                    f'{mode_name:>34}: median {statistics.median(timings) * 1000:.2f} ms, '
+                    f'p95 {statistics.quantiles(timings, n=100)[94] * 1000:.2f} ms, '
+                    f'max {max(timings) * 1000:.2f} ms'
+                )
+        finally:
+            connection.close()
+            settings_dict.update(original_settings)
+
+    @staticmethod
+    def _request(database: str) -> float:
+        """Выполняет имитацию запроса, возвращает его длительность."""
+        started_at = time.perf_counter()
+
+        request_started.send(sender=BaseHandler)
+        Task.objects.using(database).order_by('id').first()
+        request_finished.send(sender=BaseHandler)
+
+        return time.perf_counter() - started_at
@@ -0,0 +1,213 @@
+import asyncio
+import io
+import itertools
+import statistics
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.urls import reverse
+
+from apps.tasks.models import (
+    EXAM_QUESTION_MODEL_BY_TYPE,
+    IncorrectWordQuestionBlank,
+    OptionsQuestionBlank,
+    Task,
+    UserExam,
+)
+from apps.tasks.services.tasks import exam_create_by_task
+
+
+class Command(BaseCommand):
+    """Сравнивает обработку страниц испытания синхронным (WSGI) и асинхронным (ASGI) обработчиком."""
+
+    help = (
+        'Выполняет одинаковую нагрузку на страницы вопроса, результатов и списка испытаний через '
+        'WSGI-приложение с пулом потоков и через ASGI-приложение в одном цикле событий. Приложения '
+        'вызываются в процессе команды без сетевого сервера, тестовые данные удаляются после замера.'
+    )
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды."""
+        parser.add_argument('--requests', type=int, default=600, help='количество запросов в каждом режиме')
+        parser.add_argument('--concurrency', type=int, default=50, help='количество одновременных запросов')
+        parser.add_argument('--questions', type=int, default=20, help='количество вопросов в испытании')
+        parser.add_argument('--host', default='localhost', help='значение заголовка Host, разрешенное в ALLOWED_HOSTS')
+
+    def handle(self, *args, **options):
+        """Выполняет команду."""
+        if options['questions'] < 2:
+            raise CommandError('В испытании должно быть не меньше двух вопросов')
+
+        user, task = self._seed(options['questions'])
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        try:
+            _x, first_question = exam_create_by_task(task=task, user=user)
+            urls = [
+                reverse('exam_question', args=(first_question.QUESTION_TYPE, first_question.id)),
+                reverse('exam_result', args=(first_question.exam_id,)),
+                reverse('exam_list'),
+            ]
+            urls_sequence = list(itertools.islice(itertools.cycle(urls), options['requests']))
+            self._login(session, user)
+            cookie = f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+            for mode, run in (('WSGI', self._run_wsgi), ('ASGI', self._run_asgi)):
+                started_at = time.perf_counter()
+                timings = run(urls_sequence, host=options['host'], cookie=cookie, concurrency=options['concurrency'])
+                self._report(mode, timings, time.perf_counter() - started_at)
+        finally:
+            session.delete()
+            self._cleanup(user, task)
+
+    @staticmethod
+    def _run_wsgi(urls: list[str], *, host: str, cookie: str, concurrency: int) -> list[float]:
+        """Выполняет запросы к WSGI-приложению, по одному потоку на одновременный запрос."""
+        application = get_wsgi_application()
+
+        def request(url: str) -> float:
+            environ = {
+                'REQUEST_METHOD': 'GET',
+                'SCRIPT_NAME': '',
+                'PATH_INFO': url,
+                'QUERY_STRING': '',
+                'SERVER_NAME': host,
+                'SERVER_PORT': '80',
+                'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': host,
+                'HTTP_COOKIE': cookie,
+                'wsgi.input': io.BytesIO(),
+                'wsgi.errors': sys.stderr,
+                'wsgi.url_scheme': 'http',
+            }
+            statuses = []
+
+            started_at = time.perf_counter()
+            response = application(environ, lambda status, headers: statuses.append(status))
+            b''.join(response)
+            response.close()
+            elapsed = time.perf_counter() - started_at
+
+            if not statuses[0].startswith('200'):
+                raise CommandError(f'{url}: код ответа {statuses[0]}')
+
+            return elapsed
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(request, urls))
+
+    @staticmethod
+    def _run_asgi(urls: list[str], *, host: str, cookie: str, concurrency: int) -> list[float]:
+        """Выполняет запросы к ASGI-приложению в одном цикле событий."""
+        application = get_asgi_application()
+
+        async def request(url: str, semaphore: asyncio.Semaphore) -> float:
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': 'GET',
+                'scheme': 'http',
+                'path': url,
+                'query_string': b'',
+                'root_path': '',
+                'headers': [(b'host', host.encode()), (b'cookie', cookie.encode())],
+                'client': ('127.0.0.1', 0),
+                'server': (host, 80),
+            }
+            request_sent = False
+            response_finished = asyncio.Event()
+            statuses = []
+
+            async def receive() -> dict:
+                nonlocal request_sent
+                if not request_sent:
+                    request_sent = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+                # Клиент не отключается до получения ответа.
+                await response_finished.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message: dict) -> None:
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+                elif not message.get('more_body'):
+                    response_finished.set()
+
+            async with semaphore:
+                started_at = time.perf_counter()
+                await application(scope, receive, send)
+                elapsed = time.perf_counter() - started_at
+
+            if statuses[0] != 200:
+                raise CommandError(f'{url}: код ответа {statuses[0]}')
+
+            return elapsed
+
+        async def run() -> list[float]:
+            semaphore = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(*(request(x, semaphore) for x in urls))
+
+        return asyncio.run(run())
+
+    def _report(self, mode: str, timings: list[float], total_time: float) -> None:
+        """Выводит результаты замера."""
+        percentiles = statistics.quantiles(timings, n=100)
+        self.stdout.write(
+            f'{mode}: {len(timings) / total_time:.1f} req/s, median {statistics.median(timings) * 1000:.2f} ms, '
+            f'p95 {percentiles[94] * 1000:.2f} ms, max {max(timings) * 1000:.2f} ms'
+        )
+
+    @staticmethod
+    def _seed(questions_count: int) -> tuple[User, Task]:
+        """Создает пользователя и задание с заготовками вопросов."""
+        user = User.objects.create_user(username=f'benchmark-{uuid.uuid4().hex[:12]}')
+        task = Task.objects.create(title='benchmark', description='benchmark', max_questions_count=questions_count)
+        IncorrectWordQuestionBlank.objects.bulk_create(
+            IncorrectWordQuestionBlank(
+                task=task, correct_word=f'касса{x}', incorrect_word=f'каса{x}', incorrect_letter_index=4
+            )
+            for x in range(questions_count)
+        )
+        OptionsQuestionBlank.objects.bulk_create(
+            OptionsQuestionBlank(
+                task=task,
+                question=f'вопрос {x}',
+                option1='да',
+                option1_is_true=True,
+                option2='нет',
+                option2_is_true=False,
+                option3='возможно',
+                option3_is_true=False,
+            )
+            for x in range(questions_count)
+        )
+
+        return user, task
+
+    @staticmethod
+    def _login(session, user: User) -> None:
+        """Сохраняет сессию авторизованного пользователя."""
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+
+    @staticmethod
+    def _cleanup(user: User, task: Task) -> None:
+        """Удаляет тестовые данные."""
+        for exam_question_model in EXAM_QUESTION_MODEL_BY_TYPE.values():
+            exam_question_model.objects.filter(exam__user=user).delete()
+
+        UserExam.objects.filter(user=user).delete()
+        task.delete()
+        user.delete()
@@ -0,0 +1,396 @@
+import json
+import logging
+import platform
+import random
+import statistics
+import time
+import uuid
+from collections import defaultdict
+from collections.abc import Callable
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.core.models import Job
+from apps.core.testing import response_request_metrics
+from apps.tasks.jobs import exam_finalize
+from apps.tasks.models import (
+    EXAM_QUESTION_MODEL_BY_TYPE,
+    ExamIncorrectWordQuestion,
+    ExamOptionsQuestion,
+    IncorrectWordQuestionBlank,
+    OptionsQuestionBlank,
+    QuestionTypes,
+    Task,
+    UserExam,
+    UserExamResults,
+)
+from apps.tasks.services.selectors.blanks import BLANK_SAMPLING_STRATEGIES
+from apps.tasks.services.selectors.tasks import exam_get_prev_and_next_question, exam_get_questions
+from apps.tasks.services.tasks import (
+    EXAM_FINALIZE_JOB_NAME,
+    exam_create_by_task,
+    exam_options_question_answer_set,
+    exam_options_question_incorrect_word_answer_set,
+    exam_set_finished_at,
+)
+
+# Базовые результаты замеров, хранятся в репозитории.
+DEFAULT_BASELINE_PATH = Path(settings.BASE_DIR) / 'benchmarks' / 'exams_baseline.json'
+# Рост медианы длительности между наименьшим и наибольшим набором данных, считающийся деградацией:
+# во сколько раз и не меньше чем на сколько миллисекунд (быстрые операции заметно колеблются).
+SCALING_MAX_RATIO = 2.0
+SCALING_MIN_DIFFERENCE_MS = 1.0
+
+
+class Command(BaseCommand):
+    """Замеряет операции жизненного цикла испытания на тестовом наборе данных."""
+
+    help = (
+        'Создает набор данных (задания с заготовками, пользователи, испытания) и замеряет создание испытания, '
+        'сервисы ответа, соседние вопросы, результаты испытания, страницы через тестовый клиент, завершение '
+        'испытания и его фоновую обработку. Для каждой операции выводятся процентили длительности и количество '
+        'запросов к БД. Замер повторяется для каждого размера набора из --exams, чтобы выявить деградацию с ростом '
+        'данных. Результаты сравниваются с базовыми (--baseline) и могут быть сохранены в JSON (--output). '
+        'Тестовые данные удаляются.'
+    )
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды."""
+        parser.add_argument('--tasks', type=int, default=3, help='количество заданий')
+        parser.add_argument('--blanks', type=int, default=200, help='количество заготовок каждого типа в задании')
+        parser.add_argument('--questions', type=int, default=10, help='количество вопросов в испытании')
+        parser.add_argument('--users', type=int, default=5, help='количество пользователей')
+        parser.add_argument(
+            '--exams', type=int, nargs='+', default=[2, 20], help='размеры набора: испытаний на пользователя'
+        )
+        parser.add_argument('--repeat', type=int, default=20, help='количество повторов каждой операции')
+        parser.add_argument('--seed', type=int, default=0, help='начальное значение генератора случайных чисел')
+        parser.add_argument(
+            '--strategy',
+            choices=BLANK_SAMPLING_STRATEGIES,
+            help='стратегия выборки заготовок, по умолчанию - из настройки TASKS_BLANK_SAMPLING_STRATEGY',
+        )
+        parser.add_argument('--host', default='localhost', help='значение заголовка Host, разрешенное в ALLOWED_HOSTS')
+        parser.add_argument('--output', help='путь к файлу JSON для сохранения результатов')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE_PATH), help='путь к базовым результатам')
+        parser.add_argument(
+            '--threshold', type=float, default=0.5, help='допустимое относительное увеличение медианы длительности'
+        )
+        parser.add_argument(
+            '--fail-on-regression', action='store_true', help='завершаться с ошибкой при ухудшении относительно базы'
+        )
+
+    def handle(self, *args, **options):
+        """Выполняет команду."""
+        if options['repeat'] < 2:
+            raise CommandError('Количество повторов должно быть не меньше двух')
+
+        random.seed(options['seed'])
+        options['strategy'] = options['strategy'] or getattr(settings, 'TASKS_BLANK_SAMPLING_STRATEGY', 'ids')
+        run_id = uuid.uuid4().hex[:12]
+        requests_logger = logging.getLogger('apps.core.requests')
+        requests_log_level = requests_logger.level
+        # Строки журнала показателей запросов не выводятся, предупреждения о бюджетах запросов остаются.
+        requests_logger.setLevel(logging.WARNING)
+
+        tasks, users = [], []
+        try:
+            with override_settings(TASKS_BLANK_SAMPLING_STRATEGY=options['strategy']):
+                tasks, users = self._seed(run_id, options)
+
+                runs = []
+                seeded_exams = 0
+                for exams_per_user in sorted(set(options['exams'])):
+                    self._seed_finished_exams(tasks, users, exams_per_user - seeded_exams)
+                    seeded_exams = exams_per_user
+
+                    self.stdout.write(f'Испытаний на пользователя: {exams_per_user}')
+                    operations = self._measure(tasks, users, options)
+                    self._write_operations(operations)
+                    runs.append({'exams_per_user': exams_per_user, 'operations': operations})
+        finally:
+            requests_logger.setLevel(requests_log_level)
+            self._cleanup(tasks, users)
+
+        report = {
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+            },
+            'parameters': {
+                x: options[x] for x in ('tasks', 'blanks', 'questions', 'users', 'exams', 'repeat', 'seed', 'strategy')
+            },
+            'runs': runs,
+        }
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, ensure_ascii=False, indent=2) + '\n')
+
+        problems = self._scaling_problems(runs)
+        baseline_path = Path(options['baseline'])
+        if baseline_path.exists() and not (options['output'] and baseline_path.samefile(options['output'])):
+            baseline = json.loads(baseline_path.read_text())
+            if baseline.get('parameters') == report['parameters']:
+                problems += self._baseline_problems(runs, baseline, options['threshold'])
+            else:
+                self.stderr.write(f'Параметры базовых результатов {baseline_path} отличаются, сравнение не выполняется')
+
+        for problem in problems:
+            self.stderr.write(self.style.WARNING(problem))
+
+        if problems and options['fail_on_regression']:
+            raise CommandError(f'Обнаружено ухудшений: {len(problems)}')
+
+    def _seed(self, run_id: str, options: dict) -> tuple[list[Task], list[User]]:
+        """Создает задания с заготовками и пользователей."""
+        tasks = []
+        for task_number in range(options['tasks']):
+            task = Task.objects.create(
+                title=f'benchmark-{run_id}-{task_number}',
+                description='benchmark',
+                max_questions_count=options['questions'],
+            )
+            IncorrectWordQuestionBlank.objects.bulk_create(
+                IncorrectWordQuestionBlank(
+                    task=task, correct_word=f'касса{x}', incorrect_word=f'каса{x}', incorrect_letter_index=4
+                )
+                for x in range(options['blanks'])
+            )
+            OptionsQuestionBlank.objects.bulk_create(
+                OptionsQuestionBlank(
+                    task=task,
+                    question=f'вопрос {x}',
+                    option1='да',
+                    option1_is_true=True,
+                    option2='нет',
+                    option2_is_true=False,
+                    option3='возможно',
+                    option3_is_true=False,
+                )
+                for x in range(options['blanks'])
+            )
+            tasks.append(task)
+
+        users = [User.objects.create_user(username=f'benchmark-{run_id}-{x}') for x in range(options['users'])]
+
+        return tasks, users
+
+    @staticmethod
+    def _seed_finished_exams(tasks: list[Task], users: list[User], exams_per_user: int) -> None:
+        """Создает завершенные испытания пользователей, на все вопросы которых получены верные ответы."""
+        exam_ids = [
+            exam_create_by_task(task=random.choice(tasks), user=user)[0].id
+            for user in users
+            for _x in range(exams_per_user)
+        ]
+
+        now = timezone.now()
+        ExamIncorrectWordQuestion.objects.filter(exam_id__in=exam_ids).update(
+            finished_at=now, selected_letter_index=F('incorrect_letter_index')
+        )
+        ExamOptionsQuestion.objects.filter(exam_id__in=exam_ids).update(
+            finished_at=now,
+            selected_option1_is_true=F('option1_is_true'),
+            selected_option2_is_true=F('option2_is_true'),
+            selected_option3_is_true=F('option3_is_true'),
+        )
+        UserExam.objects.filter(id__in=exam_ids).update(
+            finished_at=now,
+            answered_questions_count=F('questions_count'),
+            correct_answers_count=F('questions_count'),
+        )
+
+    def _measure(self, tasks: list[Task], users: list[User], options: dict) -> dict[str, dict]:
+        """Замеряет операции испытания, возвращает показатели по именам операций."""
+        timings, queries = defaultdict(list), defaultdict(list)
+
+        def measure_service(name: str, func: Callable, **kwargs) -> object:
+            with CaptureQueriesContext(connection) as captured_queries:
+                started_at = time.perf_counter()
+                result = func(**kwargs)
+                timings[name].append(time.perf_counter() - started_at)
+            queries[name].append(len(captured_queries))
+
+            return result
+
+        def measure_view(name: str, client: Client, method: str, url: str, data: dict | None = None):
+            started_at = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            timings[name].append(time.perf_counter() - started_at)
+            queries[name].append(response_request_metrics(response).queries_count)
+
+            if response.status_code not in (200, 302):
+                raise CommandError(f'{url}: код ответа {response.status_code}')
+
+            return response
+
+        clients = []
+        for user in users:
+            client = Client(SERVER_NAME=options['host'])
+            client.force_login(user)
+            clients.append(client)
+
+        for repeat_number in range(options['repeat']):
+            user, client = users[repeat_number % len(users)], clients[repeat_number % len(users)]
+            task = tasks[repeat_number % len(tasks)]
+
+            # Сервисы.
+            exam, _x = measure_service('exam_create_by_task', exam_create_by_task, task=task, user=user)
+            questions = exam_get_questions(exam)
+            measure_service(
+                'exam_get_prev_and_next_question',
+                exam_get_prev_and_next_question,
+                question=questions[len(questions) // 2],
+            )
+
+            question = next(x for x in questions if isinstance(x, ExamIncorrectWordQuestion))
+            measure_service(
+                'exam_options_question_incorrect_word_answer_set',
+                exam_options_question_incorrect_word_answer_set,
+                question=question,
+                letter_index=question.incorrect_letter_index,
+            )
+            question = next(x for x in questions if isinstance(x, ExamOptionsQuestion))
+            measure_service(
+                'exam_options_question_answer_set',
+                exam_options_question_answer_set,
+                question=question,
+                selected_option1_is_true=question.option1_is_true,
+                selected_option2_is_true=question.option2_is_true,
+                selected_option3_is_true=question.option3_is_true,
+            )
+            measure_service(
+                'UserExamResults',
+                lambda exam_id: UserExamResults(exam=UserExam.objects.get(id=exam_id)),
+                exam_id=exam.id,
+            )
+
+            # Страницы.
+            measure_view('view:task_list', client, 'get', reverse('task_list'))
+            measure_view('view:task_detail', client, 'get', reverse('task_detail', args=(task.id,)))
+            response = measure_view('view:exam_run', client, 'get', reverse('exam_run', args=(task.id,)))
+            question_url = response.url
+            measure_view('view:exam_question', client, 'get', question_url)
+
+            # Первый вопрос может быть любого типа, ответ на него замеряется как одна операция.
+            question_type, question_id = question_url.rstrip('/').split('/')[-2:]
+            if question_type == QuestionTypes.OPTIONS:
+                measure_view('view:exam_answer', client, 'post', question_url, {'selected_option1_is_true': 'on'})
+            else:
+                answer_url = reverse('exam_question_incorrect_word_answer', args=(question_id, 0))
+                measure_view('view:exam_answer', client, 'get', answer_url)
+
+            measure_view('view:exam_result', client, 'get', reverse('exam_result', args=(exam.id,)))
+            measure_view('view:exam_list', client, 'get', reverse('exam_list'))
+
+            # Завершение испытания и обработчик фоновой задачи, который выполняется командой run_jobs.
+            # Обработчик вызывается напрямую, чтобы не выполнять другие задачи из очереди.
+            measure_service('exam_set_finished_at', transaction.atomic(exam_set_finished_at), exam=exam)
+            measure_service('job:exam_finalize', transaction.atomic(exam_finalize), exam_id=exam.id)
+            Job.objects.filter(name=EXAM_FINALIZE_JOB_NAME, payload__exam_id=exam.id).delete()
+
+        return {name: self._summary(timings[name], queries[name]) for name in timings}
+
+    @staticmethod
+    def _summary(timings: list[float], queries: list[int]) -> dict:
+        """Возвращает процентили длительности (мс) и количество запросов к БД операции."""
+        percentiles = statistics.quantiles(timings, n=100, method='inclusive')
+
+        return {
+            'count': len(timings),
+            'p50_ms': round(statistics.median(timings) * 1000, 3),
+            'p95_ms': round(percentiles[94] * 1000, 3),
+            'p99_ms': round(percentiles[98] * 1000, 3),
+            'max_ms': round(max(timings) * 1000, 3),
+            'queries_max': max(queries),
+            'queries_mean': round(statistics.mean(queries), 2),
+        }
+
+    def _write_operations(self, operations: dict[str, dict]) -> None:
+        """Выводит показатели операций."""
+        for name, summary in operations.items():
+            self.stdout.write(
+                f'  {name}: p50 {summary["p50_ms"]:.2f} ms, p95 {summary["p95_ms"]:.2f} ms, '
+                f'p99 {summary["p99_ms"]:.2f} ms, max {summary["max_ms"]:.2f} ms, '
+                f'queries {summary["queries_mean"]:g} (max {summary["queries_max"]})'
+            )
+
+    @staticmethod
+    def _scaling_problems(runs: list[dict]) -> list[str]:
+        """Возвращает описания операций, показатели которых ухудшаются с ростом объема данных."""
+        if len(runs) < 2:
+            return []
+
+        problems = []
+        smallest, largest = runs[0], runs[-1]
+        for name, summary in largest['operations'].items():
+            base_summary = smallest['operations'].get(name)
+            if base_summary is None:
+                continue
+
+            if summary['queries_max'] > base_summary['queries_max']:
+                problems.append(
+                    f'{name}: количество запросов растет с объемом данных '
+                    f'({base_summary["queries_max"]} -> {summary["queries_max"]})'
+                )
+            if (
+                summary['p50_ms'] > base_summary['p50_ms'] * SCALING_MAX_RATIO
+                and summary['p50_ms'] - base_summary['p50_ms'] > SCALING_MIN_DIFFERENCE_MS
+            ):
+                problems.append(
+                    f'{name}: медиана длительности растет с объемом данных '
+                    f'({base_summary["p50_ms"]:.2f} ms -> {summary["p50_ms"]:.2f} ms)'
+                )
+
+        return problems
+
+    @staticmethod
+    def _baseline_problems(runs: list[dict], baseline: dict, threshold: float) -> list[str]:
+        """Возвращает описания операций, показатели которых хуже базовых."""
+        baseline_runs = {x['exams_per_user']: x['operations'] for x in baseline.get('runs', [])}
+
+        problems = []
+        for run in runs:
+            baseline_operations = baseline_runs.get(run['exams_per_user'], {})
+            for name, summary in run['operations'].items():
+                base_summary = baseline_operations.get(name)
+                if base_summary is None:
+                    continue
+
+                prefix = f'{name} ({run["exams_per_user"]} испытаний на пользователя)'
+                if summary['queries_max'] > base_summary['queries_max']:
+                    problems.append(
+                        f'{prefix}: запросов больше базового ({base_summary["queries_max"]} -> {summary["queries_max"]})'
+                    )
+                if summary['p50_ms'] > base_summary['p50_ms'] * (1 + threshold):
+                    problems.append(
+                        f'{prefix}: медиана длительности больше базовой '
+                        f'({base_summary["p50_ms"]:.2f} ms -> {summary["p50_ms"]:.2f} ms)'
+                    )
+
+        return problems
+
+    @staticmethod
+    def _cleanup(tasks: list[Task], users: list[User]) -> None:
+        """Удаляет тестовые данные."""
+        for exam_question_model in EXAM_QUESTION_MODEL_BY_TYPE.values():
+            exam_question_model.objects.filter(exam__user__in=users).delete()
+
+        exam_ids = list(UserExam.objects.filter(user__in=users).values_list('id', flat=True))
+        Job.objects.filter(name=EXAM_FINALIZE_JOB_NAME, payload__exam_id__in=exam_ids).delete()
+        UserExam.objects.filter(id__in=exam_ids).delete()
+        for blank_model in (IncorrectWordQuestionBlank, OptionsQuestionBlank):
+            blank_model.objects.filter(task__in=tasks).delete()
+        Task.objects.filter(id__in=[x.id for x in tasks]).delete()
+        User.objects.filter(id__in=[x.id for x in users]).delete()
@@ -0,0 +1,58 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.streaming import csv_lines
+from apps.tasks.forms import ExamResultsExportForm
+from apps.tasks.services.selectors.exam_results import (
+    EXAM_QUESTION_RESULTS_EXPORT_COLUMNS,
+    EXAM_RESULTS_EXPORT_COLUMNS,
+    exam_question_results_export_queryset,
+    exam_results_export_queryset,
+)
+
+
+class Command(BaseCommand):
+    """Выгружает результаты испытаний в CSV."""
+
+    help = (
+        'Выгружает результаты испытаний в CSV: по строке на испытание или на отвеченный вопрос. '
+        'Показатели вычисляются в БД, строки читаются частями, поэтому потребление памяти '
+        'не зависит от количества испытаний.'
+    )
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды."""
+        parser.add_argument('path', help='путь к файлу, "-" - стандартный вывод')
+        parser.add_argument(
+            '--rows', choices=(ExamResultsExportForm.ROWS_EXAMS, ExamResultsExportForm.ROWS_QUESTIONS), default=''
+        )
+        parser.add_argument('--task', type=int, help='идентификатор задания')
+        parser.add_argument('--user', type=int, help='идентификатор пользователя')
+        parser.add_argument('--created-from', help='испытания с даты (ГГГГ-ММ-ДД)')
+        parser.add_argument('--created-to', help='испытания по дату включительно (ГГГГ-ММ-ДД)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='количество строк в части выборки')
+
+    def handle(self, *args, **options):
+        """Выполняет команду."""
+        form = ExamResultsExportForm(
+            {x: options[x] for x in ('rows', 'task', 'user', 'created_from', 'created_to') if options[x] is not None}
+        )
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+
+        if form.per_question:
+            queryset = exam_question_results_export_queryset(**form.get_export_filters())
+            header = EXAM_QUESTION_RESULTS_EXPORT_COLUMNS
+        else:
+            queryset = exam_results_export_queryset(**form.get_export_filters())
+            header = EXAM_RESULTS_EXPORT_COLUMNS
+
+        lines = csv_lines(queryset.iterator(chunk_size=options['chunk_size']), header=header)
+
+        if options['path'] == '-':
+            sys.stdout.writelines(lines)
+            return
+
+        with open(options['path'], 'w', encoding='utf-8', newline='') as file:
+            file.writelines(lines)
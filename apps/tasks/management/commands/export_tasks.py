@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from apps.tasks.services.task_banks import TASK_BANK_FORMATS, task_bank_rows
+
+
+class Command(BaseCommand):
+    """Выгружает банк заданий и заготовок вопросов в файл."""
+
+    help = (
+        'Выгружает задания и заготовки вопросов в файл JSON Lines или CSV. Строки читаются из БД частями, '
+        'поэтому потребление памяти не зависит от размера банка. Файл загружается командой import_tasks.'
+    )
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды."""
+        parser.add_argument('path', help='путь к файлу, "-" - стандартный вывод')
+        parser.add_argument('--format', choices=TASK_BANK_FORMATS, help='формат файла, по умолчанию по расширению')
+        parser.add_argument('--task', type=int, action='append', dest='task_ids', help='идентификатор задания')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='количество строк в части выборки')
+
+    def handle(self, *args, **options):
+        """Выполняет команду."""
+        path = options['path']
+        file_format = options['format'] or ('csv' if Path(path).suffix.lower() == '.csv' else 'jsonl')
+        _x, lines_func = TASK_BANK_FORMATS[file_format]
+
+        rows = task_bank_rows(task_ids=options['task_ids'], chunk_size=options['chunk_size'])
+
+        if path == '-':
+            sys.stdout.writelines(lines_func(rows))
+            return
+
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            file.writelines(lines_func(rows))
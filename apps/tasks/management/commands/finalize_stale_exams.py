@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from apps.tasks.services.tasks import exams_expired_finish
+
+
+class Command(BaseCommand):
+    """Завершает испытания, время прохождения которых истекло."""
+
+    help = (
+        'Завершает испытания заданий с ограничением времени, не завершенные до истечения срока. Время '
+        'завершения устанавливается равным сроку, результаты обрабатываются фоновыми задачами (run_jobs). '
+        'Испытания отбираются по частичному индексу и обновляются пакетами, поэтому команду можно '
+        'запускать каждую минуту при любом количестве испытаний.'
+    )
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды."""
+        parser.add_argument('--batch-size', type=int, default=1000, help='количество испытаний в пакете')
+        parser.add_argument('--max-batches', type=int, help='максимальное количество пакетов за запуск')
+
+    def handle(self, *args, **options):
+        """Выполняет команду."""
+        finished_count = exams_expired_finish(batch_size=options['batch_size'], max_batches=options['max_batches'])
+
+        self.stdout.write(f'Завершено испытаний: {finished_count}')
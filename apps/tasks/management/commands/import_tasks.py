@@ -0,0 +1,48 @@
+import sys
+import time
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.tasks.services.task_banks import TASK_BANK_FORMATS, task_bank_import
+
+
+class Command(BaseCommand):
+    """Загружает банк заданий и заготовок вопросов из файла."""
+
+    help = (
+        'Загружает задания и заготовки вопросов из файла JSON Lines или CSV в формате команды export_tasks. '
+        'Файл читается потоком, заготовки проверяются и сохраняются пакетами. Задания из файла создаются '
+        'как новые, task_id заготовки, отсутствующий среди заданий файла, ссылается на существующее задание. '
+        'При ошибке не сохраняется ничего.'
+    )
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды."""
+        parser.add_argument('path', help='путь к файлу, "-" - стандартный ввод')
+        parser.add_argument('--format', choices=TASK_BANK_FORMATS, help='формат файла, по умолчанию по расширению')
+        parser.add_argument('--batch-size', type=int, default=1000, help='количество заготовок в пакете')
+
+    def handle(self, *args, **options):
+        """Выполняет команду."""
+        path = options['path']
+        file_format = options['format'] or ('csv' if Path(path).suffix.lower() == '.csv' else 'jsonl')
+        rows_func, _x = TASK_BANK_FORMATS[file_format]
+
+        started_at = time.perf_counter()
+        try:
+            if path == '-':
+                created_counts = task_bank_import(rows=rows_func(sys.stdin), batch_size=options['batch_size'])
+            else:
+                with open(path, encoding='utf-8', newline='') as file:
+                    created_counts = task_bank_import(rows=rows_func(file), batch_size=options['batch_size'])
+        except OSError as exc:
+            raise CommandError(f'Не удалось прочитать файл: {exc}') from exc
+        except ValidationError as exc:
+            raise CommandError('\n'.join(exc.messages)) from exc
+
+        created = ', '.join(f'{row_type}: {count}' for row_type, count in created_counts.items()) or 'нет'
+        self.stdout.write(
+            self.style.SUCCESS(f'Создано объектов ({created}) за {time.perf_counter() - started_at:.1f} с')
+        )
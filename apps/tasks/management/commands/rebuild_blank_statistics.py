@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from apps.tasks.services.blank_statistics import blank_statistics_rebuild
+
+
+class Command(BaseCommand):
+    """Пересчитывает статистику заготовок по ответам на вопросы испытаний."""
+
+    help = (
+        'Пересчитывает статистику ответов на вопросы, созданные из заготовок, по всем ответам '
+        'или по ответам на вопросы одного задания. Ответы группируются в БД и сохраняются частями. '
+        'Статистика пересчитывается в одной транзакции, ответы, полученные во время пересчета, '
+        'могут не попасть в результат, поэтому команду лучше выполнять при низкой нагрузке.'
+    )
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды."""
+        parser.add_argument('--task', type=int, help='идентификатор задания')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='количество строк в части выборки')
+
+    def handle(self, *args, **options):
+        """Выполняет команду."""
+        created_count = blank_statistics_rebuild(task_id=options['task'], chunk_size=options['chunk_size'])
+
+        self.stdout.write(f'Строк статистики: {created_count}')
@@ -0,0 +1,16 @@
+from apps.core.metrics import Counter, Histogram
+
+EXAMS_STARTED = Counter('tasks_exams_started_total', 'Количество запущенных испытаний.')
+EXAMS_FINISHED = Counter('tasks_exams_finished_total', 'Количество завершенных испытаний.')
+EXAMS_EXPIRED = Counter('tasks_exams_expired_total', 'Количество испытаний, завершенных по истечении времени.')
+EXAM_CREATE_SECONDS = Histogram('tasks_exam_create_seconds', 'Длительность создания испытания, секунд.')
+EXAM_ANSWERS = Counter(
+    'tasks_exam_answers_total',
+    'Количество ответов на вопросы испытаний по типу вопроса и результату (correct, incorrect, rejected).',
+    labelnames=('question_type', 'result'),
+)
+EXAM_ANSWER_SECONDS = Histogram(
+    'tasks_exam_answer_seconds',
+    'Длительность сохранения ответа на вопрос испытания без фиксации транзакции, секунд.',
+    labelnames=('question_type',),
+)
@@ -0,0 +1,68 @@
+import itertools
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def fill_exam_question_positions(apps, schema_editor):
+    """Нумерует вопросы существующих испытаний в порядке добавления."""
+    user_exam_model = apps.get_model('tasks', 'UserExam')
+    exam_question_models = (
+        apps.get_model('tasks', 'ExamIncorrectWordQuestion'),
+        apps.get_model('tasks', 'ExamOptionsQuestion'),
+    )
+
+    exam_ids = list(user_exam_model.objects.order_by('id').values_list('id', flat=True))
+
+    for batch_start in range(0, len(exam_ids), BATCH_SIZE):
+        batch_exam_ids = exam_ids[batch_start : batch_start + BATCH_SIZE]
+
+        questions = sorted(
+            (exam_id, created_at, model_index, question_id)
+            for model_index, model in enumerate(exam_question_models)
+            for exam_id, created_at, question_id in model.objects.filter(exam_id__in=batch_exam_ids).values_list(
+                'exam_id', 'created_at', 'id'
+            )
+        )
+
+        updated_questions = [[] for _x in exam_question_models]
+        for _exam_id, exam_questions in itertools.groupby(questions, key=lambda x: x[0]):
+            for position, (_x, _y, model_index, question_id) in enumerate(exam_questions, start=1):
+                updated_questions[model_index].append(
+                    exam_question_models[model_index](id=question_id, position=position)
+                )
+
+        for model, model_questions in zip(exam_question_models, updated_questions, strict=True):
+            model.objects.bulk_update(model_questions, ['position'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examincorrectwordquestion',
+            name='position',
+            field=models.PositiveIntegerField(default=0, verbose_name='порядковый номер в испытании'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='examoptionsquestion',
+            name='position',
+            field=models.PositiveIntegerField(default=0, verbose_name='порядковый номер в испытании'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_exam_question_positions, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='examincorrectwordquestion',
+            index=models.Index(fields=['exam', 'position'], name='tasks_examiwq_exam_position'),
+        ),
+        migrations.AddIndex(
+            model_name='examoptionsquestion',
+            index=models.Index(fields=['exam', 'position'], name='tasks_examoq_exam_position'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.12 on 2026-10-17 20:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_exam_question_position'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userexam',
+            name='answered_questions_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='количество отвеченных вопросов'),
+        ),
+        migrations.AddField(
+            model_name='userexam',
+            name='correct_answers_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='количество правильных ответов'),
+        ),
+        migrations.AddField(
+            model_name='userexam',
+            name='questions_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='количество вопросов'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.12 on 2026-10-17 20:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_exam_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='incorrectwordquestionblank',
+            index=models.Index(fields=['task', 'id'], name='tasks_iwqblank_task_id'),
+        ),
+        migrations.AddIndex(
+            model_name='optionsquestionblank',
+            index=models.Index(fields=['task', 'id'], name='tasks_oqblank_task_id'),
+        ),
+        migrations.AddIndex(
+            model_name='userexam',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='tasks_userexam_user_created'),
+        ),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 5.0.12 on 2026-10-17 20:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Ключ строки представления уникален для вопросов обоих типов: четный у вопросов
+# с неправильной буквой, нечетный у вопросов с вариантами ответа.
+CREATE_EXAM_QUESTION_VIEW_SQL = """
+CREATE VIEW tasks_examquestion AS
+SELECT
+    id * 2 AS key,
+    'incorrectword' AS question_type,
+    id AS question_id,
+    exam_id,
+    position,
+    created_at,
+    finished_at,
+    correct_word,
+    incorrect_word,
+    incorrect_letter_index,
+    selected_letter_index,
+    CAST(NULL AS varchar(255)) AS question,
+    CAST(NULL AS varchar(255)) AS option1,
+    CAST(NULL AS boolean) AS option1_is_true,
+    CAST(NULL AS varchar(255)) AS option2,
+    CAST(NULL AS boolean) AS option2_is_true,
+    CAST(NULL AS varchar(255)) AS option3,
+    CAST(NULL AS boolean) AS option3_is_true,
+    CAST(NULL AS boolean) AS selected_option1_is_true,
+    CAST(NULL AS boolean) AS selected_option2_is_true,
+    CAST(NULL AS boolean) AS selected_option3_is_true
+FROM tasks_examincorrectwordquestion
+UNION ALL
+SELECT
+    id * 2 + 1 AS key,
+    'options' AS question_type,
+    id AS question_id,
+    exam_id,
+    position,
+    created_at,
+    finished_at,
+    CAST(NULL AS varchar(255)) AS correct_word,
+    CAST(NULL AS varchar(255)) AS incorrect_word,
+    CAST(NULL AS integer) AS incorrect_letter_index,
+    CAST(NULL AS integer) AS selected_letter_index,
+    question,
+    option1,
+    option1_is_true,
+    option2,
+    option2_is_true,
+    option3,
+    option3_is_true,
+    selected_option1_is_true,
+    selected_option2_is_true,
+    selected_option3_is_true
+FROM tasks_examoptionsquestion
+"""
+
+DROP_EXAM_QUESTION_VIEW_SQL = 'DROP VIEW IF EXISTS tasks_examquestion'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_EXAM_QUESTION_VIEW_SQL, DROP_EXAM_QUESTION_VIEW_SQL),
+        migrations.CreateModel(
+            name='ExamQuestion',
+            fields=[
+                ('key', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ключ')),
+                ('question_type', models.CharField(choices=[('incorrectword', 'Вопрос c неправильной буквой в слове'), ('options', 'Вопрос с вариантами ответа')], max_length=32, verbose_name='тип вопроса')),
+                ('question_id', models.BigIntegerField(verbose_name='идентификатор вопроса')),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='tasks.userexam', verbose_name='испытание')),
+                ('position', models.PositiveIntegerField(verbose_name='порядковый номер в испытании')),
+                ('created_at', models.DateTimeField(verbose_name='дата добавления')),
+                ('finished_at', models.DateTimeField(null=True, verbose_name='дата завершения')),
+                ('correct_word', models.CharField(max_length=255, null=True, verbose_name='правильная форма слова')),
+                ('incorrect_word', models.CharField(max_length=255, null=True, verbose_name='форма слова с ошибкой')),
+                ('incorrect_letter_index', models.IntegerField(null=True, verbose_name='номер неправильной буквы')),
+                ('selected_letter_index', models.IntegerField(null=True, verbose_name='выбранный номер неправильной буквы')),
+                ('question', models.CharField(max_length=255, null=True, verbose_name='вопрос')),
+                ('option1', models.CharField(max_length=255, null=True, verbose_name='первый вариант ответа')),
+                ('option1_is_true', models.BooleanField(null=True, verbose_name='первый вариант ответа верный')),
+                ('option2', models.CharField(max_length=255, null=True, verbose_name='второй вариант ответа')),
+                ('option2_is_true', models.BooleanField(null=True, verbose_name='второй вариант ответа верный')),
+                ('option3', models.CharField(max_length=255, null=True, verbose_name='третий вариант ответа')),
+                ('option3_is_true', models.BooleanField(null=True, verbose_name='третий вариант ответа верный')),
+                ('selected_option1_is_true', models.BooleanField(null=True, verbose_name='выбран первый вариант ответа')),
+                ('selected_option2_is_true', models.BooleanField(null=True, verbose_name='выбран второй вариант ответа')),
+                ('selected_option3_is_true', models.BooleanField(null=True, verbose_name='выбран третий вариант ответа')),
+            ],
+            options={
+                'verbose_name': 'вопрос в испытании',
+                'verbose_name_plural': 'вопросы в испытаниях',
+                'db_table': 'tasks_examquestion',
+                'ordering': ('exam', 'position'),
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,117 @@
+# Generated by Django 5.0.12 on 2026-10-17 21:19
+
+import importlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Представление вопросов испытаний до добавления ссылки на заготовку, для отката миграции.
+PREVIOUS_CREATE_EXAM_QUESTION_VIEW_SQL = importlib.import_module(
+    'apps.tasks.migrations.0005_exam_question_view'
+).CREATE_EXAM_QUESTION_VIEW_SQL
+
+# Представление вопросов испытаний пересоздается со ссылкой на заготовку. Удаляется до изменения
+# таблиц вопросов: SQLite пересоздает таблицу при изменении и проверяет зависящие от нее представления.
+CREATE_EXAM_QUESTION_VIEW_SQL = """
+CREATE VIEW tasks_examquestion AS
+SELECT
+    id * 2 AS key,
+    'incorrectword' AS question_type,
+    id AS question_id,
+    exam_id,
+    blank_id,
+    position,
+    created_at,
+    finished_at,
+    correct_word,
+    incorrect_word,
+    incorrect_letter_index,
+    selected_letter_index,
+    CAST(NULL AS varchar(255)) AS question,
+    CAST(NULL AS varchar(255)) AS option1,
+    CAST(NULL AS boolean) AS option1_is_true,
+    CAST(NULL AS varchar(255)) AS option2,
+    CAST(NULL AS boolean) AS option2_is_true,
+    CAST(NULL AS varchar(255)) AS option3,
+    CAST(NULL AS boolean) AS option3_is_true,
+    CAST(NULL AS boolean) AS selected_option1_is_true,
+    CAST(NULL AS boolean) AS selected_option2_is_true,
+    CAST(NULL AS boolean) AS selected_option3_is_true
+FROM tasks_examincorrectwordquestion
+UNION ALL
+SELECT
+    id * 2 + 1 AS key,
+    'options' AS question_type,
+    id AS question_id,
+    exam_id,
+    blank_id,
+    position,
+    created_at,
+    finished_at,
+    CAST(NULL AS varchar(255)) AS correct_word,
+    CAST(NULL AS varchar(255)) AS incorrect_word,
+    CAST(NULL AS integer) AS incorrect_letter_index,
+    CAST(NULL AS integer) AS selected_letter_index,
+    question,
+    option1,
+    option1_is_true,
+    option2,
+    option2_is_true,
+    option3,
+    option3_is_true,
+    selected_option1_is_true,
+    selected_option2_is_true,
+    selected_option3_is_true
+FROM tasks_examoptionsquestion
+"""
+
+DROP_EXAM_QUESTION_VIEW_SQL = 'DROP VIEW IF EXISTS tasks_examquestion'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_exam_question_view'),
+    ]
+
+    operations = [
+        migrations.RunSQL(DROP_EXAM_QUESTION_VIEW_SQL, PREVIOUS_CREATE_EXAM_QUESTION_VIEW_SQL),
+        migrations.AddField(
+            model_name='examincorrectwordquestion',
+            name='blank',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='tasks.incorrectwordquestionblank', verbose_name='заготовка'),
+        ),
+        migrations.AddField(
+            model_name='examoptionsquestion',
+            name='blank',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='tasks.optionsquestionblank', verbose_name='заготовка'),
+        ),
+        migrations.CreateModel(
+            name='BlankStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_type', models.CharField(choices=[('incorrectword', 'Вопрос c неправильной буквой в слове'), ('options', 'Вопрос с вариантами ответа')], max_length=32, verbose_name='тип вопроса')),
+                ('blank_id', models.BigIntegerField(verbose_name='идентификатор заготовки')),
+                ('answers_count', models.PositiveIntegerField(default=0, verbose_name='количество ответов')),
+                ('correct_answers_count', models.PositiveIntegerField(default=0, verbose_name='количество правильных ответов')),
+                ('correct_answers_ratio', models.FloatField(default=0, verbose_name='доля правильных ответов')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tasks.task', verbose_name='задание')),
+            ],
+            options={
+                'verbose_name': 'статистика заготовки',
+                'verbose_name_plural': 'статистика заготовок',
+                'ordering': ('id',),
+                'indexes': [models.Index(fields=['task', 'correct_answers_ratio', 'id'], name='tasks_blankstats_task_ratio')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='blankstatistics',
+            constraint=models.UniqueConstraint(fields=('question_type', 'blank_id'), name='tasks_blankstatistics_blank'),
+        ),
+        migrations.RunSQL(CREATE_EXAM_QUESTION_VIEW_SQL, DROP_EXAM_QUESTION_VIEW_SQL),
+        migrations.AddField(
+            model_name='examquestion',
+            name='blank_id',
+            field=models.BigIntegerField(null=True, verbose_name='идентификатор заготовки'),
+        ),
+    ]
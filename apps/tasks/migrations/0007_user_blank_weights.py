@@ -0,0 +1,41 @@
+# Generated by Django 5.0.12 on 2026-10-17 21:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_blank_statistics'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserBlankWeight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_type', models.CharField(choices=[('incorrectword', 'Вопрос c неправильной буквой в слове'), ('options', 'Вопрос с вариантами ответа')], max_length=32, verbose_name='тип вопроса')),
+                ('blank_id', models.BigIntegerField(verbose_name='идентификатор заготовки')),
+                ('answers_count', models.PositiveIntegerField(default=0, verbose_name='количество ответов')),
+                ('incorrect_answers_count', models.PositiveIntegerField(default=0, verbose_name='количество неправильных ответов')),
+                ('repetition_level', models.PositiveSmallIntegerField(default=0, verbose_name='уровень повторения')),
+                ('weight', models.FloatField(default=1, verbose_name='вес')),
+                ('due_at', models.DateTimeField(verbose_name='дата повторения')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tasks.task', verbose_name='задание')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+            ],
+            options={
+                'verbose_name': 'вес заготовки для пользователя',
+                'verbose_name_plural': 'веса заготовок для пользователей',
+                'ordering': ('id',),
+                'indexes': [models.Index(fields=['user', 'task', 'due_at'], name='tasks_userblankweight_due')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='userblankweight',
+            constraint=models.UniqueConstraint(fields=('user', 'question_type', 'blank_id'), name='tasks_userblankweight_blank'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.12 on 2026-10-17 21:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0007_user_blank_weights'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='time_limit_minutes',
+            field=models.PositiveIntegerField(blank=True, help_text='Испытание, не завершенное за это время, завершается командой finalize_stale_exams.', null=True, verbose_name='ограничение времени испытания, минут'),
+        ),
+        migrations.AddField(
+            model_name='userexam',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='срок завершения'),
+        ),
+        migrations.AddIndex(
+            model_name='userexam',
+            index=models.Index(condition=models.Q(('expires_at__isnull', False), ('finished_at__isnull', True)), fields=['expires_at', 'id'], name='tasks_userexam_expires'),
+        ),
+    ]
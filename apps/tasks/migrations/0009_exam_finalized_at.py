@@ -0,0 +1,18 @@
+# Generated by Django 5.0.12 on 2026-10-17 21:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0008_exam_time_limit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userexam',
+            name='finalized_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='дата обработки результатов'),
+        ),
+    ]
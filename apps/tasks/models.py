@@ -1,12 +1,17 @@
 from dataclasses import dataclass
-import itertools
 from django.db import models
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.expressions import CombinedExpression
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.utils.functional import SimpleLazyObject
 from django.utils import timezone
 
 
+EXAM_QUESTION_ALREADY_ANSWERED_MESSAGE = 'На вопрос был получен ответ ранее. Обновление невозможно.'
+EXAM_EXPIRED_MESSAGE = 'Время испытания истекло. Ответ не сохранен.'
+
 EXAM_QUESTION_MODEL_BY_TYPE = SimpleLazyObject(
     lambda: {x.QUESTION_TYPE: x for x in (ExamIncorrectWordQuestion, ExamOptionsQuestion)}
 )
@@ -21,6 +26,12 @@ class Task(models.Model):
     max_questions_count = models.PositiveIntegerField(
         verbose_name='максимальное количество вопросов в испытании', default=1
     )
+    time_limit_minutes = models.PositiveIntegerField(
+        verbose_name='ограничение времени испытания, минут',
+        null=True,
+        blank=True,
+        help_text='Испытание, не завершенное за это время, завершается командой finalize_stale_exams.',
+    )
 
     class Meta:
         """Настройки модели."""
@@ -41,6 +52,15 @@ class QuestionTypes(models.TextChoices):
     OPTIONS = 'options', 'Вопрос с вариантами ответа'
 
 
+def incorrect_word_letter_index(correct_word: str, incorrect_word: str) -> int | None:
+    """Возвращает номер первой отличающейся буквы (начиная с 1) или None, если такой буквы нет."""
+    for iter_num, (char1, char2) in enumerate(zip(correct_word, incorrect_word, strict=False), start=1):
+        if char1 != char2:
+            return iter_num
+
+    return None
+
+
 class IncorrectWordQuestionBase(models.Model):
     """Базовая модель вопроса c неправильной буквой в слове."""
 
@@ -67,16 +87,16 @@ class IncorrectWordQuestionBlank(IncorrectWordQuestionBase):
         verbose_name = 'вопрос с неправильной буквой в слове'
         verbose_name_plural = 'вопросы с неправильной буквой в слове'
         ordering = ('id',)
+        indexes = (models.Index(fields=('task', 'id'), name='tasks_iwqblank_task_id'),)
 
     def clean(self) -> None:
         """Очищает и проверяет данные модели."""
         if self.correct_word == self.incorrect_word:
             raise ValidationError('Формы слова должны отличаться')
 
-        for iter_num, (char1, char2) in enumerate(zip(self.correct_word, self.incorrect_word, strict=False), start=1):
-            if char1 != char2:
-                self.incorrect_letter_index = iter_num
-                break
+        incorrect_letter_index = incorrect_word_letter_index(self.correct_word, self.incorrect_word)
+        if incorrect_letter_index is not None:
+            self.incorrect_letter_index = incorrect_letter_index
 
     def __str__(self):
         """Строковое представление объекта."""
@@ -87,6 +107,11 @@ class OptionsQuestionBase(models.Model):
     """Базовая модель вопроса с вариантами ответа."""
 
     QUESTION_TYPE = QuestionTypes.OPTIONS
+    OPTION_AND_ANSWER_PAIR_FIELDS = (
+        ('option1', 'option1_is_true'),
+        ('option2', 'option2_is_true'),
+        ('option3', 'option3_is_true'),
+    )
 
     question = models.CharField(verbose_name='вопрос', max_length=255, default='')
     option1 = models.CharField(verbose_name='первый вариант ответа', max_length=255, default='')
@@ -105,12 +130,6 @@ class OptionsQuestionBase(models.Model):
 class OptionsQuestionBlank(OptionsQuestionBase):
     """Заготовка вопроса с вариантами ответа."""
 
-    OPTION_AND_ANSWER_PAIR_FIELDS = (
-        ('option1', 'option1_is_true'),
-        ('option2', 'option2_is_true'),
-        ('option3', 'option3_is_true'),
-    )
-
     task = models.ForeignKey(Task, verbose_name='задание', on_delete=models.CASCADE)
 
     class Meta:
@@ -119,6 +138,7 @@ class OptionsQuestionBlank(OptionsQuestionBase):
         verbose_name = 'вопрос с вариантами ответа'
         verbose_name_plural = 'вопросы с вариантами ответа'
         ordering = ('id',)
+        indexes = (models.Index(fields=('task', 'id'), name='tasks_oqblank_task_id'),)
 
     def clean(self) -> None:
         """Очищает и проверяет данные модели."""
@@ -134,6 +154,23 @@ class OptionsQuestionBlank(OptionsQuestionBase):
         return f'Вопрос с вариантами ответа № {self.id}: {self.question[:10]}'
 
 
+class UserExamQuerySet(models.QuerySet):
+    """Набор испытаний."""
+
+    def with_results(self) -> 'UserExamQuerySet':
+        """
+        Добавляет показатели результатов испытаний, вычисленные в БД.
+
+        Добавляются поля computed_questions_count, computed_answered_questions_count
+        и computed_correct_answers_count.
+        """
+        return self.annotate(
+            computed_questions_count=_exam_questions_count(),
+            computed_answered_questions_count=_exam_questions_count(finished_at__isnull=False),
+            computed_correct_answers_count=_exam_questions_count(correct=True),
+        )
+
+
 class UserExam(models.Model):
     """
     Испытание, которое проходит пользователь.
@@ -147,6 +184,13 @@ class UserExam(models.Model):
     created_at = models.DateTimeField(verbose_name='дата добавления', auto_now_add=True)
     started_at = models.DateTimeField(verbose_name='дата начала', null=True, blank=True)
     finished_at = models.DateTimeField(verbose_name='дата завершения', null=True, blank=True)
+    expires_at = models.DateTimeField(verbose_name='срок завершения', null=True, blank=True)
+    finalized_at = models.DateTimeField(verbose_name='дата обработки результатов', null=True, blank=True)
+    questions_count = models.PositiveIntegerField(verbose_name='количество вопросов', default=0)
+    answered_questions_count = models.PositiveIntegerField(verbose_name='количество отвеченных вопросов', default=0)
+    correct_answers_count = models.PositiveIntegerField(verbose_name='количество правильных ответов', default=0)
+
+    objects = UserExamQuerySet.as_manager()
 
     class Meta:
         """Настройки модели."""
@@ -154,6 +198,15 @@ class UserExam(models.Model):
         verbose_name = 'испытание'
         verbose_name_plural = 'испытания'
         ordering = ('id',)
+        indexes = (
+            models.Index(fields=('user', 'created_at', 'id'), name='tasks_userexam_user_created'),
+            # Только незавершенные испытания с ограничением времени, см. exams_expired_finish.
+            models.Index(
+                fields=('expires_at', 'id'),
+                name='tasks_userexam_expires',
+                condition=Q(finished_at__isnull=True, expires_at__isnull=False),
+            ),
+        )
 
     def clean(self) -> None:
         """Проверяет данные модели."""
@@ -182,7 +235,7 @@ class ExamQuestionFinishedMixin(models.Model):
     def _finished_clean(self) -> None:
         """Проверка вопроса в испытании на завершенность."""
         if self.is_finished:
-            raise ValidationError('На вопрос был получен ответ ранее. Обновление невозможно.')
+            raise ValidationError(EXAM_QUESTION_ALREADY_ANSWERED_MESSAGE)
 
     def set_finished_at(self):
         """Заполняет дату ответа на вопрос."""
@@ -193,6 +246,10 @@ class ExamIncorrectWordQuestion(ExamQuestionFinishedMixin, IncorrectWordQuestion
     """Вопрос в испытании c неправильной буквой."""
 
     exam = models.ForeignKey(UserExam, verbose_name='испытание', on_delete=models.PROTECT)
+    blank = models.ForeignKey(
+        IncorrectWordQuestionBlank, verbose_name='заготовка', on_delete=models.SET_NULL, null=True, blank=True
+    )
+    position = models.PositiveIntegerField(verbose_name='порядковый номер в испытании')
     created_at = models.DateTimeField(verbose_name='дата добавления', auto_now_add=True)
     selected_letter_index = models.IntegerField(
         verbose_name='выбранный номер неправильной буквы', null=True, blank=True
@@ -204,6 +261,7 @@ class ExamIncorrectWordQuestion(ExamQuestionFinishedMixin, IncorrectWordQuestion
         verbose_name = 'вопрос в испытании c неправильной буквой'
         verbose_name_plural = 'вопросы в испытаниях c неправильной буквой'
         ordering = ('id',)
+        indexes = (models.Index(fields=('exam', 'position'), name='tasks_examiwq_exam_position'),)
 
     def clean(self) -> None:
         """Проверяет данные модели."""
@@ -217,11 +275,20 @@ class ExamIncorrectWordQuestion(ExamQuestionFinishedMixin, IncorrectWordQuestion
         """Ответ верный."""
         return self.incorrect_letter_index == self.selected_letter_index
 
+    @staticmethod
+    def answer_is_correct_condition() -> Q:
+        """Условие верного ответа для запросов к БД, аналог answer_is_correct."""
+        return Q(selected_letter_index=F('incorrect_letter_index'))
+
 
 class ExamOptionsQuestion(ExamQuestionFinishedMixin, OptionsQuestionBase):
     """Вопрос в испытании с вариантами ответа."""
 
     exam = models.ForeignKey(UserExam, verbose_name='испытание', on_delete=models.PROTECT)
+    blank = models.ForeignKey(
+        OptionsQuestionBlank, verbose_name='заготовка', on_delete=models.SET_NULL, null=True, blank=True
+    )
+    position = models.PositiveIntegerField(verbose_name='порядковый номер в испытании')
     created_at = models.DateTimeField(verbose_name='дата добавления', auto_now_add=True)
     selected_option1_is_true = models.BooleanField(verbose_name='первый вариант ответа верный', null=True, blank=True)
     selected_option2_is_true = models.BooleanField(verbose_name='второй вариант ответа верный', null=True, blank=True)
@@ -233,6 +300,7 @@ class ExamOptionsQuestion(ExamQuestionFinishedMixin, OptionsQuestionBase):
         verbose_name = 'вопрос в испытании c выбором варианта ответа'
         verbose_name_plural = 'вопросы в испытании c выбором варианта ответа'
         ordering = ('id',)
+        indexes = (models.Index(fields=('exam', 'position'), name='tasks_examoq_exam_position'),)
 
     def clean(self) -> None:
         """Проверяет данные модели."""
@@ -258,10 +326,159 @@ class ExamOptionsQuestion(ExamQuestionFinishedMixin, OptionsQuestionBase):
             ]
         )
 
+    @staticmethod
+    def answer_is_correct_condition() -> Q:
+        """Условие верного ответа для запросов к БД, аналог answer_is_correct."""
+        return (
+            Q(selected_option1_is_true=F('option1_is_true'))
+            & Q(selected_option2_is_true=F('option2_is_true'))
+            & (Q(option3='') | Q(selected_option3_is_true=F('option3_is_true')))
+        )
+
+
+class ExamQuestion(models.Model):
+    """
+    Вопрос в испытании любого типа.
+
+    Модель только для чтения поверх представления БД, объединяющего таблицы вопросов обоих типов.
+    Позволяет получить все вопросы испытания одним упорядоченным запросом. Поля, которых нет
+    у вопроса данного типа, содержат NULL. Изменения вносятся через модели вопросов конкретных типов.
+    """
+
+    key = models.BigIntegerField(verbose_name='ключ', primary_key=True)
+    question_type = models.CharField(verbose_name='тип вопроса', max_length=32, choices=QuestionTypes.choices)
+    question_id = models.BigIntegerField(verbose_name='идентификатор вопроса')
+    exam = models.ForeignKey(UserExam, verbose_name='испытание', on_delete=models.DO_NOTHING, related_name='+')
+    blank_id = models.BigIntegerField(verbose_name='идентификатор заготовки', null=True)
+    position = models.PositiveIntegerField(verbose_name='порядковый номер в испытании')
+    created_at = models.DateTimeField(verbose_name='дата добавления')
+    finished_at = models.DateTimeField(verbose_name='дата завершения', null=True)
+
+    correct_word = models.CharField(verbose_name='правильная форма слова', max_length=255, null=True)
+    incorrect_word = models.CharField(verbose_name='форма слова с ошибкой', max_length=255, null=True)
+    incorrect_letter_index = models.IntegerField(verbose_name='номер неправильной буквы', null=True)
+    selected_letter_index = models.IntegerField(verbose_name='выбранный номер неправильной буквы', null=True)
+
+    question = models.CharField(verbose_name='вопрос', max_length=255, null=True)
+    option1 = models.CharField(verbose_name='первый вариант ответа', max_length=255, null=True)
+    option1_is_true = models.BooleanField(verbose_name='первый вариант ответа верный', null=True)
+    option2 = models.CharField(verbose_name='второй вариант ответа', max_length=255, null=True)
+    option2_is_true = models.BooleanField(verbose_name='второй вариант ответа верный', null=True)
+    option3 = models.CharField(verbose_name='третий вариант ответа', max_length=255, null=True)
+    option3_is_true = models.BooleanField(verbose_name='третий вариант ответа верный', null=True)
+    selected_option1_is_true = models.BooleanField(verbose_name='выбран первый вариант ответа', null=True)
+    selected_option2_is_true = models.BooleanField(verbose_name='выбран второй вариант ответа', null=True)
+    selected_option3_is_true = models.BooleanField(verbose_name='выбран третий вариант ответа', null=True)
+
+    class Meta:
+        """Настройки модели."""
+
+        managed = False
+        db_table = 'tasks_examquestion'
+        verbose_name = 'вопрос в испытании'
+        verbose_name_plural = 'вопросы в испытаниях'
+        ordering = ('exam', 'position')
+
+    def as_exam_question(self) -> ExamIncorrectWordQuestion | ExamOptionsQuestion:
+        """Возвращает вопрос испытания конкретного типа без дополнительного запроса к БД."""
+        exam_question_model = EXAM_QUESTION_MODEL_BY_TYPE[self.question_type]
+        field_names = [x.attname for x in exam_question_model._meta.concrete_fields]
+        values = [self.question_id if x == 'id' else getattr(self, x) for x in field_names]
+
+        return exam_question_model.from_db(self._state.db, field_names, values)
+
+
+class BlankStatistics(models.Model):
+    """
+    Статистика ответов на вопросы испытаний, созданные из заготовки.
+
+    Обновляется при каждом ответе на вопрос, ссылающийся на заготовку, и может быть
+    пересчитана по всем ответам командой rebuild_blank_statistics.
+    """
+
+    task = models.ForeignKey(Task, verbose_name='задание', on_delete=models.CASCADE, related_name='+')
+    question_type = models.CharField(verbose_name='тип вопроса', max_length=32, choices=QuestionTypes.choices)
+    blank_id = models.BigIntegerField(verbose_name='идентификатор заготовки')
+    answers_count = models.PositiveIntegerField(verbose_name='количество ответов', default=0)
+    correct_answers_count = models.PositiveIntegerField(verbose_name='количество правильных ответов', default=0)
+    # Хранится для сортировки заготовок задания по сложности по индексу.
+    correct_answers_ratio = models.FloatField(verbose_name='доля правильных ответов', default=0)
+
+    class Meta:
+        """Настройки модели."""
+
+        verbose_name = 'статистика заготовки'
+        verbose_name_plural = 'статистика заготовок'
+        ordering = ('id',)
+        constraints = (
+            models.UniqueConstraint(fields=('question_type', 'blank_id'), name='tasks_blankstatistics_blank'),
+        )
+        indexes = (models.Index(fields=('task', 'correct_answers_ratio', 'id'), name='tasks_blankstats_task_ratio'),)
+
+
+class UserBlankWeight(models.Model):
+    """
+    Вес заготовки для пользователя при выборе вопросов испытания.
+
+    Обновляется по ответам завершенного испытания по схеме интервального повторения: верный ответ
+    откладывает повторение заготовки на больший интервал, неверный - возвращает ее к повторению сразу.
+    Вес растет с количеством неверных ответов.
+    """
+
+    user = models.ForeignKey(User, verbose_name='пользователь', on_delete=models.CASCADE, related_name='+')
+    task = models.ForeignKey(Task, verbose_name='задание', on_delete=models.CASCADE, related_name='+')
+    question_type = models.CharField(verbose_name='тип вопроса', max_length=32, choices=QuestionTypes.choices)
+    blank_id = models.BigIntegerField(verbose_name='идентификатор заготовки')
+    answers_count = models.PositiveIntegerField(verbose_name='количество ответов', default=0)
+    incorrect_answers_count = models.PositiveIntegerField(verbose_name='количество неправильных ответов', default=0)
+    repetition_level = models.PositiveSmallIntegerField(verbose_name='уровень повторения', default=0)
+    weight = models.FloatField(verbose_name='вес', default=1)
+    due_at = models.DateTimeField(verbose_name='дата повторения')
+
+    class Meta:
+        """Настройки модели."""
+
+        verbose_name = 'вес заготовки для пользователя'
+        verbose_name_plural = 'веса заготовок для пользователей'
+        ordering = ('id',)
+        constraints = (
+            models.UniqueConstraint(fields=('user', 'question_type', 'blank_id'), name='tasks_userblankweight_blank'),
+        )
+        indexes = (models.Index(fields=('user', 'task', 'due_at'), name='tasks_userblankweight_due'),)
+
+
+def _exam_questions_count(*, correct: bool = False, **filters) -> CombinedExpression:
+    """
+    Возвращает выражение количества вопросов обоих типов в испытании.
+
+    Подзапросы строятся к таблицам вопросов, а не к представлению ExamQuestion,
+    т.к. SQLite не передает условие коррелированного подзапроса с агрегацией внутрь представления.
+    """
+    incorrect_word_questions_count, options_questions_count = (
+        Coalesce(
+            Subquery(
+                exam_question_model.objects.filter(exam=OuterRef('pk'), **filters)
+                .filter(exam_question_model.answer_is_correct_condition() if correct else Q())
+                .order_by()
+                .values('exam')
+                .annotate(count=Count('id'))
+                .values('count')
+            ),
+            0,
+        )
+        for exam_question_model in (ExamIncorrectWordQuestion, ExamOptionsQuestion)
+    )
+
+    return incorrect_word_questions_count + options_questions_count
+
 
 @dataclass
 class UserExamResults:
-    """Результаты испытания."""
+    """
+    Результаты испытания.
+
+    Показатели берутся из счетчиков испытания, которые обновляются при каждом ответе.
+    """
 
     exam: UserExam
     queries_count: int = 0
@@ -269,12 +486,8 @@ class UserExamResults:
 
     def __post_init__(self) -> None:
         """Выполняет постинициализационную обработку."""
-        for question in itertools.chain(
-            self.exam.examincorrectwordquestion_set.all(), self.exam.examoptionsquestion_set.all()
-        ):
-            self.queries_count += 1
-            if question.answer_is_correct:
-                self.correct_answers_count += 1
+        self.queries_count = self.exam.questions_count
+        self.correct_answers_count = self.exam.correct_answers_count
 
     @property
     def incorrect_answers_count(self) -> int:
@@ -0,0 +1,103 @@
+import itertools
+
+from django.db import connections, router, transaction
+from django.db.models import Count
+
+from apps.tasks.models import (
+    EXAM_QUESTION_MODEL_BY_TYPE,
+    BlankStatistics,
+    ExamIncorrectWordQuestion,
+    ExamOptionsQuestion,
+    UserExam,
+)
+
+
+def blank_statistics_answer_add(*, question: ExamIncorrectWordQuestion | ExamOptionsQuestion) -> None:
+    """
+    Учитывает ответ на вопрос в статистике заготовки, из которой создан вопрос.
+
+    Строка статистики создается при первом ответе на вопрос из заготовки, последующие ответы увеличивают
+    ее счетчики. Создание и обновление выполняются одним запросом INSERT ... ON CONFLICT DO UPDATE,
+    поэтому одновременные первые ответы не конфликтуют, а строки не создаются заранее для заготовок,
+    на вопросы из которых еще не отвечали.
+    """
+    if question.blank_id is None:
+        return
+
+    is_correct = int(question.answer_is_correct)
+    connection = connections[router.db_for_write(BlankStatistics)]
+    statistics_table = connection.ops.quote_name(BlankStatistics._meta.db_table)
+    exam_table = connection.ops.quote_name(UserExam._meta.db_table)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {statistics_table}
+                (task_id, question_type, blank_id, answers_count, correct_answers_count, correct_answers_ratio)
+            SELECT task_id, %s, %s, 1, %s, %s FROM {exam_table} WHERE id = %s
+            ON CONFLICT (question_type, blank_id) DO UPDATE SET
+                answers_count = {statistics_table}.answers_count + 1,
+                correct_answers_count = {statistics_table}.correct_answers_count + %s,
+                correct_answers_ratio = (
+                    CAST({statistics_table}.correct_answers_count + %s AS DOUBLE PRECISION)
+                    / ({statistics_table}.answers_count + 1)
+                )
+            """,
+            [
+                question.QUESTION_TYPE,
+                question.blank_id,
+                is_correct,
+                is_correct,
+                question.exam_id,
+                is_correct,
+                is_correct,
+            ],
+        )
+
+
+@transaction.atomic
+def blank_statistics_rebuild(*, task_id: int | None = None, chunk_size: int = 2000) -> int:
+    """
+    Пересчитывает статистику заготовок по всем ответам на вопросы испытаний.
+
+    Ответы группируются в БД по заготовкам, результат читается и сохраняется частями по chunk_size строк,
+    поэтому потребление памяти не зависит от количества ответов. Вопросы без ссылки на заготовку
+    (созданные до ее появления) не учитываются. Возвращает количество строк статистики.
+    """
+    statistics = BlankStatistics.objects.all()
+    if task_id is not None:
+        statistics = statistics.filter(task_id=task_id)
+    statistics.delete()
+
+    created_count = 0
+    for question_type, exam_question_model in EXAM_QUESTION_MODEL_BY_TYPE.items():
+        answers = exam_question_model.objects.filter(finished_at__isnull=False, blank__isnull=False)
+        if task_id is not None:
+            answers = answers.filter(blank__task_id=task_id)
+
+        rows = (
+            answers.order_by('blank_id')
+            .values('blank_id', 'blank__task_id')
+            .annotate(
+                answers_count=Count('id'),
+                correct_answers_count=Count('id', filter=exam_question_model.answer_is_correct_condition()),
+            )
+            .values_list('blank__task_id', 'blank_id', 'answers_count', 'correct_answers_count')
+            .iterator(chunk_size=chunk_size)
+        )
+
+        while chunk := list(itertools.islice(rows, chunk_size)):
+            BlankStatistics.objects.bulk_create(
+                BlankStatistics(
+                    task_id=row_task_id,
+                    question_type=question_type,
+                    blank_id=blank_id,
+                    answers_count=answers_count,
+                    correct_answers_count=correct_answers_count,
+                    correct_answers_ratio=correct_answers_count / answers_count,
+                )
+                for row_task_id, blank_id, answers_count, correct_answers_count in chunk
+            )
+            created_count += len(chunk)
+
+    return created_count
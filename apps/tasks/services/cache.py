@@ -0,0 +1,69 @@
+import time
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+CACHE_KEY_PREFIX = 'tasks'
+
+
+def cache_is_shared() -> bool:
+    """
+    Кэш общий для процессов приложения.
+
+    Кэш процесса (LocMemCache) и отключенный кэш (DummyCache) не общие: записи, сохраненные
+    обработчиком фоновых задач, недоступны процессам, обрабатывающим запросы.
+    """
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache | DummyCache)
+
+
+def cache_object_key(*, namespace: str, object_id: int | str) -> str:
+    """Возвращает ключ кэша данных объекта, которые не меняются после сохранения в кэш."""
+    return f'{CACHE_KEY_PREFIX}:{namespace}:{object_id}'
+
+
+def cache_version_key(*, namespace: str, object_id: int | str) -> str:
+    """Возвращает ключ кэша, в котором хранится версия данных объекта."""
+    return f'{cache_object_key(namespace=namespace, object_id=object_id)}:version'
+
+
+def cache_version_get(*, namespace: str, object_id: int | str) -> int:
+    """
+    Возвращает текущую версию данных объекта в кэше.
+
+    Начальная версия берется из текущего времени, поэтому после вытеснения ключа версии из кэша
+    не совпадет ни с одной из ранее использованных.
+    """
+    return cache.get_or_set(cache_version_key(namespace=namespace, object_id=object_id), time.time_ns, timeout=None)
+
+
+async def acache_version_get(*, namespace: str, object_id: int | str) -> int:
+    """Асинхронный вариант cache_version_get."""
+    return await cache.aget_or_set(
+        cache_version_key(namespace=namespace, object_id=object_id), time.time_ns, timeout=None
+    )
+
+
+def cache_version_bump(*, namespace: str, object_id: int | str) -> int | None:
+    """
+    Увеличивает версию данных объекта в кэше и возвращает новую версию.
+
+    Записи с предыдущей версией перестают читаться и удаляются по истечении срока хранения.
+    Если версии не было в кэше, сохраняется начальная версия и возвращается None.
+    """
+    version_key = cache_version_key(namespace=namespace, object_id=object_id)
+
+    try:
+        return cache.incr(version_key)
+    except ValueError:
+        cache.add(version_key, time.time_ns(), timeout=None)
+
+    return None
+
+
+def cache_versioned_key(*, namespace: str, object_id: int | str, version: int | None = None) -> str:
+    """Возвращает ключ кэша данных объекта с учетом версии."""
+    if version is None:
+        version = cache_version_get(namespace=namespace, object_id=object_id)
+
+    return f'{cache_object_key(namespace=namespace, object_id=object_id)}:v{version}'
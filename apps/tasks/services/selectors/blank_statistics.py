@@ -0,0 +1,28 @@
+from apps.core.pagination import KeysetPage, KeysetPaginator
+from apps.tasks.models import BlankStatistics
+from apps.tasks.services.selectors.blanks import BLANK_MODELS
+
+
+def task_blank_statistics_page(*, task_id: int, cursor: str | None = None, per_page: int = 50) -> KeysetPage:
+    """
+    Возвращает страницу статистики заготовок задания, на вопросы из которых получены ответы,
+    начиная с самых сложных.
+
+    Заготовки упорядочены по доле правильных ответов по индексу, поэтому стоимость запроса
+    не зависит от количества ответов. Каждой строке статистики в атрибуте blank присваивается
+    заготовка (None для удаленной), заготовки страницы загружаются одним запросом на тип.
+    """
+    paginator = KeysetPaginator(
+        BlankStatistics.objects.filter(task_id=task_id, answers_count__gt=0),
+        ordering=('correct_answers_ratio', 'id'),
+        per_page=per_page,
+    )
+    page = paginator.get_page(cursor)
+
+    for blank_model in BLANK_MODELS:
+        statistics = [x for x in page if x.question_type == blank_model.QUESTION_TYPE]
+        blanks = blank_model.objects.in_bulk([x.blank_id for x in statistics]) if statistics else {}
+        for blank_statistics in statistics:
+            blank_statistics.blank = blanks.get(blank_statistics.blank_id)
+
+    return page
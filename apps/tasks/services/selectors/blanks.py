@@ -0,0 +1,316 @@
+import random
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+
+from apps.core.sampling import WeightedSampler
+from apps.tasks.models import BlankStatistics, IncorrectWordQuestionBlank, OptionsQuestionBlank, Task, UserBlankWeight
+from apps.tasks.services.cache import cache_version_bump, cache_versioned_key
+
+BLANK_MODELS = (IncorrectWordQuestionBlank, OptionsQuestionBlank)
+
+# Количество попыток добора заготовок при выборке по диапазону идентификаторов.
+ID_RANGE_SAMPLING_ATTEMPTS = 3
+
+BLANK_POOL_CACHE_NAMESPACE = 'blank_pool'
+
+# Количество заданий, веса заготовок которых хранятся в памяти процесса.
+BLANK_WEIGHTS_MAX_TASKS = 128
+# Во сколько раз больше заготовок, чем нужно, загружается из числа подлежащих повторению.
+SPACED_REPETITION_CANDIDATES_FACTOR = 2
+
+Blank = IncorrectWordQuestionBlank | OptionsQuestionBlank
+
+
+def _blanks_split_count(*, counts: list[int], count: int) -> list[int]:
+    """Распределяет количество выбираемых заготовок между типами пропорционально размерам пулов."""
+    total = sum(counts)
+    sample_counts = [0] * len(counts)
+
+    for position in random.sample(range(total), min(count, total)):
+        for model_index, model_count in enumerate(counts):
+            if position < model_count:
+                sample_counts[model_index] += 1
+                break
+            position -= model_count
+
+    return sample_counts
+
+
+def blanks_sample_full_scan(*, task: Task, count: int, user: User | None = None) -> list[Blank]:
+    """Выбирает случайные заготовки задания, загружая все заготовки в память."""
+    blanks = [
+        *task.incorrectwordquestionblank_set.all(),
+        *task.optionsquestionblank_set.all(),
+    ]
+    random.shuffle(blanks)
+
+    return blanks[:count]
+
+
+def blanks_sample_by_ids(*, task: Task, count: int, user: User | None = None) -> list[Blank]:
+    """Выбирает случайные заготовки задания по списку идентификаторов, загружая только выбранные заготовки."""
+    pool = [
+        (blank_model, blank_id)
+        for blank_model in BLANK_MODELS
+        for blank_id in blank_model.objects.filter(task=task).values_list('id', flat=True).iterator()
+    ]
+    sample = random.sample(pool, min(count, len(pool)))
+
+    blanks = []
+    for blank_model in BLANK_MODELS:
+        blank_ids = [blank_id for x, blank_id in sample if x is blank_model]
+        if blank_ids:
+            blanks.extend(blank_model.objects.filter(id__in=blank_ids))
+
+    random.shuffle(blanks)
+
+    return blanks
+
+
+def blanks_sample_by_id_range(*, task: Task, count: int, user: User | None = None) -> list[Blank]:
+    """
+    Выбирает случайные заготовки задания по случайным идентификаторам из диапазона.
+
+    Подходит для плотных диапазонов идентификаторов. Если после нескольких попыток
+    набрать нужное количество заготовок не удалось, выборка выполняется по списку идентификаторов.
+    """
+    stats = [
+        blank_model.objects.filter(task=task).aggregate(count=Count('id'), min_id=Min('id'), max_id=Max('id'))
+        for blank_model in BLANK_MODELS
+    ]
+    sample_counts = _blanks_split_count(counts=[x['count'] for x in stats], count=count)
+
+    blanks = []
+    for blank_model, model_stats, sample_count in zip(BLANK_MODELS, stats, sample_counts, strict=True):
+        model_blanks = {}
+
+        for _x in range(ID_RANGE_SAMPLING_ATTEMPTS):
+            missing_count = sample_count - len(model_blanks)
+            if not missing_count:
+                break
+
+            id_range = range(model_stats['min_id'], model_stats['max_id'] + 1)
+            candidate_ids = set(random.sample(id_range, min(len(id_range), missing_count * 2))) - model_blanks.keys()
+            # Из найденных заготовок выбираются случайные, а не первые по идентификатору, иначе выборка
+            # смещается к началу диапазона.
+            found_blanks = list(blank_model.objects.filter(task=task, id__in=candidate_ids))
+            for blank in random.sample(found_blanks, min(len(found_blanks), missing_count)):
+                model_blanks[blank.id] = blank
+        else:
+            if len(model_blanks) < sample_count:
+                return blanks_sample_by_ids(task=task, count=count)
+
+        blanks.extend(model_blanks.values())
+
+    random.shuffle(blanks)
+
+    return blanks
+
+
+def _blank_pool_field_names(blank_model: type[Blank]) -> list[str]:
+    """Возвращает имена полей заготовки, хранимых в пуле."""
+    return [x.attname for x in blank_model._meta.concrete_fields]
+
+
+def blanks_pool_get(*, task_id: int) -> tuple[list[tuple], ...]:
+    """
+    Возвращает пул заготовок задания из кэша.
+
+    Пул хранится в компактном виде: для каждого типа заготовок список кортежей значений полей.
+    При отсутствии в кэше пул загружается из БД и сохраняется под ключом текущей версии пула задания.
+    """
+    cache_key = cache_versioned_key(namespace=BLANK_POOL_CACHE_NAMESPACE, object_id=task_id)
+
+    pool = cache.get(cache_key)
+    if pool is None:
+        pool = tuple(
+            list(
+                blank_model.objects.filter(task_id=task_id)
+                .order_by('id')
+                .values_list(*_blank_pool_field_names(blank_model))
+            )
+            for blank_model in BLANK_MODELS
+        )
+        cache.set(cache_key, pool, timeout=getattr(settings, 'TASKS_BLANK_POOL_CACHE_TIMEOUT', 3600))
+
+    return pool
+
+
+def blanks_pool_invalidate(*, task_id: int) -> None:
+    """Сбрасывает пул заготовок задания в кэше после фиксации текущей транзакции."""
+    transaction.on_commit(lambda: cache_version_bump(namespace=BLANK_POOL_CACHE_NAMESPACE, object_id=task_id))
+
+
+def blanks_sample_cached(*, task: Task, count: int, user: User | None = None) -> list[Blank]:
+    """Выбирает случайные заготовки задания из пула заготовок в кэше без обращения к таблицам заготовок."""
+    pool = blanks_pool_get(task_id=task.id)
+    sample_counts = _blanks_split_count(counts=[len(x) for x in pool], count=count)
+
+    blanks = []
+    for blank_model, model_pool, sample_count in zip(BLANK_MODELS, pool, sample_counts, strict=True):
+        field_names = _blank_pool_field_names(blank_model)
+        blanks.extend(
+            blank_model.from_db(blank_model.objects.db, field_names, values)
+            for values in random.sample(model_pool, sample_count)
+        )
+
+    random.shuffle(blanks)
+
+    return blanks
+
+
+@dataclass(frozen=True)
+class BlankWeights:
+    """Пул заготовок задания с весами по сложности для взвешенной выборки."""
+
+    built_at: float
+    rows: list[tuple[type[Blank], tuple]]
+    # Индексы строк пула по типу вопроса и идентификатору заготовки.
+    indexes: dict[tuple[str, int], int]
+    sampler: WeightedSampler
+
+    def blank(self, index: int) -> Blank:
+        """Возвращает заготовку по индексу строки пула."""
+        blank_model, values = self.rows[index]
+
+        return blank_model.from_db(blank_model.objects.db, _blank_pool_field_names(blank_model), values)
+
+
+_blank_weights_lock = threading.Lock()
+_blank_weights_by_pool_key: OrderedDict[str, BlankWeights] = OrderedDict()
+
+
+def _blank_difficulty_weight(*, answers_count: int, correct_answers_ratio: float) -> float:
+    """Возвращает вес заготовки по доле правильных ответов на вопросы из нее."""
+    if answers_count < getattr(settings, 'TASKS_BLANK_DIFFICULTY_MIN_ANSWERS', 5):
+        return 1.0
+
+    low, high = getattr(settings, 'TASKS_BLANK_DIFFICULTY_BAND', (0.5, 0.85))
+
+    return 1.0 if low <= correct_answers_ratio <= high else getattr(settings, 'TASKS_BLANK_OUTSIDE_BAND_WEIGHT', 0.2)
+
+
+def blank_weights_get(*, task_id: int) -> BlankWeights:
+    """
+    Возвращает пул заготовок задания с весами по сложности.
+
+    Веса вычисляются по статистике заготовок и хранятся в памяти процесса вместе с пулом под ключом
+    текущей версии пула задания, поэтому изменение заготовок задания учитывается сразу, а статистика -
+    через TASKS_BLANK_WEIGHTS_TIMEOUT секунд. При наличии весов в памяти к БД и пулу в кэше не обращается.
+    """
+    pool_key = cache_versioned_key(namespace=BLANK_POOL_CACHE_NAMESPACE, object_id=task_id)
+
+    with _blank_weights_lock:
+        blank_weights = _blank_weights_by_pool_key.get(pool_key)
+        if blank_weights and time.monotonic() - blank_weights.built_at < getattr(
+            settings, 'TASKS_BLANK_WEIGHTS_TIMEOUT', 300
+        ):
+            _blank_weights_by_pool_key.move_to_end(pool_key)
+            return blank_weights
+
+    statistics = {
+        (question_type, blank_id): (answers_count, correct_answers_ratio)
+        for question_type, blank_id, answers_count, correct_answers_ratio in BlankStatistics.objects.filter(
+            task_id=task_id, answers_count__gt=0
+        ).values_list('question_type', 'blank_id', 'answers_count', 'correct_answers_ratio')
+    }
+
+    rows, indexes, weights = [], {}, []
+    for blank_model, model_pool in zip(BLANK_MODELS, blanks_pool_get(task_id=task_id), strict=True):
+        id_index = _blank_pool_field_names(blank_model).index('id')
+        for values in model_pool:
+            key = (blank_model.QUESTION_TYPE, values[id_index])
+            answers_count, correct_answers_ratio = statistics.get(key, (0, 0.0))
+            indexes[key] = len(rows)
+            rows.append((blank_model, values))
+            weights.append(
+                _blank_difficulty_weight(answers_count=answers_count, correct_answers_ratio=correct_answers_ratio)
+            )
+
+    blank_weights = BlankWeights(
+        built_at=time.monotonic(), rows=rows, indexes=indexes, sampler=WeightedSampler(weights)
+    )
+
+    with _blank_weights_lock:
+        _blank_weights_by_pool_key[pool_key] = blank_weights
+        while len(_blank_weights_by_pool_key) > BLANK_WEIGHTS_MAX_TASKS:
+            _blank_weights_by_pool_key.popitem(last=False)
+
+    return blank_weights
+
+
+def blanks_sample_by_difficulty(*, task: Task, count: int, user: User | None = None) -> list[Blank]:
+    """
+    Выбирает заготовки задания без возвращения с вероятностями, пропорциональными весам по сложности.
+
+    Выборка выполняется по весам в памяти процесса за O(k log n), см. blank_weights_get.
+    """
+    blank_weights = blank_weights_get(task_id=task.id)
+    blanks = [blank_weights.blank(x) for x in blank_weights.sampler.sample(count)]
+    random.shuffle(blanks)
+
+    return blanks
+
+
+def blanks_sample_spaced_repetition(*, task: Task, count: int, user: User | None = None) -> list[Blank]:
+    """
+    Выбирает в первую очередь заготовки, повторение которых пользователю пора выполнить.
+
+    Заготовки, подлежащие повторению, загружаются по индексу (пользователь, задание, дата повторения)
+    с ограничением количества и выбираются без возвращения с вероятностями, пропорциональными весам
+    пользователя (растут с количеством неверных ответов). Недостающие заготовки выбираются
+    по весам сложности, как в blanks_sample_by_difficulty.
+    """
+    blank_weights = blank_weights_get(task_id=task.id)
+
+    candidates = []
+    if user is not None:
+        due_weights = UserBlankWeight.objects.filter(user=user, task=task, due_at__lte=timezone.now()).order_by(
+            'due_at'
+        )[: count * SPACED_REPETITION_CANDIDATES_FACTOR]
+        for question_type, blank_id, weight in due_weights.values_list('question_type', 'blank_id', 'weight'):
+            index = blank_weights.indexes.get((question_type, blank_id))
+            # Удаленные заготовки пропускаются.
+            if index is not None:
+                candidates.append((index, weight))
+
+    selected = [candidates[x][0] for x in WeightedSampler([x for _x, x in candidates]).sample(count)]
+    selected.extend(blank_weights.sampler.sample(count - len(selected), exclude=set(selected)))
+
+    blanks = [blank_weights.blank(x) for x in selected]
+    random.shuffle(blanks)
+
+    return blanks
+
+
+# Стратегии выборки заготовок. Пользователь, для которого создается испытание, учитывается только
+# персональными стратегиями, остальные выбирают заготовки равновероятно.
+BLANK_SAMPLING_STRATEGIES: dict[str, Callable[..., list[Blank]]] = {
+    'full_scan': blanks_sample_full_scan,
+    'ids': blanks_sample_by_ids,
+    'id_range': blanks_sample_by_id_range,
+    'cached': blanks_sample_cached,
+    'difficulty': blanks_sample_by_difficulty,
+    'spaced_repetition': blanks_sample_spaced_repetition,
+}
+
+
+def blanks_sample(*, task: Task, count: int, user: User | None = None, strategy: str | None = None) -> list[Blank]:
+    """
+    Возвращает заготовки задания для испытания пользователя в случайном порядке.
+
+    Стратегия выборки берется из настройки TASKS_BLANK_SAMPLING_STRATEGY, если не указана явно.
+    """
+    strategy = strategy or getattr(settings, 'TASKS_BLANK_SAMPLING_STRATEGY', 'ids')
+
+    return BLANK_SAMPLING_STRATEGIES[strategy](task=task, count=count, user=user)
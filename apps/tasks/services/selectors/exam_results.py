@@ -0,0 +1,130 @@
+import datetime
+
+from django.db.models import BooleanField, Case, F, FloatField, Q, QuerySet, Value, When
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from apps.tasks.models import ExamIncorrectWordQuestion, ExamOptionsQuestion, ExamQuestion, QuestionTypes, UserExam
+
+# Колонки выгрузки результатов испытаний, совпадают с полями values_list запросов выгрузки.
+EXAM_RESULTS_EXPORT_COLUMNS = (
+    'exam_id',
+    'user_id',
+    'username',
+    'task_id',
+    'task_title',
+    'created_at',
+    'finished_at',
+    'questions_count',
+    'answered_questions_count',
+    'correct_answers_count',
+    'incorrect_answers_count',
+    'score_percent',
+)
+
+EXAM_QUESTION_RESULTS_EXPORT_COLUMNS = (
+    'exam_id',
+    'user_id',
+    'username',
+    'task_id',
+    'position',
+    'question_type',
+    'question_text',
+    'finished_at',
+    'answer_is_correct',
+)
+
+
+def _exam_filters(
+    *,
+    prefix: str = '',
+    task_id: int | None = None,
+    user_id: int | None = None,
+    created_from: datetime.datetime | None = None,
+    created_before: datetime.datetime | None = None,
+) -> Q:
+    """Возвращает условие отбора испытаний."""
+    filters = {
+        'task_id': task_id,
+        'user_id': user_id,
+        'created_at__gte': created_from,
+        'created_at__lt': created_before,
+    }
+
+    return Q(**{f'{prefix}{lookup}': value for lookup, value in filters.items() if value is not None})
+
+
+def exam_results_export_queryset(
+    *,
+    task_id: int | None = None,
+    user_id: int | None = None,
+    created_from: datetime.datetime | None = None,
+    created_before: datetime.datetime | None = None,
+) -> QuerySet:
+    """
+    Возвращает запрос строк выгрузки результатов испытаний, по одной на испытание.
+
+    Показатели вычисляются в БД из счетчиков испытания. Неотвеченные вопросы считаются
+    неверными ответами, как на странице результатов. Период создания испытаний задается
+    полуинтервалом [created_from, created_before).
+    """
+    exam_filters = _exam_filters(
+        task_id=task_id, user_id=user_id, created_from=created_from, created_before=created_before
+    )
+
+    return (
+        UserExam.objects.filter(exam_filters)
+        .order_by('id')
+        .annotate(
+            exam_id=F('id'),
+            username=F('user__username'),
+            task_title=F('task__title'),
+            incorrect_answers_count=F('questions_count') - F('correct_answers_count'),
+            score_percent=(
+                Cast(F('correct_answers_count'), FloatField()) * 100 / NullIf(F('questions_count'), Value(0))
+            ),
+        )
+        .values_list(*EXAM_RESULTS_EXPORT_COLUMNS)
+    )
+
+
+def exam_question_results_export_queryset(
+    *,
+    task_id: int | None = None,
+    user_id: int | None = None,
+    created_from: datetime.datetime | None = None,
+    created_before: datetime.datetime | None = None,
+) -> QuerySet:
+    """
+    Возвращает запрос строк выгрузки результатов испытаний, по одной на отвеченный вопрос.
+
+    Правильность ответа вычисляется в БД. Период создания испытаний задается
+    полуинтервалом [created_from, created_before).
+    """
+    exam_filters = _exam_filters(
+        prefix='exam__', task_id=task_id, user_id=user_id, created_from=created_from, created_before=created_before
+    )
+
+    return (
+        ExamQuestion.objects.filter(exam_filters, finished_at__isnull=False)
+        .order_by('exam_id', 'position')
+        .annotate(
+            user_id=F('exam__user_id'),
+            username=F('exam__user__username'),
+            task_id=F('exam__task_id'),
+            question_text=Coalesce('question', 'incorrect_word'),
+            answer_is_correct=Case(
+                When(
+                    Q(question_type=QuestionTypes.INCORRECT_WORD)
+                    & ExamIncorrectWordQuestion.answer_is_correct_condition(),
+                    then=Value(True),
+                ),
+                When(
+                    Q(question_type=QuestionTypes.OPTIONS) & ExamOptionsQuestion.answer_is_correct_condition(),
+                    then=Value(True),
+                ),
+                default=Value(False),
+                output_field=BooleanField(),
+            ),
+        )
+        .values_list(*EXAM_QUESTION_RESULTS_EXPORT_COLUMNS)
+    )
@@ -0,0 +1,153 @@
+from dataclasses import dataclass
+from functools import cached_property
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import QuerySet
+
+from apps.tasks.models import ExamIncorrectWordQuestion, ExamOptionsQuestion, ExamQuestion, QuestionTypes
+from apps.tasks.services.cache import (
+    acache_version_get,
+    cache_version_bump,
+    cache_version_get,
+    cache_versioned_key,
+)
+from apps.tasks.services.selectors.tasks import ExamQuestionRef
+
+EXAM_SNAPSHOT_CACHE_NAMESPACE = 'exam_snapshot'
+
+# Поля вопроса, которые меняются при ответе на вопрос, см. exam_snapshot_question_update.
+EXAM_SNAPSHOT_ANSWER_FIELD_NAMES = (
+    'finished_at',
+    'selected_letter_index',
+    'selected_option1_is_true',
+    'selected_option2_is_true',
+    'selected_option3_is_true',
+)
+
+
+def _exam_snapshot_field_names() -> list[str]:
+    """Возвращает имена полей вопроса, хранимых в снимке испытания."""
+    return [x.attname for x in ExamQuestion._meta.concrete_fields]
+
+
+@dataclass(frozen=True)
+class ExamSnapshot:
+    """
+    Снимок вопросов испытания.
+
+    Вопросы хранятся в компактном виде: кортежи значений полей ExamQuestion в порядке следования.
+    Версия снимка совпадает с версией ключа кэша, под которым он сохранен.
+    """
+
+    exam_id: int
+    version: int
+    rows: tuple[tuple, ...]
+
+    @cached_property
+    def questions(self) -> list[ExamIncorrectWordQuestion | ExamOptionsQuestion]:
+        """Вопросы испытания в порядке следования."""
+        field_names = _exam_snapshot_field_names()
+
+        return [ExamQuestion.from_db(ExamQuestion.objects.db, field_names, row).as_exam_question() for row in self.rows]
+
+    @cached_property
+    def _questions_by_key(self) -> dict[tuple[str, int], ExamIncorrectWordQuestion | ExamOptionsQuestion]:
+        """Вопросы испытания по типу и идентификатору."""
+        return {(x.QUESTION_TYPE, x.id): x for x in self.questions}
+
+    def get_question(
+        self, *, question_type: QuestionTypes, question_id: int
+    ) -> ExamIncorrectWordQuestion | ExamOptionsQuestion | None:
+        """Возвращает вопрос испытания, если он есть в снимке."""
+        return self._questions_by_key.get((question_type, question_id))
+
+    def get_prev_and_next_question(
+        self, *, question: ExamIncorrectWordQuestion | ExamOptionsQuestion
+    ) -> tuple[ExamQuestionRef | None, ExamQuestionRef | None]:
+        """Аналог exam_get_prev_and_next_question без обращения к БД."""
+        refs = {x.position: ExamQuestionRef(x.QUESTION_TYPE, x.id, x.position) for x in self.questions}
+
+        return refs.get(question.position - 1), refs.get(question.position + 1)
+
+
+def _exam_snapshot_queryset(*, exam_id: int) -> QuerySet:
+    """Возвращает запрос значений полей вопросов испытания для снимка."""
+    return ExamQuestion.objects.filter(exam_id=exam_id).order_by('position').values_list(*_exam_snapshot_field_names())
+
+
+def _exam_snapshot_cache_timeout() -> int:
+    """Срок хранения снимка испытания в кэше."""
+    return getattr(settings, 'TASKS_EXAM_SNAPSHOT_CACHE_TIMEOUT', 60 * 60)
+
+
+def exam_snapshot_get(*, exam_id: int) -> ExamSnapshot:
+    """
+    Возвращает снимок вопросов испытания из кэша.
+
+    При отсутствии в кэше снимок загружается из БД одним запросом и сохраняется под ключом текущей версии.
+    Снимок с устаревшей версией не читается.
+    """
+    version = cache_version_get(namespace=EXAM_SNAPSHOT_CACHE_NAMESPACE, object_id=exam_id)
+    cache_key = cache_versioned_key(namespace=EXAM_SNAPSHOT_CACHE_NAMESPACE, object_id=exam_id, version=version)
+
+    rows = cache.get(cache_key)
+    if rows is None:
+        rows = tuple(_exam_snapshot_queryset(exam_id=exam_id))
+        cache.set(cache_key, rows, timeout=_exam_snapshot_cache_timeout())
+
+    return ExamSnapshot(exam_id=exam_id, version=version, rows=rows)
+
+
+async def aexam_snapshot_get(*, exam_id: int) -> ExamSnapshot:
+    """Асинхронный вариант exam_snapshot_get."""
+    version = await acache_version_get(namespace=EXAM_SNAPSHOT_CACHE_NAMESPACE, object_id=exam_id)
+    cache_key = cache_versioned_key(namespace=EXAM_SNAPSHOT_CACHE_NAMESPACE, object_id=exam_id, version=version)
+
+    rows = await cache.aget(cache_key)
+    if rows is None:
+        rows = tuple([x async for x in _exam_snapshot_queryset(exam_id=exam_id)])
+        await cache.aset(cache_key, rows, timeout=_exam_snapshot_cache_timeout())
+
+    return ExamSnapshot(exam_id=exam_id, version=version, rows=rows)
+
+
+def exam_snapshot_question_update(*, question: ExamIncorrectWordQuestion | ExamOptionsQuestion) -> None:
+    """
+    Обновляет ответ на вопрос в снимке испытания после фиксации текущей транзакции.
+
+    Версия снимка увеличивается, а снимок предыдущей версии с обновленной строкой вопроса сохраняется
+    под ключом новой версии без загрузки из БД. Снимок сохраняется, только если версия увеличена ровно
+    на единицу, то есть между чтением снимка и увеличением версии его не изменил другой ответ;
+    иначе снимок будет загружен из БД при следующем чтении.
+    """
+    field_names = _exam_snapshot_field_names()
+    question_type_index, question_id_index = field_names.index('question_type'), field_names.index('question_id')
+    answer = {x: getattr(question, x) for x in EXAM_SNAPSHOT_ANSWER_FIELD_NAMES if hasattr(question, x)}
+
+    def update() -> None:
+        version = cache_version_get(namespace=EXAM_SNAPSHOT_CACHE_NAMESPACE, object_id=question.exam_id)
+        rows = cache.get(
+            cache_versioned_key(namespace=EXAM_SNAPSHOT_CACHE_NAMESPACE, object_id=question.exam_id, version=version)
+        )
+
+        new_version = cache_version_bump(namespace=EXAM_SNAPSHOT_CACHE_NAMESPACE, object_id=question.exam_id)
+        if rows is None or new_version != version + 1:
+            return
+
+        rows = tuple(
+            tuple(answer.get(x, value) for x, value in zip(field_names, row, strict=True))
+            if (row[question_type_index], row[question_id_index]) == (question.QUESTION_TYPE, question.id)
+            else row
+            for row in rows
+        )
+        cache.set(
+            cache_versioned_key(
+                namespace=EXAM_SNAPSHOT_CACHE_NAMESPACE, object_id=question.exam_id, version=new_version
+            ),
+            rows,
+            timeout=_exam_snapshot_cache_timeout(),
+        )
+
+    transaction.on_commit(update)
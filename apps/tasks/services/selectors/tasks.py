@@ -1,31 +1,67 @@
-from apps.tasks.models import ExamIncorrectWordQuestion, ExamOptionsQuestion, UserExam
+from typing import NamedTuple
 
+from django.db.models import QuerySet
 
-def exam_get_questions(exam: UserExam) -> None:
-    """Возвращает последовательность вопросов в испытании."""
-    return sorted(
-        [
-            *exam.examincorrectwordquestion_set.all(),
-            *exam.examoptionsquestion_set.all(),
-        ],
-        key=lambda x: x.created_at,
+from apps.tasks.models import (
+    ExamIncorrectWordQuestion,
+    ExamOptionsQuestion,
+    ExamQuestion,
+    QuestionTypes,
+    UserExam,
+)
+
+
+class ExamQuestionRef(NamedTuple):
+    """Ссылка на вопрос испытания."""
+
+    question_type: QuestionTypes
+    id: int
+    position: int
+
+
+def exam_get_questions(exam: UserExam) -> list[ExamIncorrectWordQuestion | ExamOptionsQuestion]:
+    """Возвращает последовательность вопросов в испытании одним запросом."""
+    return [x.as_exam_question() for x in ExamQuestion.objects.filter(exam=exam).order_by('position')]
+
+
+async def aexam_get_questions(exam: UserExam) -> list[ExamIncorrectWordQuestion | ExamOptionsQuestion]:
+    """Асинхронный вариант exam_get_questions."""
+    return [x.as_exam_question() async for x in ExamQuestion.objects.filter(exam=exam).order_by('position')]
+
+
+def _exam_neighbour_questions_queryset(*, question: ExamIncorrectWordQuestion | ExamOptionsQuestion) -> QuerySet:
+    """Возвращает запрос ссылок на соседние вопросы испытания."""
+    return (
+        ExamQuestion.objects.filter(
+            exam_id=question.exam_id, position__in=(question.position - 1, question.position + 1)
+        )
+        .order_by()
+        .values_list('question_type', 'question_id', 'position')
     )
 
 
 def exam_get_prev_and_next_question(
     *, question: ExamIncorrectWordQuestion | ExamOptionsQuestion
-) -> tuple[
-    ExamIncorrectWordQuestion | ExamOptionsQuestion | None, ExamIncorrectWordQuestion | ExamOptionsQuestion | None
-]:
-    """Возвращает предыдущий и следующий вопрос испытания."""
-    all_questions = exam_get_questions(question.exam)
+) -> tuple[ExamQuestionRef | None, ExamQuestionRef | None]:
+    """
+    Возвращает ссылки на предыдущий и следующий вопрос испытания.
 
-    try:
-        question_index = all_questions.index(question)
-    except ValueError:
-        return None, None
+    Соседние вопросы обоих типов выбираются одним запросом по индексу (испытание, порядковый номер).
+    """
+    neighbours = {
+        x.position: x for x in map(ExamQuestionRef._make, _exam_neighbour_questions_queryset(question=question))
+    }
 
-    return (
-        all_questions[question_index - 1] if question_index > 1 else None,
-        all_questions[question_index + 1] if question_index + 1 < len(all_questions) else None,
-    )
+    return neighbours.get(question.position - 1), neighbours.get(question.position + 1)
+
+
+async def aexam_get_prev_and_next_question(
+    *, question: ExamIncorrectWordQuestion | ExamOptionsQuestion
+) -> tuple[ExamQuestionRef | None, ExamQuestionRef | None]:
+    """Асинхронный вариант exam_get_prev_and_next_question."""
+    neighbours = {}
+    async for row in _exam_neighbour_questions_queryset(question=question):
+        question_ref = ExamQuestionRef._make(row)
+        neighbours[question_ref.position] = question_ref
+
+    return neighbours.get(question.position - 1), neighbours.get(question.position + 1)
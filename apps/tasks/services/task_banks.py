@@ -0,0 +1,255 @@
+import csv
+import json
+from collections import Counter
+from collections.abc import Iterable, Iterator
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from apps.core.streaming import csv_lines
+from apps.tasks.models import (
+    IncorrectWordQuestionBlank,
+    OptionsQuestionBlank,
+    QuestionTypes,
+    Task,
+    incorrect_word_letter_index,
+)
+from apps.tasks.services.selectors.blanks import BLANK_MODELS, Blank, blanks_pool_invalidate
+
+# Тип строки банка с заданием.
+TASK_BANK_TASK_TYPE = 'task'
+
+# Поля строк банка по типам строк.
+TASK_BANK_FIELDS = {
+    TASK_BANK_TASK_TYPE: ('id', 'title', 'description', 'max_questions_count', 'time_limit_minutes'),
+    QuestionTypes.INCORRECT_WORD: ('task_id', 'correct_word', 'incorrect_word'),
+    QuestionTypes.OPTIONS: (
+        'task_id',
+        'question',
+        'option1',
+        'option1_is_true',
+        'option2',
+        'option2_is_true',
+        'option3',
+        'option3_is_true',
+    ),
+}
+
+# Колонки банка в табличном формате: тип строки и поля всех типов строк.
+TASK_BANK_COLUMNS = ('type', *dict.fromkeys(x for fields in TASK_BANK_FIELDS.values() for x in fields))
+
+BLANK_MODEL_BY_TYPE = {x.QUESTION_TYPE: x for x in BLANK_MODELS}
+
+# Максимальное количество ошибок в сообщении об ошибке импорта.
+TASK_BANK_MAX_REPORTED_ERRORS = 20
+
+
+def task_bank_rows(*, task_ids: Iterable[int] | None = None, chunk_size: int = 2000) -> Iterator[dict]:
+    """
+    Возвращает строки банка заданий: сначала задания, затем их заготовки вопросов.
+
+    Строки читаются из БД частями по chunk_size без создания объектов моделей, поэтому
+    потребление памяти не зависит от размера банка.
+    """
+    tasks = Task.objects.order_by('id')
+    if task_ids is not None:
+        task_ids = list(task_ids)
+        tasks = tasks.filter(id__in=task_ids)
+
+    for values in tasks.values(*TASK_BANK_FIELDS[TASK_BANK_TASK_TYPE]).iterator(chunk_size=chunk_size):
+        yield {'type': TASK_BANK_TASK_TYPE, **values}
+
+    for blank_model in BLANK_MODELS:
+        blanks = blank_model.objects.order_by('task_id', 'id')
+        if task_ids is not None:
+            blanks = blanks.filter(task_id__in=task_ids)
+
+        for values in blanks.values(*TASK_BANK_FIELDS[blank_model.QUESTION_TYPE]).iterator(chunk_size=chunk_size):
+            yield {'type': blank_model.QUESTION_TYPE, **values}
+
+
+def task_bank_csv_lines(rows: Iterable[dict]) -> Iterator[str]:
+    """Возвращает строки банка заданий в формате CSV с заголовком."""
+    return csv_lines(([row.get(x) for x in TASK_BANK_COLUMNS] for row in rows), header=TASK_BANK_COLUMNS)
+
+
+def task_bank_jsonl_lines(rows: Iterable[dict]) -> Iterator[str]:
+    """Возвращает строки банка заданий в формате JSON Lines."""
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def task_bank_rows_from_csv(lines: Iterable[str]) -> Iterator[dict]:
+    """Читает строки банка заданий из CSV с заголовком. Пустые значения не передаются."""
+    for row in csv.DictReader(lines):
+        yield {key: value for key, value in row.items() if value != ''}
+
+
+def task_bank_rows_from_jsonl(lines: Iterable[str]) -> Iterator[dict]:
+    """Читает строки банка заданий в формате JSON Lines. Пустые строки пропускаются."""
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            raise ValidationError(f'Строка {line_number}: некорректный JSON') from exc
+
+        if not isinstance(row, dict):
+            raise ValidationError(f'Строка {line_number}: ожидается объект JSON')
+
+        yield row
+
+
+TASK_BANK_FORMATS = {
+    'csv': (task_bank_rows_from_csv, task_bank_csv_lines),
+    'jsonl': (task_bank_rows_from_jsonl, task_bank_jsonl_lines),
+}
+
+
+def incorrect_word_letter_indexes(*, correct_words: list[str], incorrect_words: list[str]) -> list[int | None]:
+    """
+    Вычисляет номера неправильных букв для пакета пар слов.
+
+    Номер вычисляется для каждой пары сравнением букв, как в clean() заготовки, но без создания
+    и проверки модели для каждой пары.
+    """
+    return list(map(incorrect_word_letter_index, correct_words, incorrect_words))
+
+
+def _validation_error_messages(exc: ValidationError) -> list[str]:
+    """Сообщения исключения ValidationError с именами полей."""
+    if hasattr(exc, 'error_dict'):
+        return [f'{field}: {message}' for field, messages in exc.message_dict.items() for message in messages]
+
+    return exc.messages
+
+
+def _blanks_validate(*, blank_model: type[Blank], blanks: list[tuple[int, Blank]]) -> list[str]:
+    """
+    Проверяет пакет заготовок, возвращает сообщения об ошибках с номерами строк.
+
+    Для заготовок с неправильной буквой номер буквы вычисляется для всего пакета,
+    поэтому clean() заготовки не вызывается.
+    """
+    errors = []
+    invalid_line_numbers = set()
+
+    if blank_model is IncorrectWordQuestionBlank:
+        indexes = incorrect_word_letter_indexes(
+            correct_words=[x.correct_word for _x, x in blanks], incorrect_words=[x.incorrect_word for _x, x in blanks]
+        )
+        for (line_number, blank), incorrect_letter_index in zip(blanks, indexes, strict=True):
+            if incorrect_letter_index is None:
+                errors.append(f'Строка {line_number}: формы слова должны отличаться в одной из букв')
+                invalid_line_numbers.add(line_number)
+            blank.incorrect_letter_index = incorrect_letter_index
+
+    for line_number, blank in blanks:
+        if line_number in invalid_line_numbers:
+            continue
+
+        try:
+            blank.clean_fields(exclude=('task',))
+            if blank_model is OptionsQuestionBlank:
+                blank.clean()
+        except ValidationError as exc:
+            errors.extend(f'Строка {line_number}: {x}' for x in _validation_error_messages(exc))
+
+    return errors
+
+
+def _blanks_bulk_create(*, blank_model: type[Blank], blanks: list[tuple[int, Blank]], batch_size: int) -> int:
+    """Проверяет и сохраняет пакет заготовок одним запросом."""
+    if errors := _blanks_validate(blank_model=blank_model, blanks=blanks):
+        raise ValidationError(errors[:TASK_BANK_MAX_REPORTED_ERRORS])
+
+    blank_model.objects.bulk_create((x for _x, x in blanks), batch_size=batch_size)
+
+    return len(blanks)
+
+
+@transaction.atomic
+def task_bank_import(*, rows: Iterable[dict], batch_size: int = 1000) -> Counter:
+    """
+    Импортирует банк заданий, возвращает количество созданных объектов по типам строк.
+
+    Строки обрабатываются потоком: заготовки проверяются и сохраняются пакетами по batch_size
+    через bulk_create. Задания создаются как новые объекты. Поле task_id заготовки ссылается
+    на id задания из импортируемых строк, а при его отсутствии среди них - на существующее задание.
+    Импорт выполняется в одной транзакции: при ошибке не сохраняется ничего.
+    """
+    created_counts = Counter()
+    # Идентификаторы заданий из импортируемых строк и соответствующие им созданные задания.
+    task_ids: dict[str, int] = {}
+    existing_task_ids: set[int] = set()
+    pending_blanks: dict[type[Blank], list[tuple[int, Blank]]] = {x: [] for x in BLANK_MODELS}
+
+    for line_number, row in enumerate(rows, start=1):
+        row_type = row.get('type')
+
+        if row_type == TASK_BANK_TASK_TYPE:
+            task = Task(**{x: row[x] for x in TASK_BANK_FIELDS[TASK_BANK_TASK_TYPE][1:] if x in row})
+            try:
+                task.full_clean()
+            except ValidationError as exc:
+                raise ValidationError([f'Строка {line_number}: {x}' for x in _validation_error_messages(exc)]) from exc
+            task.save()
+
+            if row.get('id') not in (None, ''):
+                task_ids[str(row['id'])] = task.id
+            created_counts[row_type] += 1
+            continue
+
+        blank_model = BLANK_MODEL_BY_TYPE.get(row_type)
+        if blank_model is None:
+            raise ValidationError(f'Строка {line_number}: неизвестный тип строки {row_type!r}')
+
+        task_id = _task_bank_task_id(
+            source_task_id=row.get('task_id'), task_ids=task_ids, existing_task_ids=existing_task_ids
+        )
+        if task_id is None:
+            raise ValidationError(f'Строка {line_number}: задание {row.get("task_id")!r} не найдено')
+
+        blank_data = {x: row[x] for x in TASK_BANK_FIELDS[row_type][1:] if x in row}
+        pending_blanks[blank_model].append((line_number, blank_model(task_id=task_id, **blank_data)))
+
+        if len(pending_blanks[blank_model]) >= batch_size:
+            created_counts[row_type] += _blanks_bulk_create(
+                blank_model=blank_model, blanks=pending_blanks[blank_model], batch_size=batch_size
+            )
+            pending_blanks[blank_model] = []
+
+    for blank_model, blanks in pending_blanks.items():
+        if blanks:
+            created_counts[blank_model.QUESTION_TYPE] += _blanks_bulk_create(
+                blank_model=blank_model, blanks=blanks, batch_size=batch_size
+            )
+
+    # bulk_create не отправляет сигналы сохранения, пулы заготовок сбрасываются явно.
+    for task_id in {*task_ids.values(), *existing_task_ids}:
+        blanks_pool_invalidate(task_id=task_id)
+
+    return created_counts
+
+
+def _task_bank_task_id(*, source_task_id, task_ids: dict[str, int], existing_task_ids: set[int]) -> int | None:
+    """Возвращает идентификатор задания для заготовки или None, если задание не найдено."""
+    if source_task_id in (None, ''):
+        return None
+
+    if (task_id := task_ids.get(str(source_task_id))) is not None:
+        return task_id
+
+    try:
+        task_id = int(source_task_id)
+    except (TypeError, ValueError):
+        return None
+
+    if task_id not in existing_task_ids:
+        if not Task.objects.filter(id=task_id).exists():
+            return None
+        existing_task_ids.add(task_id)
+
+    return task_id
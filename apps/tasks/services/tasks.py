@@ -1,27 +1,62 @@
+import datetime
+import functools
 import random
+from collections.abc import Iterable
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import transaction
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import F, Value
+from django.template.loader import render_to_string
 from django.utils import timezone
 
+from apps.core.jobs import job_enqueue, jobs_bulk_enqueue
+
+from apps.tasks.metrics import (
+    EXAM_ANSWER_SECONDS,
+    EXAM_ANSWERS,
+    EXAM_CREATE_SECONDS,
+    EXAMS_EXPIRED,
+    EXAMS_FINISHED,
+    EXAMS_STARTED,
+)
 from apps.tasks.models import (
+    EXAM_QUESTION_MODEL_BY_TYPE,
     ExamIncorrectWordQuestion,
     ExamOptionsQuestion,
     IncorrectWordQuestionBase,
     IncorrectWordQuestionBlank,
     OptionsQuestionBlank,
+    QuestionTypes,
     Task,
     UserExam,
+    UserExamResults,
 )
+from apps.tasks.services.blank_statistics import blank_statistics_answer_add
+from apps.tasks.services.cache import cache_is_shared, cache_object_key, cache_version_bump
+from apps.tasks.services.selectors.blanks import blanks_sample
+from apps.tasks.services.selectors.exam_snapshots import exam_snapshot_get, exam_snapshot_question_update
+
+# Пространства имен кэша отрисованных страниц.
+TASK_LIST_PAGE_CACHE_NAMESPACE = 'task_list_page'
+TASK_DETAIL_PAGE_CACHE_NAMESPACE = 'task_detail_page'
+EXAM_RESULT_PAGE_CACHE_NAMESPACE = 'exam_result_page'
+# Идентификатор кэша для страниц со списком всех заданий.
+TASK_LIST_CACHE_OBJECT_ID = 'all'
+# Имя фоновой задачи обработки завершенного испытания (см. apps.tasks.jobs.exam_finalize).
+EXAM_FINALIZE_JOB_NAME = 'tasks.exam_finalize'
 
 
 def exam_incorrect_word_question_create_from_blank(
-    *, exam: UserExam, blank: IncorrectWordQuestionBlank, commit: bool = True
+    *, exam: UserExam, blank: IncorrectWordQuestionBlank, position: int, commit: bool = True
 ) -> ExamIncorrectWordQuestion:
     """Создает объект вопроса с неправильной буквой для испытания."""
     new_instance_data = {x.name: getattr(blank, x.name) for x in IncorrectWordQuestionBase._meta.get_fields()}
 
-    new_instance = ExamIncorrectWordQuestion(exam=exam, **new_instance_data)
+    new_instance = ExamIncorrectWordQuestion(exam=exam, blank=blank, position=position, **new_instance_data)
 
     if not commit:
         return new_instance
@@ -33,10 +68,10 @@ def exam_incorrect_word_question_create_from_blank(
 
 
 def exam_options_question_create_from_blank(
-    *, exam: UserExam, blank: OptionsQuestionBlank, commit: bool = True
+    *, exam: UserExam, blank: OptionsQuestionBlank, position: int, commit: bool = True
 ) -> ExamOptionsQuestion:
     """Создает объект вопроса с вариантами ответов для испытания."""
-    new_instance = ExamOptionsQuestion(exam=exam, question=blank.question)
+    new_instance = ExamOptionsQuestion(exam=exam, blank=blank, position=position, question=blank.question)
 
     acceptor_field_pairs = (
         ('option1', 'option1_is_true'),
@@ -64,48 +99,363 @@ def exam_options_question_create_from_blank(
     return new_instance
 
 
+def _exam_questions_deleted_blanks_detach(
+    *, exam_questions: list[ExamIncorrectWordQuestion | ExamOptionsQuestion]
+) -> None:
+    """
+    Отвязывает вопросы испытания от заготовок, удаленных после выборки.
+
+    Заготовки могут быть выбраны из пула в кэше, который сбрасывается только после фиксации удаления,
+    и ссылка на удаленную заготовку нарушила бы внешний ключ при сохранении вопроса. Наличие заготовок
+    всех типов проверяется одним запросом UNION. Текст вопроса уже скопирован из заготовки, поэтому
+    вопрос сохраняется без ссылки на нее, как после удаления заготовки (SET_NULL).
+    """
+    blank_ids_by_type = {}
+    for exam_question in exam_questions:
+        if exam_question.blank_id is not None:
+            blank_ids_by_type.setdefault(exam_question.QUESTION_TYPE, set()).add(exam_question.blank_id)
+
+    if not blank_ids_by_type:
+        return
+
+    querysets = [
+        EXAM_QUESTION_MODEL_BY_TYPE[question_type]
+        ._meta.get_field('blank')
+        .related_model.objects.filter(id__in=blank_ids)
+        .order_by()
+        .values_list(Value(question_type), 'id')
+        for question_type, blank_ids in blank_ids_by_type.items()
+    ]
+    existing_blank_keys = set(querysets[0].union(*querysets[1:], all=True))
+
+    for exam_question in exam_questions:
+        if (
+            exam_question.blank_id is not None
+            and (exam_question.QUESTION_TYPE, exam_question.blank_id) not in existing_blank_keys
+        ):
+            exam_question.blank = None
+
+
+def exam_questions_bulk_create(
+    *, exam: UserExam, blanks: Iterable[IncorrectWordQuestionBlank | OptionsQuestionBlank]
+) -> list[ExamIncorrectWordQuestion | ExamOptionsQuestion]:
+    """
+    Создает вопросы испытания на основе заготовок пакетно.
+
+    Порядковые номера вопросов соответствуют порядку заготовок. Все вопросы проверяются
+    в памяти за один проход, после чего вопросы каждого типа сохраняются одним запросом.
+    """
+    exam_questions = [
+        exam_options_question_create_from_blank(exam=exam, blank=blank, position=position, commit=False)
+        if isinstance(blank, OptionsQuestionBlank)
+        else exam_incorrect_word_question_create_from_blank(exam=exam, blank=blank, position=position, commit=False)
+        for position, blank in enumerate(blanks, start=1)
+    ]
+
+    _exam_questions_deleted_blanks_detach(exam_questions=exam_questions)
+
+    errors = []
+    for exam_question in exam_questions:
+        try:
+            # Испытание сохранено в этой же транзакции, наличие заготовок проверено выше.
+            exam_question.full_clean(exclude=('exam', 'blank'))
+        except ValidationError as exc:
+            errors.append(exc)
+
+    if errors:
+        raise ValidationError(errors)
+
+    for exam_question_model in EXAM_QUESTION_MODEL_BY_TYPE.values():
+        exam_question_model.objects.bulk_create([x for x in exam_questions if isinstance(x, exam_question_model)])
+
+    return exam_questions
+
+
 @transaction.atomic
 def exam_create_by_task(
     *, task: Task, user: User
 ) -> tuple[UserExam, ExamOptionsQuestion | ExamIncorrectWordQuestion | None]:
     """Создает испытание на основе задания."""
-    exam = UserExam(user=user, task=task)
-    # В текущей реализации дата начала совпадает с датой добавления.
-    exam.started_at = exam.created_at
-    exam.full_clean()
-    exam.save()
-
-    questions = [
-        *task.incorrectwordquestionblank_set.all(),
-        *task.optionsquestionblank_set.all(),
-    ]
+    with EXAM_CREATE_SECONDS.time():
+        blanks = blanks_sample(task=task, count=task.max_questions_count, user=user)
+        # Порядок вопросов случайный, вопросы разных типов чередуются независимо от стратегии выборки.
+        random.shuffle(blanks)
+
+        exam = UserExam(user=user, task=task, questions_count=len(blanks))
+        if task.time_limit_minutes:
+            exam.expires_at = timezone.now() + datetime.timedelta(minutes=task.time_limit_minutes)
+        # В текущей реализации дата начала совпадает с датой добавления.
+        exam.started_at = exam.created_at
+        exam.full_clean()
+        exam.save()
+
+        exam_questions = exam_questions_bulk_create(exam=exam, blanks=blanks)
+
+    transaction.on_commit(EXAMS_STARTED.inc)
+
+    return exam, next(iter(exam_questions), None)
+
+
+def exam_answer_counters_update(*, question: ExamIncorrectWordQuestion | ExamOptionsQuestion) -> None:
+    """Учитывает ответ на вопрос в счетчиках испытания, статистике заготовки и снимке испытания."""
+    UserExam.objects.filter(id=question.exam_id).update(
+        answered_questions_count=F('answered_questions_count') + 1,
+        correct_answers_count=F('correct_answers_count') + int(question.answer_is_correct),
+    )
+    blank_statistics_answer_add(question=question)
+    exam_snapshot_question_update(question=question)
+
+
+def _exam_question_answer_update(*, question: ExamIncorrectWordQuestion | ExamOptionsQuestion, **answer) -> bool:
+    """
+    Сохраняет ответ на вопрос, если ответ на него еще не получен.
+
+    Проверка и сохранение выполняются одним условным запросом UPDATE, поэтому из одновременных ответов
+    на один вопрос сохраняется только первый. Ответ после истечения времени испытания не сохраняется.
+    Возвращает признак сохранения ответа.
+    """
+    with EXAM_ANSWER_SECONDS.time(question_type=question.QUESTION_TYPE):
+        finished_at = timezone.now()
+        is_updated = bool(
+            type(question)
+            .objects.filter(id=question.id, finished_at__isnull=True)
+            .exclude(exam__expires_at__lte=finished_at)
+            .update(finished_at=finished_at, **answer)
+        )
+
+        if is_updated:
+            for field_name, value in answer.items():
+                setattr(question, field_name, value)
+            question.finished_at = finished_at
+
+            exam_answer_counters_update(question=question)
+
+    if is_updated:
+        result = 'correct' if question.answer_is_correct else 'incorrect'
+        transaction.on_commit(lambda: EXAM_ANSWERS.inc(question_type=question.QUESTION_TYPE, result=result))
+    else:
+        EXAM_ANSWERS.inc(question_type=question.QUESTION_TYPE, result='rejected')
+
+    return is_updated
+
+
+@transaction.atomic
+def exam_options_question_incorrect_word_answer_set(*, question: ExamIncorrectWordQuestion, letter_index: int) -> bool:
+    """
+    Фиксирует ответ на вопрос с некорректным словом.
+
+    Возвращает False, если ответ на вопрос был получен ранее.
+    """
+    return _exam_question_answer_update(question=question, selected_letter_index=letter_index)
+
+
+async def aexam_options_question_incorrect_word_answer_set(
+    *, question: ExamIncorrectWordQuestion, letter_index: int
+) -> bool:
+    """
+    Асинхронный вариант exam_options_question_incorrect_word_answer_set.
+
+    Транзакции не поддерживаются в асинхронном режиме, поэтому ответ и счетчики сохраняются
+    синхронной функцией в отдельном потоке.
+    """
+    return await sync_to_async(exam_options_question_incorrect_word_answer_set)(
+        question=question, letter_index=letter_index
+    )
+
+
+@transaction.atomic
+def exam_options_question_answer_set(
+    *,
+    question: ExamOptionsQuestion,
+    selected_option1_is_true: bool,
+    selected_option2_is_true: bool,
+    selected_option3_is_true: bool,
+) -> bool:
+    """
+    Фиксирует ответ на вопрос с вариантами ответа.
+
+    Возвращает False, если ответ на вопрос был получен ранее.
+    """
+    return _exam_question_answer_update(
+        question=question,
+        selected_option1_is_true=selected_option1_is_true,
+        selected_option2_is_true=selected_option2_is_true,
+        selected_option3_is_true=selected_option3_is_true,
+    )
+
+
+async def aexam_options_question_answer_set(
+    *,
+    question: ExamOptionsQuestion,
+    selected_option1_is_true: bool,
+    selected_option2_is_true: bool,
+    selected_option3_is_true: bool,
+) -> bool:
+    """Асинхронный вариант exam_options_question_answer_set."""
+    return await sync_to_async(exam_options_question_answer_set)(
+        question=question,
+        selected_option1_is_true=selected_option1_is_true,
+        selected_option2_is_true=selected_option2_is_true,
+        selected_option3_is_true=selected_option3_is_true,
+    )
+
+
+@transaction.atomic
+def exam_set_finished_at(*, exam: UserExam) -> bool:
+    """
+    Завершает испытание, если оно еще не завершено. Возвращает признак завершения.
+
+    Проверка и установка времени завершения выполняются одним условным запросом UPDATE, поэтому
+    из одновременных завершений испытания пользователем и командой finalize_stale_exams выполняется
+    только одно. Пересчет результатов, весов заготовок пользователя и заполнение кэша страницы
+    результатов выполняются фоновой задачей EXAM_FINALIZE_JOB_NAME, которая добавляется в той же
+    транзакции только при завершении испытания.
+    """
+    finished_at = timezone.now()
+    if not UserExam.objects.filter(id=exam.id, finished_at__isnull=True).update(finished_at=finished_at):
+        return False
+
+    exam.finished_at = finished_at
+    job_enqueue(name=EXAM_FINALIZE_JOB_NAME, payload={'exam_id': exam.id})
+    transaction.on_commit(EXAMS_FINISHED.inc)
+
+    return True
+
+
+async def aexam_set_finished_at(*, exam: UserExam) -> bool:
+    """
+    Асинхронный вариант exam_set_finished_at.
+
+    Транзакции не поддерживаются в асинхронном режиме, поэтому испытание завершается синхронной функцией
+    в отдельном потоке.
+    """
+    return await sync_to_async(exam_set_finished_at)(exam=exam)
+
+
+def exams_expired_finish(*, batch_size: int = 1000, max_batches: int | None = None) -> int:
+    """
+    Завершает испытания, время прохождения которых истекло, и возвращает их количество.
+
+    Испытания обрабатываются пакетами по batch_size, каждый пакет - в отдельной транзакции: идентификаторы
+    отбираются по частичному индексу незавершенных испытаний, время завершения устанавливается равным сроку
+    одним условным запросом UPDATE, фоновые задачи EXAM_FINALIZE_JOB_NAME добавляются одним запросом INSERT
+    только для испытаний, завершенных этим запросом. Количество пакетов ограничивается max_batches.
 
-    random.shuffle(questions)
+    Завершение пользователем (exam_set_finished_at) тоже выполняется условным запросом UPDATE, поэтому
+    испытание завершается и обрабатывается один раз. В PostgreSQL отобранные испытания блокируются до конца
+    транзакции, испытания, которые в это время завершает пользователь, пропускаются (SKIP LOCKED). В SQLite
+    транзакции с записью выполняются последовательно.
+    """
+    finished_count = 0
+    batches_count = 0
 
-    first_exam_question = None
-    for question in questions[: task.max_questions_count]:
-        exam_question = (
-            exam_options_question_create_from_blank(exam=exam, blank=question, commit=False)
-            if isinstance(question, OptionsQuestionBlank)
-            else exam_incorrect_word_question_create_from_blank(exam=exam, blank=question, commit=False)
+    while max_batches is None or batches_count < max_batches:
+        with transaction.atomic():
+            exams = UserExam.objects.filter(finished_at__isnull=True, expires_at__lte=timezone.now())
+            if connection.features.has_select_for_update_skip_locked:
+                exams = exams.select_for_update(skip_locked=True)
+
+            exam_ids = list(exams.order_by('expires_at', 'id').values_list('id', flat=True)[:batch_size])
+            if not exam_ids:
+                break
+
+            updated_count = UserExam.objects.filter(id__in=exam_ids, finished_at__isnull=True).update(
+                finished_at=F('expires_at')
+            )
+            if updated_count != len(exam_ids):
+                # Часть испытаний завершена пользователем после отбора (возможно без блокировки строк),
+                # завершенными по сроку считаются испытания со временем завершения, равным сроку.
+                exam_ids = list(
+                    UserExam.objects.filter(id__in=exam_ids, finished_at=F('expires_at')).values_list('id', flat=True)
+                )
+
+            jobs_bulk_enqueue(name=EXAM_FINALIZE_JOB_NAME, payloads=({'exam_id': x} for x in exam_ids))
+            transaction.on_commit(functools.partial(EXAMS_EXPIRED.inc, len(exam_ids)))
+
+        finished_count += len(exam_ids)
+        batches_count += 1
+
+    return finished_count
+
+
+def exam_set_finalized_at(*, exam_id: int) -> bool:
+    """
+    Отмечает завершенное испытание как обработанное, если оно еще не обработано. Возвращает признак отметки.
+
+    Проверка и отметка выполняются одним условным запросом UPDATE в транзакции фоновой задачи
+    EXAM_FINALIZE_JOB_NAME, поэтому результаты испытания обрабатываются один раз, даже если задача
+    выполнена повторно (например, другим обработчиком после истечения JOBS_LOCK_TIMEOUT).
+    При откате транзакции отметка отменяется вместе с остальными изменениями задачи.
+    """
+    return bool(
+        UserExam.objects.filter(id=exam_id, finished_at__isnull=False, finalized_at__isnull=True).update(
+            finalized_at=timezone.now()
         )
-        exam_question.full_clean()
-        exam_question.save()
+    )
+
+
+def exam_results_materialize(*, exam_id: int) -> bool:
+    """
+    Пересчитывает счетчики вопросов и ответов испытания по сохраненным вопросам.
+
+    Счетчики обновляются при каждом ответе, пересчет исправляет расхождения, если они возникли.
+    Сравнение и обновление выполняются одним запросом. Возвращает признак изменения счетчиков.
+    """
+    return bool(
+        UserExam.objects.filter(id=exam_id)
+        .with_results()
+        .exclude(
+            questions_count=F('computed_questions_count'),
+            answered_questions_count=F('computed_answered_questions_count'),
+            correct_answers_count=F('computed_correct_answers_count'),
+        )
+        .update(
+            questions_count=F('computed_questions_count'),
+            answered_questions_count=F('computed_answered_questions_count'),
+            correct_answers_count=F('computed_correct_answers_count'),
+        )
+    )
+
+
+def exam_result_body_render(
+    *, exam: UserExam, exam_questions: list[ExamIncorrectWordQuestion | ExamOptionsQuestion], request=None
+) -> str:
+    """Отрисовывает содержимое страницы с результатами испытания. Задание испытания должно быть загружено."""
+    context = {
+        'QuestionTypes': QuestionTypes,
+        'exam_result': UserExamResults(exam=exam),
+        'exam_questions': exam_questions,
+    }
+
+    return render_to_string('tasks/_exam_result_body.html', context, request=request)
+
+
+def exam_result_page_cache_warm(*, exam: UserExam, replace: bool = False) -> None:
+    """
+    Сохраняет в кэше отрисованное содержимое страницы результатов завершенного испытания.
+
+    Содержимое, уже сохраненное в кэше при просмотре страницы, заменяется только при replace.
+    Запись в кэш выполняется после фиксации текущей транзакции. Если кэш не общий для процессов
+    (см. cache_is_shared), содержимое не сохраняется: фоновая задача выполняется в отдельном процессе,
+    и запись не была бы доступна при просмотре страницы.
+    """
+    if not cache_is_shared():
+        return
 
-        first_exam_question = first_exam_question or exam_question
+    cache_key = cache_object_key(namespace=EXAM_RESULT_PAGE_CACHE_NAMESPACE, object_id=exam.id)
+    if not replace and cache.get(cache_key) is not None:
+        return
 
-    return exam, first_exam_question
+    exam_result_body = exam_result_body_render(exam=exam, exam_questions=exam_snapshot_get(exam_id=exam.id).questions)
+    timeout = getattr(settings, 'TASKS_PAGE_CACHE_TIMEOUT', 60 * 60)
+    transaction.on_commit(lambda: cache.set(cache_key, exam_result_body, timeout=timeout))
 
 
-def exam_options_question_incorrect_word_answer_set(*, question: ExamIncorrectWordQuestion, letter_index: int) -> None:
-    """Фиксирует ответ на вопрос с некорректным словом."""
-    question.selected_letter_index = letter_index
-    question.full_clean()
-    question.save(update_fields=['selected_letter_index', 'finished_at'])
+def task_pages_cache_invalidate(*, task_id: int) -> None:
+    """Сбрасывает кэш страниц задания и списка заданий после фиксации текущей транзакции."""
 
+    def invalidate() -> None:
+        cache_version_bump(namespace=TASK_DETAIL_PAGE_CACHE_NAMESPACE, object_id=task_id)
+        cache_version_bump(namespace=TASK_LIST_PAGE_CACHE_NAMESPACE, object_id=TASK_LIST_CACHE_OBJECT_ID)
 
-def exam_set_finished_at(*, exam: UserExam) -> None:
-    """Устанавливает время завершения испытания."""
-    exam.finished_at = timezone.now()
-    exam.full_clean()
-    exam.save(update_fields=['finished_at'])
+    transaction.on_commit(invalidate)
@@ -0,0 +1,58 @@
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.tasks.models import ExamQuestion, UserBlankWeight, UserExam
+
+# Интервалы повторения заготовки по уровням по умолчанию, дней.
+DEFAULT_SPACED_REPETITION_INTERVALS = (0, 1, 3, 7, 21, 60)
+
+
+def user_blank_weights_update(*, exam: UserExam) -> None:
+    """
+    Обновляет веса заготовок пользователя по ответам завершенного испытания.
+
+    Верный ответ повышает уровень повторения заготовки, неверный - сбрасывает его до нулевого.
+    Дата следующего повторения отстоит от текущей на интервал уровня из TASKS_SPACED_REPETITION_INTERVALS,
+    вес заготовки растет с количеством неверных ответов. Ответы и текущие веса загружаются двумя запросами,
+    веса сохраняются одним запросом INSERT ... ON CONFLICT DO UPDATE.
+    """
+    exam_questions = [
+        x.as_exam_question()
+        for x in ExamQuestion.objects.filter(exam_id=exam.id, finished_at__isnull=False, blank_id__isnull=False)
+    ]
+    if not exam_questions:
+        return
+
+    user_blank_weights = {
+        (x.question_type, x.blank_id): x
+        for x in UserBlankWeight.objects.filter(user_id=exam.user_id, blank_id__in={x.blank_id for x in exam_questions})
+    }
+
+    intervals = getattr(settings, 'TASKS_SPACED_REPETITION_INTERVALS', DEFAULT_SPACED_REPETITION_INTERVALS)
+    now = timezone.now()
+    for exam_question in exam_questions:
+        key = (exam_question.QUESTION_TYPE, exam_question.blank_id)
+        user_blank_weight = user_blank_weights.get(key)
+        if user_blank_weight is None:
+            user_blank_weight = user_blank_weights[key] = UserBlankWeight(
+                user_id=exam.user_id, task_id=exam.task_id, question_type=key[0], blank_id=key[1]
+            )
+
+        user_blank_weight.answers_count += 1
+        if exam_question.answer_is_correct:
+            user_blank_weight.repetition_level = min(user_blank_weight.repetition_level + 1, len(intervals) - 1)
+        else:
+            user_blank_weight.repetition_level = 0
+            user_blank_weight.incorrect_answers_count += 1
+
+        user_blank_weight.weight = 1 + user_blank_weight.incorrect_answers_count
+        user_blank_weight.due_at = now + datetime.timedelta(days=intervals[user_blank_weight.repetition_level])
+
+    UserBlankWeight.objects.bulk_create(
+        user_blank_weights.values(),
+        update_conflicts=True,
+        unique_fields=('user', 'question_type', 'blank_id'),
+        update_fields=('answers_count', 'incorrect_answers_count', 'repetition_level', 'weight', 'due_at'),
+    )
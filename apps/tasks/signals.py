@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.tasks.models import IncorrectWordQuestionBlank, OptionsQuestionBlank, Task
+from apps.tasks.services.selectors.blanks import blanks_pool_invalidate
+from apps.tasks.services.tasks import task_pages_cache_invalidate
+
+
+@receiver((post_save, post_delete), sender=IncorrectWordQuestionBlank)
+@receiver((post_save, post_delete), sender=OptionsQuestionBlank)
+def blank_changed(sender, instance: IncorrectWordQuestionBlank | OptionsQuestionBlank, **kwargs) -> None:
+    """Сбрасывает пул заготовок задания при изменении заготовки."""
+    blanks_pool_invalidate(task_id=instance.task_id)
+
+
+@receiver((post_save, post_delete), sender=Task)
+def task_changed(sender, instance: Task, **kwargs) -> None:
+    """Сбрасывает пул заготовок и кэш страниц при изменении задания."""
+    blanks_pool_invalidate(task_id=instance.id)
+    task_pages_cache_invalidate(task_id=instance.id)
@@ -1 +1,1305 @@
-# Create your tests here.
+import collections
+import csv
+import datetime
+import io
+import itertools
+import json
+import random
+import tempfile
+from pathlib import Path
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.core.models import Job
+from apps.core.middleware import request_query_budget
+from apps.core.testing import (
+    assert_response_queries,
+    jobs_run_all,
+    query_budgets_enforced,
+    query_plan_problems,
+    response_request_metrics,
+)
+from apps.tasks.jobs import exam_finalize
+from apps.tasks.management.commands.benchmark_exams import DEFAULT_BASELINE_PATH
+from apps.tasks.models import (
+    EXAM_EXPIRED_MESSAGE,
+    EXAM_QUESTION_ALREADY_ANSWERED_MESSAGE,
+    EXAM_QUESTION_MODEL_BY_TYPE,
+    BlankStatistics,
+    ExamIncorrectWordQuestion,
+    ExamOptionsQuestion,
+    ExamQuestion,
+    IncorrectWordQuestionBlank,
+    OptionsQuestionBlank,
+    QuestionTypes,
+    Task,
+    UserBlankWeight,
+    UserExam,
+)
+from apps.tasks.services.selectors.blanks import BLANK_MODELS, Blank, blanks_pool_get, blanks_sample
+from apps.tasks.services.selectors.exam_results import (
+    EXAM_QUESTION_RESULTS_EXPORT_COLUMNS,
+    EXAM_RESULTS_EXPORT_COLUMNS,
+)
+from apps.tasks.services.selectors.exam_snapshots import _exam_snapshot_queryset, exam_snapshot_get
+from apps.tasks.services.selectors.tasks import (
+    ExamQuestionRef,
+    aexam_get_prev_and_next_question,
+    exam_get_prev_and_next_question,
+)
+from apps.tasks.services.cache import cache_object_key
+from apps.tasks.services.tasks import (
+    EXAM_FINALIZE_JOB_NAME,
+    EXAM_RESULT_PAGE_CACHE_NAMESPACE,
+    aexam_options_question_answer_set,
+    aexam_options_question_incorrect_word_answer_set,
+    exam_create_by_task,
+    exam_options_question_answer_set,
+    exam_options_question_incorrect_word_answer_set,
+    exam_set_finished_at,
+    exams_expired_finish,
+)
+
+
+class ExamFinishTests(TestCase):
+    """Завершение испытания пользователем и по истечении времени."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student')
+        cls.task = Task.objects.create(title='Задание', description='Описание', time_limit_minutes=10)
+
+    def _exam_create(self, *, expired: bool = False) -> UserExam:
+        expires_at = timezone.now() + datetime.timedelta(minutes=-1 if expired else 10)
+        return UserExam.objects.create(user=self.user, task=self.task, expires_at=expires_at)
+
+    def _finalize_jobs_count(self, exam: UserExam) -> int:
+        return Job.objects.filter(name=EXAM_FINALIZE_JOB_NAME, payload__exam_id=exam.id).count()
+
+    def test_finish_twice(self):
+        exam = self._exam_create()
+        stale_exam = UserExam.objects.get(id=exam.id)
+
+        self.assertTrue(exam_set_finished_at(exam=exam))
+        self.assertFalse(exam_set_finished_at(exam=stale_exam))
+
+        self.assertIsNone(stale_exam.finished_at)
+        self.assertEqual(UserExam.objects.get(id=exam.id).finished_at, exam.finished_at)
+        self.assertEqual(self._finalize_jobs_count(exam), 1)
+
+    def test_finish_after_expired_finish(self):
+        exam = self._exam_create(expired=True)
+
+        self.assertEqual(exams_expired_finish(), 1)
+        self.assertFalse(exam_set_finished_at(exam=exam))
+
+        exam.refresh_from_db()
+        self.assertEqual(exam.finished_at, exam.expires_at)
+        self.assertEqual(self._finalize_jobs_count(exam), 1)
+
+    def test_expired_finish_skips_finished(self):
+        finished_exam = self._exam_create(expired=True)
+        exam = self._exam_create(expired=True)
+        self.assertTrue(exam_set_finished_at(exam=finished_exam))
+
+        self.assertEqual(exams_expired_finish(), 1)
+        self.assertEqual(exams_expired_finish(), 0)
+
+        finished_exam.refresh_from_db()
+        self.assertNotEqual(finished_exam.finished_at, finished_exam.expires_at)
+        self.assertEqual(self._finalize_jobs_count(finished_exam), 1)
+        self.assertEqual(self._finalize_jobs_count(exam), 1)
+
+    def test_expired_finish_not_expired(self):
+        exam = self._exam_create()
+
+        self.assertEqual(exams_expired_finish(), 0)
+
+        exam.refresh_from_db()
+        self.assertIsNone(exam.finished_at)
+        self.assertEqual(self._finalize_jobs_count(exam), 0)
+
+
+class TaskBlanksMixin:
+    """Задание с заготовками вопросов обоих типов."""
+
+    @classmethod
+    def _task_blanks_create(cls):
+        cls.user = User.objects.create_user(username='student')
+        cls.task = Task.objects.create(title='Задание', description='Описание', max_questions_count=4)
+        cls.incorrect_word_blanks = IncorrectWordQuestionBlank.objects.bulk_create(
+            IncorrectWordQuestionBlank(
+                task=cls.task, correct_word=f'слово{x}', incorrect_word=f'слова{x}', incorrect_letter_index=5
+            )
+            for x in range(2)
+        )
+        cls.options_blanks = OptionsQuestionBlank.objects.bulk_create(
+            OptionsQuestionBlank(
+                task=cls.task,
+                question=f'Вопрос {x}',
+                option1='Да',
+                option1_is_true=True,
+                option2='Нет',
+                option2_is_true=False,
+                option3='Не знаю',
+                option3_is_true=False,
+            )
+            for x in range(2)
+        )
+
+
+class TaskBlanksTestCase(TaskBlanksMixin, TestCase):
+    """Тесты с заданием с заготовками вопросов обоих типов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls._task_blanks_create()
+
+    def setUp(self):
+        cache.clear()
+
+
+class BlanksSampleTests(TestCase):
+    """Выборка заготовок задания стратегиями TASKS_BLANK_SAMPLING_STRATEGY."""
+
+    STRATEGIES = ('full_scan', 'ids', 'id_range', 'cached')
+    BLANKS_COUNT = 30
+    SAMPLE_COUNT = 10
+    SAMPLES_COUNT = 300
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student')
+        cls.task = Task.objects.create(title='Задание', description='Описание')
+        IncorrectWordQuestionBlank.objects.bulk_create(
+            IncorrectWordQuestionBlank(
+                task=cls.task, correct_word=f'слово{x}', incorrect_word=f'слова{x}', incorrect_letter_index=5
+            )
+            for x in range(cls.BLANKS_COUNT)
+        )
+        OptionsQuestionBlank.objects.bulk_create(
+            OptionsQuestionBlank(
+                task=cls.task,
+                question=f'Вопрос {x}',
+                option1='Да',
+                option1_is_true=True,
+                option2='Нет',
+                option2_is_true=False,
+                option3='Не знаю',
+                option3_is_true=False,
+            )
+            for x in range(cls.BLANKS_COUNT)
+        )
+        # Пропуски в диапазонах идентификаторов.
+        for blank_model in BLANK_MODELS:
+            blank_model.objects.filter(id__in=blank_model.objects.values_list('id', flat=True)[::3]).delete()
+
+        cls.blank_ids = {
+            (blank_model.QUESTION_TYPE, blank_id)
+            for blank_model in BLANK_MODELS
+            for blank_id in blank_model.objects.filter(task=cls.task).values_list('id', flat=True)
+        }
+
+    def setUp(self):
+        cache.clear()
+        random.seed(0)
+
+    def _blank_key(self, blank: Blank) -> tuple[str, int]:
+        return blank.QUESTION_TYPE, blank.id
+
+    def test_count(self):
+        for strategy in self.STRATEGIES:
+            with self.subTest(strategy=strategy):
+                blanks = blanks_sample(task=self.task, count=self.SAMPLE_COUNT, strategy=strategy)
+                self.assertEqual(len(blanks), self.SAMPLE_COUNT)
+                self.assertEqual(len({self._blank_key(x) for x in blanks}), self.SAMPLE_COUNT)
+                self.assertLessEqual({self._blank_key(x) for x in blanks}, self.blank_ids)
+
+                blanks = blanks_sample(task=self.task, count=len(self.blank_ids) + 1, strategy=strategy)
+                self.assertEqual({self._blank_key(x) for x in blanks}, self.blank_ids)
+                self.assertEqual(len(blanks), len(self.blank_ids))
+
+    def test_uniform(self):
+        expected_count = self.SAMPLES_COUNT * self.SAMPLE_COUNT / len(self.blank_ids)
+
+        for strategy in self.STRATEGIES:
+            with self.subTest(strategy=strategy):
+                counter = collections.Counter()
+                for _x in range(self.SAMPLES_COUNT):
+                    blanks = blanks_sample(task=self.task, count=self.SAMPLE_COUNT, strategy=strategy)
+                    self.assertEqual(len({self._blank_key(x) for x in blanks}), self.SAMPLE_COUNT)
+                    counter.update(self._blank_key(x) for x in blanks)
+
+                self.assertEqual(counter.keys(), self.blank_ids)
+                for blank_count in counter.values():
+                    self.assertAlmostEqual(blank_count, expected_count, delta=expected_count * 0.6)
+
+                # Заготовки с меньшими идентификаторами не выбираются чаще.
+                for blank_model in BLANK_MODELS:
+                    model_blank_ids = sorted(
+                        x for question_type, x in self.blank_ids if question_type == blank_model.QUESTION_TYPE
+                    )
+                    lower_blank_ids = model_blank_ids[: len(model_blank_ids) // 2]
+                    lower_count = sum(counter[blank_model.QUESTION_TYPE, x] for x in lower_blank_ids)
+                    model_count = sum(counter[blank_model.QUESTION_TYPE, x] for x in model_blank_ids)
+                    self.assertAlmostEqual(lower_count / model_count, 0.5, delta=0.05)
+
+    def _model_blank_ids(self, blank_model: type[Blank]) -> list[int]:
+        return sorted(x for question_type, x in self.blank_ids if question_type == blank_model.QUESTION_TYPE)
+
+    def test_weighted_count(self):
+        for strategy, user in (('difficulty', None), ('spaced_repetition', None), ('spaced_repetition', self.user)):
+            for count in (0, 1, self.SAMPLE_COUNT, len(self.blank_ids), len(self.blank_ids) + 1):
+                with self.subTest(strategy=strategy, user=user, count=count):
+                    blanks = blanks_sample(task=self.task, count=count, user=user, strategy=strategy)
+                    self.assertEqual(len(blanks), min(count, len(self.blank_ids)))
+                    self.assertEqual(len({self._blank_key(x) for x in blanks}), len(blanks))
+                    self.assertLessEqual({self._blank_key(x) for x in blanks}, self.blank_ids)
+
+    def test_difficulty(self):
+        # Доля правильных ответов на вопросы с вариантами ответа вне целевого диапазона сложности.
+        BlankStatistics.objects.bulk_create(
+            BlankStatistics(
+                task=self.task,
+                question_type=QuestionTypes.OPTIONS,
+                blank_id=blank_id,
+                answers_count=10,
+                correct_answers_count=1,
+                correct_answers_ratio=0.1,
+            )
+            for blank_id in self._model_blank_ids(OptionsQuestionBlank)
+        )
+
+        counter = collections.Counter()
+        for _x in range(self.SAMPLES_COUNT):
+            blanks = blanks_sample(task=self.task, count=self.SAMPLE_COUNT, strategy='difficulty')
+            counter.update(x.QUESTION_TYPE for x in blanks)
+
+        self.assertLess(counter[QuestionTypes.OPTIONS], counter[QuestionTypes.INCORRECT_WORD] * 0.5)
+
+    def test_spaced_repetition(self):
+        due_at = timezone.now() - datetime.timedelta(minutes=1)
+        due_blank_ids = self._model_blank_ids(OptionsQuestionBlank)[:3]
+        not_due_blank_ids = self._model_blank_ids(IncorrectWordQuestionBlank)[:3]
+        UserBlankWeight.objects.bulk_create(
+            [
+                *(
+                    UserBlankWeight(
+                        user=self.user,
+                        task=self.task,
+                        question_type=QuestionTypes.OPTIONS,
+                        blank_id=blank_id,
+                        weight=weight,
+                        due_at=due_at,
+                    )
+                    for weight, blank_id in enumerate(due_blank_ids, start=1)
+                ),
+                *(
+                    UserBlankWeight(
+                        user=self.user,
+                        task=self.task,
+                        question_type=QuestionTypes.INCORRECT_WORD,
+                        blank_id=blank_id,
+                        weight=100,
+                        due_at=due_at + datetime.timedelta(days=1),
+                    )
+                    for blank_id in not_due_blank_ids
+                ),
+                # Удаленная заготовка.
+                UserBlankWeight(
+                    user=self.user,
+                    task=self.task,
+                    question_type=QuestionTypes.OPTIONS,
+                    blank_id=0,
+                    weight=100,
+                    due_at=due_at,
+                ),
+            ]
+        )
+        due_keys = {(QuestionTypes.OPTIONS, x) for x in due_blank_ids}
+
+        for _x in range(20):
+            blanks = blanks_sample(task=self.task, count=5, user=self.user, strategy='spaced_repetition')
+            self.assertEqual(len(blanks), 5)
+            self.assertLessEqual(due_keys, {self._blank_key(x) for x in blanks})
+
+        # Из подлежащих повторению выбираются заготовки с большим весом.
+        counter = collections.Counter()
+        for _x in range(self.SAMPLES_COUNT):
+            blanks = blanks_sample(task=self.task, count=2, user=self.user, strategy='spaced_repetition')
+            counter.update(self._blank_key(x) for x in blanks)
+        self.assertEqual(counter.keys(), due_keys)
+        self.assertLess(
+            counter[QuestionTypes.OPTIONS, due_blank_ids[0]], counter[QuestionTypes.OPTIONS, due_blank_ids[2]]
+        )
+
+
+class ExamCreateTests(TaskBlanksTestCase):
+    """Создание испытания по заданию."""
+
+    def test_deleted_blanks_from_cached_pool(self):
+        blanks_pool_get(task_id=self.task.id)
+        deleted_blank_ids = {self.incorrect_word_blanks[0].id, self.options_blanks[0].id}
+        IncorrectWordQuestionBlank.objects.filter(id=self.incorrect_word_blanks[0].id).delete()
+        OptionsQuestionBlank.objects.filter(id=self.options_blanks[0].id).delete()
+
+        with self.settings(TASKS_BLANK_SAMPLING_STRATEGY='cached'):
+            exam, _ = exam_create_by_task(task=self.task, user=self.user)
+
+        exam_questions = [
+            *ExamIncorrectWordQuestion.objects.filter(exam=exam),
+            *ExamOptionsQuestion.objects.filter(exam=exam),
+        ]
+        self.assertEqual(len(exam_questions), 4)
+        self.assertEqual(sum(x.blank_id is None for x in exam_questions), 2)
+        self.assertFalse(deleted_blank_ids & {x.blank_id for x in exam_questions})
+
+    def test_blank_statistics_created_on_first_answer(self):
+        exam, _ = exam_create_by_task(task=self.task, user=self.user)
+        self.assertFalse(BlankStatistics.objects.exists())
+
+        # Варианты ответа перемешиваются при создании вопроса из заготовки.
+        question = ExamOptionsQuestion.objects.filter(exam=exam).order_by('position').first()
+        correct_answers = {f'selected_{y}': getattr(question, y) for _, y in question.OPTION_AND_ANSWER_PAIR_FIELDS}
+        self.assertTrue(exam_options_question_answer_set(question=question, **correct_answers))
+
+        other_exam, _ = exam_create_by_task(task=self.task, user=self.user)
+        other_question = ExamOptionsQuestion.objects.get(exam=other_exam, blank_id=question.blank_id)
+        incorrect_answers = {
+            f'selected_{y}': not getattr(other_question, y) for _, y in question.OPTION_AND_ANSWER_PAIR_FIELDS
+        }
+        self.assertTrue(exam_options_question_answer_set(question=other_question, **incorrect_answers))
+
+        statistics = BlankStatistics.objects.get()
+        self.assertEqual(
+            (statistics.task_id, statistics.question_type, statistics.blank_id),
+            (self.task.id, ExamOptionsQuestion.QUESTION_TYPE, question.blank_id),
+        )
+        self.assertEqual((statistics.answers_count, statistics.correct_answers_count), (2, 1))
+        self.assertEqual(statistics.correct_answers_ratio, 0.5)
+
+    def test_exam_snapshot_updated_on_answer(self):
+        exam, _ = exam_create_by_task(task=self.task, user=self.user)
+        exam_snapshot = exam_snapshot_get(exam_id=exam.id)
+
+        questions = {type(x): x for x in exam_snapshot.questions}
+        with self.captureOnCommitCallbacks(execute=True):
+            exam_options_question_incorrect_word_answer_set(
+                question=questions[ExamIncorrectWordQuestion], letter_index=1
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            exam_options_question_answer_set(
+                question=questions[ExamOptionsQuestion],
+                selected_option1_is_true=True,
+                selected_option2_is_true=True,
+                selected_option3_is_true=False,
+            )
+
+        with self.assertNumQueries(0):
+            updated_exam_snapshot = exam_snapshot_get(exam_id=exam.id)
+
+        self.assertEqual(updated_exam_snapshot.version, exam_snapshot.version + 2)
+        self.assertEqual(updated_exam_snapshot.rows, tuple(_exam_snapshot_queryset(exam_id=exam.id)))
+        self.assertEqual(sum(x.is_finished for x in updated_exam_snapshot.questions), 2)
+
+
+class ExamPrevAndNextQuestionTests(TaskBlanksTestCase):
+    """Ссылки на предыдущий и следующий вопрос испытания."""
+
+    def test_prev_and_next_question(self):
+        exam, _ = exam_create_by_task(task=self.task, user=self.user)
+        exam_snapshot = exam_snapshot_get(exam_id=exam.id)
+        questions = exam_snapshot.questions
+        refs = [ExamQuestionRef(x.QUESTION_TYPE, x.id, x.position) for x in questions]
+        self.assertEqual([x.position for x in refs], list(range(1, len(refs) + 1)))
+
+        expected_by_index = {
+            0: (None, refs[1]),
+            1: (refs[0], refs[2]),
+            len(refs) - 1: (refs[-2], None),
+        }
+        for index, expected in expected_by_index.items():
+            question = questions[index]
+            with self.subTest(position=question.position):
+                self.assertEqual(exam_get_prev_and_next_question(question=question), expected)
+                self.assertEqual(exam_snapshot.get_prev_and_next_question(question=question), expected)
+                self.assertEqual(async_to_sync(aexam_get_prev_and_next_question)(question=question), expected)
+
+    def test_implementations_agree(self):
+        exam, _ = exam_create_by_task(task=self.task, user=self.user)
+        exam_snapshot = exam_snapshot_get(exam_id=exam.id)
+
+        for question in exam_snapshot.questions:
+            with self.subTest(position=question.position):
+                self.assertEqual(
+                    exam_snapshot.get_prev_and_next_question(question=question),
+                    exam_get_prev_and_next_question(question=question),
+                )
+
+
+class ExamAnswerTests(TaskBlanksTestCase):
+    """Сохранение ответа на вопрос испытания."""
+
+    def _state(self, exam: UserExam) -> tuple:
+        return (
+            UserExam.objects.filter(id=exam.id).values_list('answered_questions_count', 'correct_answers_count').get(),
+            sorted(
+                BlankStatistics.objects.values_list(
+                    'question_type', 'blank_id', 'answers_count', 'correct_answers_count', 'correct_answers_ratio'
+                )
+            ),
+        )
+
+    def test_answer_once(self):
+        exam, _x = exam_create_by_task(task=self.task, user=self.user)
+        incorrect_word_question = ExamIncorrectWordQuestion.objects.filter(exam=exam).first()
+        options_question = ExamOptionsQuestion.objects.filter(exam=exam).first()
+        options_answer = {
+            f'selected_{answer_field}': getattr(options_question, answer_field)
+            for _x, answer_field in options_question.OPTION_AND_ANSWER_PAIR_FIELDS
+        }
+        wrong_options_answer = {x: not y for x, y in options_answer.items()}
+
+        self.assertTrue(
+            exam_options_question_incorrect_word_answer_set(
+                question=incorrect_word_question, letter_index=incorrect_word_question.incorrect_letter_index
+            )
+        )
+        self.assertTrue(exam_options_question_answer_set(question=options_question, **options_answer))
+        state = self._state(exam)
+        self.assertEqual(state[0], (2, 2))
+        self.assertEqual([x[2:4] for x in state[1]], [(1, 1), (1, 1)])
+
+        # Повторные ответы, в том числе по объектам вопросов, загруженным до первого ответа.
+        stale_incorrect_word_question = ExamIncorrectWordQuestion.objects.get(id=incorrect_word_question.id)
+        stale_incorrect_word_question.finished_at = None
+        stale_options_question = ExamOptionsQuestion.objects.get(id=options_question.id)
+        stale_options_question.finished_at = None
+        for question in (incorrect_word_question, stale_incorrect_word_question):
+            self.assertFalse(exam_options_question_incorrect_word_answer_set(question=question, letter_index=0))
+            self.assertFalse(
+                async_to_sync(aexam_options_question_incorrect_word_answer_set)(question=question, letter_index=0)
+            )
+        for question in (options_question, stale_options_question):
+            self.assertFalse(exam_options_question_answer_set(question=question, **wrong_options_answer))
+            self.assertFalse(
+                async_to_sync(aexam_options_question_answer_set)(question=question, **wrong_options_answer)
+            )
+
+        self.assertEqual(self._state(exam), state)
+        incorrect_word_question.refresh_from_db()
+        options_question.refresh_from_db()
+        self.assertTrue(incorrect_word_question.answer_is_correct)
+        self.assertTrue(options_question.answer_is_correct)
+
+
+class ExamFinalizeTests(TaskBlanksTestCase):
+    """Обработка завершенного испытания фоновой задачей."""
+
+    def test_finalize_once(self):
+        exam, _ = exam_create_by_task(task=self.task, user=self.user)
+        exam_options_question_incorrect_word_answer_set(
+            question=ExamIncorrectWordQuestion.objects.filter(exam=exam).first(), letter_index=1
+        )
+        exam_set_finished_at(exam=exam)
+
+        self.assertEqual(jobs_run_all(), 1)
+        exam.refresh_from_db()
+        self.assertIsNotNone(exam.finalized_at)
+        user_blank_weight = UserBlankWeight.objects.get(user=self.user)
+        self.assertEqual(user_blank_weight.answers_count, 1)
+
+        # Повторное выполнение задачи, например после истечения JOBS_LOCK_TIMEOUT.
+        with self.assertNumQueries(1):
+            exam_finalize(exam_id=exam.id)
+
+        self.assertEqual(UserExam.objects.get(id=exam.id).finalized_at, exam.finalized_at)
+        self.assertEqual(UserBlankWeight.objects.get(user=self.user).answers_count, 1)
+
+    def test_finalize_side_effects(self):
+        exam, _ = exam_create_by_task(task=self.task, user=self.user)
+        questions = {type(x): x for x in exam_snapshot_get(exam_id=exam.id).questions}
+        question = questions[ExamIncorrectWordQuestion]
+        exam_options_question_incorrect_word_answer_set(question=question, letter_index=question.incorrect_letter_index)
+        # Счетчики испытания разошлись с ответами, пересчет их исправляет.
+        UserExam.objects.filter(id=exam.id).update(correct_answers_count=3)
+        exam_set_finished_at(exam=exam)
+
+        started_at = timezone.now()
+        self.assertEqual(jobs_run_all(), 1)
+
+        exam.refresh_from_db()
+        self.assertEqual((exam.questions_count, exam.answered_questions_count, exam.correct_answers_count), (4, 1, 1))
+        self.assertFalse(Job.objects.exists())
+        user_blank_weight = UserBlankWeight.objects.get(user=self.user)
+        self.assertEqual(
+            (user_blank_weight.task_id, user_blank_weight.question_type, user_blank_weight.blank_id),
+            (self.task.id, ExamIncorrectWordQuestion.QUESTION_TYPE, question.blank_id),
+        )
+        self.assertEqual(
+            (
+                user_blank_weight.answers_count,
+                user_blank_weight.incorrect_answers_count,
+                user_blank_weight.repetition_level,
+            ),
+            (1, 0, 1),
+        )
+        self.assertGreater(user_blank_weight.due_at, started_at)
+
+    def test_finalize_not_finished(self):
+        exam, _ = exam_create_by_task(task=self.task, user=self.user)
+
+        exam_finalize(exam_id=exam.id)
+
+        exam.refresh_from_db()
+        self.assertIsNone(exam.finalized_at)
+
+    def _exam_finalize_with_cache(self) -> UserExam:
+        exam, _ = exam_create_by_task(task=self.task, user=self.user)
+        exam_set_finished_at(exam=exam)
+        with self.captureOnCommitCallbacks(execute=True):
+            jobs_run_all()
+
+        return exam
+
+    def test_result_page_cache_not_shared(self):
+        exam = self._exam_finalize_with_cache()
+
+        self.assertIsNone(cache.get(cache_object_key(namespace=EXAM_RESULT_PAGE_CACHE_NAMESPACE, object_id=exam.id)))
+
+    def test_result_page_cache_shared(self):
+        with (
+            tempfile.TemporaryDirectory() as cache_dir,
+            self.settings(
+                CACHES={
+                    'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir}
+                }
+            ),
+        ):
+            exam = self._exam_finalize_with_cache()
+
+            self.assertIn(
+                'Всего вопросов 4',
+                cache.get(cache_object_key(namespace=EXAM_RESULT_PAGE_CACHE_NAMESPACE, object_id=exam.id)),
+            )
+
+
+class ExamApiTests(TaskBlanksTestCase):
+    """JSON API прохождения испытания."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def _run(self) -> dict:
+        response = self.client.post(reverse('exam_api_run', args=[self.task.id]))
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def _answer_url(self, question_type: str, question_id: int) -> str:
+        return reverse('exam_api_answer', args=[question_type, question_id])
+
+    def _answer(self, question_payload: dict, data: dict | None = None):
+        if data is None:
+            data = self._correct_answer_data(
+                EXAM_QUESTION_MODEL_BY_TYPE[question_payload['type']].objects.get(id=question_payload['id'])
+            )
+
+        return self.client.post(
+            self._answer_url(question_payload['type'], question_payload['id']),
+            data=json.dumps(data),
+            content_type='application/json',
+        )
+
+    def _correct_answer_data(self, exam_question: ExamIncorrectWordQuestion | ExamOptionsQuestion) -> dict:
+        if isinstance(exam_question, ExamIncorrectWordQuestion):
+            return {'letter_index': exam_question.incorrect_letter_index}
+
+        return {
+            f'selected_{answer_field}': getattr(exam_question, answer_field)
+            for _x, answer_field in exam_question.OPTION_AND_ANSWER_PAIR_FIELDS
+        }
+
+    def _errors(self, response) -> list[str]:
+        return response.json()['errors']['__all__']
+
+    def test_run(self):
+        data = self._run()
+
+        exam = UserExam.objects.get(id=data['exam']['id'])
+        self.assertEqual((exam.user, exam.task), (self.user, self.task))
+        self.assertEqual(
+            data['exam'],
+            {
+                'id': exam.id,
+                'task_id': self.task.id,
+                'questions_count': 4,
+                'answered_questions_count': 0,
+                'correct_answers_count': 0,
+                'is_finished': False,
+            },
+        )
+        self.assertEqual((data['question']['exam_id'], data['question']['position']), (exam.id, 1))
+        self.assertFalse(data['question']['is_finished'])
+
+    def test_run_validation_error(self):
+        task = Task.objects.create(title='Задание', description='Описание')
+        # Заготовка сохранена без проверки, слово длиннее допустимого для вопроса испытания.
+        IncorrectWordQuestionBlank.objects.create(
+            task=task, correct_word='а' * 300, incorrect_word='б' * 300, incorrect_letter_index=1
+        )
+
+        response = self.client.post(reverse('exam_api_run', args=[task.id]))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(self._errors(response))
+        self.assertFalse(UserExam.objects.filter(task=task).exists())
+
+    def test_login_required(self):
+        question = self._run()['question']
+        self.client.logout()
+
+        for response in (
+            self.client.post(reverse('exam_api_run', args=[self.task.id])),
+            self.client.get(reverse('exam_api_question', args=[question['type'], question['id']])),
+            self._answer(question),
+        ):
+            self.assertEqual(response.status_code, 401)
+
+    def test_not_found(self):
+        question = self._run()['question']
+        other_user = User.objects.create_user(username='other')
+        self.client.force_login(other_user)
+
+        self.assertEqual(self.client.post(reverse('exam_api_run', args=[0])).status_code, 404)
+        self.assertEqual(
+            self.client.get(reverse('exam_api_question', args=[question['type'], question['id']])).status_code, 404
+        )
+        self.assertEqual(self._answer(question).status_code, 404)
+
+        self.client.force_login(self.user)
+        self.assertEqual(
+            self.client.get(reverse('exam_api_question', args=['unknown', question['id']])).status_code, 404
+        )
+        self.assertEqual(self._answer({**question, 'type': 'unknown'}, data={}).status_code, 404)
+
+    def test_non_object_body(self):
+        question = self._run()['question']
+
+        for body in ('[1]', '"ответ"', 'null', '{'):
+            response = self.client.post(
+                self._answer_url(question['type'], question['id']), data=body, content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 400)
+
+        self.assertFalse(EXAM_QUESTION_MODEL_BY_TYPE[question['type']].objects.get(id=question['id']).is_finished)
+
+    def test_invalid_form(self):
+        exam_question = ExamIncorrectWordQuestion.objects.filter(exam_id=self._run()['exam']['id']).first()
+        question = {'type': QuestionTypes.INCORRECT_WORD, 'id': exam_question.id}
+
+        response = self._answer(question, data={'letter_index': -1})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('letter_index', response.json()['errors'])
+        exam_question.refresh_from_db()
+        self.assertFalse(exam_question.is_finished)
+
+    def test_answer_twice(self):
+        question = self._run()['question']
+
+        self.assertEqual(self._answer(question).status_code, 200)
+        response = self._answer(question)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self._errors(response), [EXAM_QUESTION_ALREADY_ANSWERED_MESSAGE])
+        self.assertEqual(UserExam.objects.get(id=question['exam_id']).answered_questions_count, 1)
+
+    def test_answer_expired(self):
+        question = self._run()['question']
+        UserExam.objects.filter(id=question['exam_id']).update(
+            expires_at=timezone.now() - datetime.timedelta(seconds=1)
+        )
+
+        response = self._answer(question)
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self._errors(response), [EXAM_EXPIRED_MESSAGE])
+        self.assertFalse(EXAM_QUESTION_MODEL_BY_TYPE[question['type']].objects.get(id=question['id']).is_finished)
+
+    def test_finish_on_last_answer(self):
+        question = self._run()['question']
+
+        answers_count = 0
+        while question:
+            response = self._answer(question)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            answers_count += 1
+
+            self.assertTrue(data['answer_is_correct'])
+            self.assertEqual(data['exam']['answered_questions_count'], answers_count)
+            self.assertEqual(data['exam']['is_finished'], answers_count == 4)
+            question = data['next_question']
+
+        self.assertEqual(answers_count, 4)
+        exam = UserExam.objects.get(id=data['exam']['id'])
+        self.assertIsNotNone(exam.finished_at)
+        self.assertEqual(exam.correct_answers_count, 4)
+
+
+class ExamResultsExportTests(TaskBlanksTestCase):
+    """Выгрузка результатов испытаний командой export_exam_results и страницей для преподавателей."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_user = User.objects.create_user(username='other')
+        cls.other_task = Task.objects.create(title='Другое задание', description='Описание')
+
+        cls.exam, _x = exam_create_by_task(task=cls.task, user=cls.user)
+        cls.other_exam, _x = exam_create_by_task(task=cls.other_task, user=cls.other_user)
+        UserExam.objects.filter(id=cls.exam.id).update(
+            created_at=timezone.make_aware(datetime.datetime(2024, 1, 10, 12))
+        )
+        UserExam.objects.filter(id=cls.other_exam.id).update(
+            created_at=timezone.make_aware(datetime.datetime(2024, 1, 20, 12))
+        )
+
+        # Один верный и один неверный ответ.
+        cls.answered_questions = list(ExamIncorrectWordQuestion.objects.filter(exam=cls.exam).order_by('position'))
+        for question, letter_index_shift in zip(cls.answered_questions, (0, 1), strict=True):
+            exam_options_question_incorrect_word_answer_set(
+                question=question, letter_index=question.incorrect_letter_index + letter_index_shift
+            )
+
+    def _export(self, *args: str) -> list[list[str]]:
+        with tempfile.TemporaryDirectory() as output_dir:
+            path = Path(output_dir) / 'results.csv'
+            call_command('export_exam_results', str(path), *args)
+            with open(path, newline='', encoding='utf-8') as file:
+                return list(csv.reader(file))
+
+    def _exam_ids(self, rows: list[list[str]]) -> list[int]:
+        return [int(x[0]) for x in rows[1:]]
+
+    def test_exam_rows(self):
+        rows = self._export()
+
+        self.assertEqual(rows[0], list(EXAM_RESULTS_EXPORT_COLUMNS))
+        self.assertEqual(self._exam_ids(rows), [self.exam.id, self.other_exam.id])
+        self.assertTrue(all(len(x) == len(EXAM_RESULTS_EXPORT_COLUMNS) for x in rows))
+
+        row = dict(zip(rows[0], rows[1], strict=True))
+        self.assertEqual(
+            {x: row[x] for x in EXAM_RESULTS_EXPORT_COLUMNS if x not in ('created_at', 'finished_at')},
+            {
+                'exam_id': str(self.exam.id),
+                'user_id': str(self.user.id),
+                'username': 'student',
+                'task_id': str(self.task.id),
+                'task_title': 'Задание',
+                'questions_count': '4',
+                'answered_questions_count': '2',
+                'correct_answers_count': '1',
+                'incorrect_answers_count': '3',
+                'score_percent': '25.0',
+            },
+        )
+        self.assertEqual(row['finished_at'], '')
+        # Процент не вычисляется для испытания без вопросов.
+        self.assertEqual(dict(zip(rows[0], rows[2], strict=True))['score_percent'], '')
+
+    def test_filters(self):
+        self.assertEqual(self._exam_ids(self._export('--task', str(self.other_task.id))), [self.other_exam.id])
+        self.assertEqual(self._exam_ids(self._export('--user', str(self.user.id))), [self.exam.id])
+        self.assertEqual(self._exam_ids(self._export('--created-from', '2024-01-11')), [self.other_exam.id])
+        self.assertEqual(self._exam_ids(self._export('--created-to', '2024-01-10')), [self.exam.id])
+        self.assertEqual(
+            self._exam_ids(self._export('--created-from', '2024-01-10', '--created-to', '2024-01-20')),
+            [self.exam.id, self.other_exam.id],
+        )
+        self.assertEqual(self._exam_ids(self._export('--created-from', '2024-01-21')), [])
+
+        with self.assertRaises(CommandError):
+            self._export('--created-from', '2024-01-20', '--created-to', '2024-01-10')
+
+    def test_question_rows(self):
+        rows = self._export('--rows', 'questions')
+
+        self.assertEqual(rows[0], list(EXAM_QUESTION_RESULTS_EXPORT_COLUMNS))
+        self.assertEqual(
+            [{x: y for x, y in zip(rows[0], row, strict=True) if x != 'finished_at'} for row in rows[1:]],
+            [
+                {
+                    'exam_id': str(self.exam.id),
+                    'user_id': str(self.user.id),
+                    'username': 'student',
+                    'task_id': str(self.task.id),
+                    'position': str(question.position),
+                    'question_type': QuestionTypes.INCORRECT_WORD,
+                    'question_text': question.incorrect_word,
+                    'answer_is_correct': answer_is_correct,
+                }
+                for question, answer_is_correct in zip(self.answered_questions, ('True', 'False'), strict=True)
+            ],
+        )
+        self.assertEqual(self._export('--rows', 'questions', '--task', str(self.other_task.id))[1:], [])
+
+    def test_view(self):
+        url = reverse('exam_results_export')
+
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        staff_user = User.objects.create_user(username='teacher', is_staff=True)
+        staff_user.user_permissions.add(Permission.objects.get(codename='view_userexam'))
+        self.client.force_login(staff_user)
+
+        response = self.client.get(url, {'task': self.task.id, 'rows': 'questions'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="exam_results_', response['Content-Disposition'])
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows, self._export('--task', str(self.task.id), '--rows', 'questions'))
+
+        self.assertEqual(
+            self.client.get(url, {'created_from': '2024-01-20', 'created_to': '2024-01-10'}).status_code, 400
+        )
+
+
+class TaskBanksTests(TestCase):
+    """Выгрузка и загрузка банка заданий командами export_tasks и import_tasks."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tasks = [
+            Task.objects.create(title='Орфография', description='Описание', max_questions_count=3),
+            Task.objects.create(title='Вопросы', description='Описание, "кавычки"\nи перенос', time_limit_minutes=15),
+        ]
+        for task in cls.tasks:
+            for correct_word, incorrect_word in (('корова', 'карова'), ('молоко', 'малоко')):
+                blank = IncorrectWordQuestionBlank(task=task, correct_word=correct_word, incorrect_word=incorrect_word)
+                blank.clean()
+                blank.save()
+            OptionsQuestionBlank.objects.create(
+                task=task,
+                question='Вопрос, "с кавычками"',
+                option1='Да',
+                option1_is_true=True,
+                option2='Нет',
+                option2_is_true=False,
+                option3='Не знаю',
+                option3_is_true=False,
+            )
+
+    def _task_bank(self, task: Task) -> tuple:
+        return (
+            Task.objects.filter(id=task.id)
+            .values_list('title', 'description', 'max_questions_count', 'time_limit_minutes')
+            .get(),
+            list(
+                task.incorrectwordquestionblank_set.order_by('id').values_list(
+                    'correct_word', 'incorrect_word', 'incorrect_letter_index'
+                )
+            ),
+            list(
+                task.optionsquestionblank_set.order_by('id').values_list(
+                    'question', 'option1', 'option1_is_true', 'option2', 'option2_is_true', 'option3', 'option3_is_true'
+                )
+            ),
+        )
+
+    def _import(self, content: str, file_format: str = 'jsonl') -> str:
+        with tempfile.TemporaryDirectory() as bank_dir:
+            path = Path(bank_dir) / f'bank.{file_format}'
+            path.write_text(content, encoding='utf-8')
+            stdout = io.StringIO()
+            call_command('import_tasks', str(path), stdout=stdout)
+
+        return stdout.getvalue()
+
+    def test_round_trip(self):
+        for file_format in ('jsonl', 'csv'):
+            with self.subTest(file_format=file_format), tempfile.TemporaryDirectory() as bank_dir:
+                path = Path(bank_dir) / f'bank.{file_format}'
+                task_ids_args = [x for task in self.tasks for x in ('--task', str(task.id))]
+                call_command('export_tasks', str(path), *task_ids_args)
+                existing_task_ids = set(Task.objects.values_list('id', flat=True))
+
+                call_command('import_tasks', str(path), stdout=io.StringIO())
+
+                imported_tasks = list(Task.objects.exclude(id__in=existing_task_ids).order_by('id'))
+                self.assertEqual([self._task_bank(x) for x in imported_tasks], [self._task_bank(x) for x in self.tasks])
+
+    def test_existing_task(self):
+        task = self.tasks[0]
+        content = json.dumps(
+            {'type': 'incorrectword', 'task_id': task.id, 'correct_word': 'вода', 'incorrect_word': 'вада'}
+        )
+
+        self.assertIn('incorrectword: 1', self._import(content))
+
+        self.assertEqual(task.incorrectwordquestionblank_set.order_by('id').last().incorrect_letter_index, 2)
+
+    def test_malformed_rows(self):
+        task_row = json.dumps({'type': 'task', 'id': 'new', 'title': 'Задание', 'description': 'Описание'})
+        cases = {
+            'некорректный JSON': '{',
+            'ожидается объект JSON': '[1]',
+            "неизвестный тип строки 'unknown'": json.dumps({'type': 'unknown'}),
+            'title': json.dumps({'type': 'task', 'description': 'Описание'}),
+            "задание 'missing' не найдено": json.dumps(
+                {'type': 'incorrectword', 'task_id': 'missing', 'correct_word': 'а', 'incorrect_word': 'б'}
+            ),
+            'формы слова должны отличаться': json.dumps(
+                {'type': 'incorrectword', 'task_id': 'new', 'correct_word': 'кот', 'incorrect_word': 'кот'}
+            ),
+            'Все варианты ответов не могут быть неправильными': json.dumps(
+                {
+                    'type': 'options',
+                    'task_id': 'new',
+                    'question': 'Вопрос',
+                    'option1': 'Да',
+                    'option1_is_true': False,
+                    'option2': 'Нет',
+                    'option2_is_true': False,
+                    'option3': 'Не знаю',
+                    'option3_is_true': False,
+                }
+            ),
+            'option1_is_true': json.dumps(
+                {
+                    'type': 'options',
+                    'task_id': 'new',
+                    'option1': 'Да',
+                    'option2_is_true': False,
+                    'option3': 'Не знаю',
+                    'option3_is_true': False,
+                }
+            ),
+        }
+        tasks_count = Task.objects.count()
+
+        for message, malformed_row in cases.items():
+            with self.subTest(message=message):
+                with self.assertRaisesMessage(CommandError, message) as context:
+                    self._import(f'{task_row}\n{malformed_row}\n')
+
+                self.assertIn('Строка 2', str(context.exception))
+                self.assertEqual(Task.objects.count(), tasks_count)
+
+    def test_malformed_csv(self):
+        content = 'type,task_id,correct_word,incorrect_word\nincorrectword,,слово,слава\n'
+
+        with self.assertRaisesMessage(CommandError, 'Строка 1: задание None не найдено'):
+            self._import(content, file_format='csv')
+
+
+class AnswerIsCorrectTests(TestCase):
+    """Совпадение проверки ответа в Python (answer_is_correct) и в БД (answer_is_correct_condition, with_results)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='student')
+        task = Task.objects.create(title='Задание', description='Описание')
+        cls.exam = UserExam.objects.create(user=user, task=task)
+        answer_values = (None, True, False)
+
+        ExamIncorrectWordQuestion.objects.bulk_create(
+            ExamIncorrectWordQuestion(
+                exam=cls.exam,
+                position=position,
+                correct_word='слово',
+                incorrect_word='слова',
+                incorrect_letter_index=incorrect_letter_index,
+                selected_letter_index=selected_letter_index,
+                finished_at=None if selected_letter_index is None else timezone.now(),
+            )
+            for position, (incorrect_letter_index, selected_letter_index) in enumerate(
+                itertools.product((1, 5), (None, 1, 5, 6)), start=1
+            )
+        )
+        ExamOptionsQuestion.objects.bulk_create(
+            ExamOptionsQuestion(
+                exam=cls.exam,
+                position=position,
+                question='Вопрос',
+                option1='Вариант 1',
+                option1_is_true=option1_is_true,
+                option2='Вариант 2',
+                option2_is_true=option2_is_true,
+                option3=option3,
+                option3_is_true=option3_is_true,
+                selected_option1_is_true=selected_option1_is_true,
+                selected_option2_is_true=selected_option2_is_true,
+                selected_option3_is_true=selected_option3_is_true,
+                finished_at=None if selected_option1_is_true is None else timezone.now(),
+            )
+            for position, (
+                option1_is_true,
+                option2_is_true,
+                option3,
+                option3_is_true,
+                selected_option1_is_true,
+                selected_option2_is_true,
+                selected_option3_is_true,
+            ) in enumerate(
+                itertools.product((True, False), (True, False), ('', 'Вариант 3'), (True, False), *[answer_values] * 3),
+                start=100,
+            )
+        )
+
+    def test_condition(self):
+        for exam_question_model in (ExamIncorrectWordQuestion, ExamOptionsQuestion):
+            with self.subTest(question_type=exam_question_model.QUESTION_TYPE):
+                exam_questions = list(exam_question_model.objects.filter(exam=self.exam))
+                correct_question_ids = set(
+                    exam_question_model.objects.filter(exam=self.exam)
+                    .filter(exam_question_model.answer_is_correct_condition())
+                    .values_list('id', flat=True)
+                )
+
+                self.assertTrue(correct_question_ids)
+                self.assertLess(len(correct_question_ids), len(exam_questions))
+                for exam_question in exam_questions:
+                    self.assertEqual(
+                        exam_question.id in correct_question_ids,
+                        exam_question.answer_is_correct,
+                        {x.attname: getattr(exam_question, x.attname) for x in exam_question._meta.concrete_fields},
+                    )
+
+    def test_with_results(self):
+        exam_questions = [x.as_exam_question() for x in ExamQuestion.objects.filter(exam=self.exam)]
+        exam = UserExam.objects.with_results().get(id=self.exam.id)
+
+        self.assertEqual(exam.computed_questions_count, len(exam_questions))
+        self.assertEqual(exam.computed_answered_questions_count, sum(x.is_finished for x in exam_questions))
+        self.assertEqual(exam.computed_correct_answers_count, sum(x.answer_is_correct for x in exam_questions))
+
+
+class QueryPlansTests(TestCase):
+    """
+    Планы запросов основных сценариев: без сортировки результата и, при условии отбора, без полного просмотра.
+
+    Планы проверяются в настроенной БД (SQLite или PostgreSQL).
+    """
+
+    # Идентификатор для построения запросов, наличие объекта в БД не требуется.
+    SAMPLE_ID = 1
+
+    def test_hot_paths(self):
+        now = timezone.now()
+        querysets = {
+            'task_list': (Task.objects.order_by('id')[:11], False),
+            'exam_list': (
+                UserExam.objects.filter(user_id=self.SAMPLE_ID)
+                .select_related('task')
+                .order_by('-created_at', '-id')[:11],
+                True,
+            ),
+            'exam_questions': (ExamQuestion.objects.filter(exam_id=self.SAMPLE_ID).order_by('position'), True),
+            'exam_prev_and_next_question': (
+                ExamQuestion.objects.filter(exam_id=self.SAMPLE_ID, position__in=(self.SAMPLE_ID, self.SAMPLE_ID + 2))
+                .values_list('question_type', 'question_id', 'position')
+                .order_by(),
+                True,
+            ),
+            # exams_expired_finish, частичный индекс незавершенных испытаний.
+            'exams_expired': (
+                UserExam.objects.filter(finished_at__isnull=True, expires_at__lte=now)
+                .order_by('expires_at', 'id')
+                .values_list('id', flat=True)[:1000],
+                True,
+            ),
+            # blanks_sample_spaced_repetition.
+            'user_blank_weights_due': (
+                UserBlankWeight.objects.filter(user_id=self.SAMPLE_ID, task_id=self.SAMPLE_ID, due_at__lte=now)
+                .order_by('due_at')
+                .values_list('question_type', 'blank_id', 'weight')[:20],
+                True,
+            ),
+            # blank_weights_get.
+            'blank_statistics_weights': (
+                BlankStatistics.objects.filter(task_id=self.SAMPLE_ID, answers_count__gt=0).values_list(
+                    'question_type', 'blank_id', 'answers_count', 'correct_answers_ratio'
+                ),
+                True,
+            ),
+            # task_blank_statistics_page.
+            'blank_statistics_page': (
+                BlankStatistics.objects.filter(task_id=self.SAMPLE_ID, answers_count__gt=0).order_by(
+                    'correct_answers_ratio', 'id'
+                )[:51],
+                True,
+            ),
+        }
+        for blank_model in (IncorrectWordQuestionBlank, OptionsQuestionBlank):
+            querysets[f'{blank_model._meta.model_name}_ids'] = (
+                blank_model.objects.filter(task_id=self.SAMPLE_ID).values_list('id', flat=True),
+                True,
+            )
+
+        for name, (queryset, is_filtered) in querysets.items():
+            with self.subTest(name):
+                self.assertEqual(query_plan_problems(queryset, is_filtered=is_filtered), [])
+
+
+# Чтение из основной БД: тестовая БД реплики не получает изменений.
+@override_settings(DATABASE_REPLICA_APP_LABELS=())
+@query_budgets_enforced()
+class ExamViewsQueriesTests(TaskBlanksMixin, TransactionTestCase):
+    """
+    Количество запросов к БД на страницах испытания с пустым и заполненным кэшем.
+
+    Превышение бюджета из REQUEST_QUERY_BUDGETS приводит к исключению QueryBudgetExceeded. Тесты выполняются
+    вне транзакции, как обработка запроса, чтобы точки сохранения транзакций сервисов не учитывались как запросы.
+    """
+
+    def setUp(self):
+        self._task_blanks_create()
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def _get(self, url: str, *, status_code: int = 200, cache_clear: bool = False, data: dict | None = None):
+        if cache_clear:
+            cache.clear()
+
+        response = self.client.get(url) if data is None else self.client.post(url, data)
+        self.assertEqual(response.status_code, status_code)
+
+        request = response.wsgi_request
+        queries_budget = request_query_budget(view_name=request.resolver_match.view_name, method=request.method)
+        assert_response_queries(response, max_queries=queries_budget)
+
+        return response_request_metrics(response).queries_count
+
+    def _exam_run(self, *, cache_clear: bool = False) -> tuple[UserExam, int]:
+        queries_count = self._get(reverse('exam_run', args=(self.task.id,)), status_code=302, cache_clear=cache_clear)
+
+        return UserExam.objects.order_by('-id').first(), queries_count
+
+    def test_exam_run(self):
+        _exam, cold_queries_count = self._exam_run(cache_clear=True)
+        _exam, warm_queries_count = self._exam_run()
+
+        # Пул заготовок задания загружается из БД только при пустом кэше.
+        self.assertLess(warm_queries_count, cold_queries_count)
+
+    def test_exam_question(self):
+        exam, _ = self._exam_run()
+        question = exam_snapshot_get(exam_id=exam.id).questions[0]
+        url = reverse('exam_question', args=(question.QUESTION_TYPE, question.id))
+
+        cold_queries_count = self._get(url, cache_clear=True)
+        warm_queries_count = self._get(url)
+
+        # Вопрос берется из снимка испытания в кэше.
+        self.assertLess(warm_queries_count, cold_queries_count)
+
+    def test_exam_answer(self):
+        exam, _ = self._exam_run()
+
+        queries_counts = []
+        for position, question in enumerate(exam_snapshot_get(exam_id=exam.id).questions, start=1):
+            is_last = position == exam.questions_count
+            if question.QUESTION_TYPE == QuestionTypes.OPTIONS:
+                url = reverse('exam_question', args=(question.QUESTION_TYPE, question.id))
+                data = {'selected_option1_is_true': 'on'}
+            else:
+                url = reverse('exam_question_incorrect_word_answer', args=(question.id, 1))
+                data = None
+            queries_counts.append((is_last, self._get(url, status_code=302, data=data)))
+
+        # Количество запросов не зависит от типа вопроса, ответ на последний вопрос завершает испытание.
+        answer_queries_counts = {x for is_last, x in queries_counts if not is_last}
+        self.assertEqual(len(answer_queries_counts), 1)
+        self.assertGreater(queries_counts[-1][1], answer_queries_counts.pop())
+
+    def test_exam_result(self):
+        exam, _ = self._exam_run()
+        exam_set_finished_at(exam=exam)
+        url = reverse('exam_result', args=(exam.id,))
+
+        cold_queries_count = self._get(url, cache_clear=True)
+        warm_queries_count = self._get(url)
+
+        # Отрисованные результаты завершенного испытания берутся из кэша.
+        self.assertLess(warm_queries_count, cold_queries_count)
+
+    def test_exam_list(self):
+        for _x in range(12):
+            self._exam_run()
+        url = reverse('exam_list')
+
+        cold_queries_count = self._get(url, cache_clear=True)
+        warm_queries_count = self._get(url)
+
+        # Количество запросов не зависит от количества испытаний и кэша.
+        self.assertEqual(warm_queries_count, cold_queries_count)
+
+
+# Чтение из основной БД: тестовая БД реплики не получает изменений.
+@override_settings(DATABASE_REPLICA_APP_LABELS=())
+class ExamsBenchmarkTests(TransactionTestCase):
+    """
+    Команда benchmark_exams на небольшом наборе данных.
+
+    Количество запросов к БД на каждом шаге жизненного цикла испытания не зависит от объема данных
+    и не должно превышать базовое (benchmarks/exams_baseline.json), отчет должен иметь формат базового.
+    Длительности не сравниваются, т.к. зависят от окружения.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_lifecycle(self):
+        baseline = json.loads(DEFAULT_BASELINE_PATH.read_text())
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            output_path = Path(output_dir) / 'report.json'
+            call_command(
+                'benchmark_exams',
+                tasks=1,
+                blanks=40,
+                questions=10,
+                users=2,
+                exams=[1, 3],
+                repeat=3,
+                host='testserver',
+                output=str(output_path),
+                stdout=io.StringIO(),
+                stderr=io.StringIO(),
+            )
+            report = json.loads(output_path.read_text())
+
+        self.assertEqual(report.keys(), baseline.keys())
+        self.assertEqual(report['environment'].keys(), baseline['environment'].keys())
+        self.assertEqual(report['parameters'].keys(), baseline['parameters'].keys())
+        self.assertEqual([x['exams_per_user'] for x in report['runs']], [1, 3])
+
+        baseline_queries = {}
+        for baseline_run in baseline['runs']:
+            for name, summary in baseline_run['operations'].items():
+                baseline_queries[name] = max(baseline_queries.get(name, 0), summary['queries_max'])
+
+        for run in report['runs']:
+            self.assertEqual(run.keys(), baseline['runs'][0].keys())
+            self.assertEqual(run['operations'].keys(), baseline_queries.keys())
+
+            for name, summary in run['operations'].items():
+                with self.subTest(exams_per_user=run['exams_per_user'], operation=name):
+                    self.assertEqual(summary.keys(), baseline['runs'][0]['operations'][name].keys())
+                    self.assertEqual(summary['count'], 3)
+                    self.assertLessEqual(summary['p50_ms'], summary['p95_ms'])
+                    self.assertLessEqual(summary['p95_ms'], summary['p99_ms'])
+                    self.assertLessEqual(summary['p99_ms'], summary['max_ms'])
+                    self.assertLessEqual(summary['queries_max'], baseline_queries[name])
@@ -1,11 +1,12 @@
 from django.urls import include, path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('', views.home, name='home'),
     path('tasks/', views.task_list, name='task_list'),
     # path('results/', views.home, name='user_results'),
     path('task/<int:task_id>/', views.task_detail, name='task_detail'),
+    path('task/<int:task_id>/statistics/', views.task_statistics, name='task_statistics'),
     path(
         'exam/',
         include(
@@ -19,6 +20,18 @@ urlpatterns = [
                 ),
                 path('results/', views.exam_list, name='exam_list'),
                 path('results/<int:exam_id>/', views.exam_result, name='exam_result'),
+                path('results/export/', views.exam_results_export, name='exam_results_export'),
+                path('api/run/<int:task_id>/', api.exam_api_run, name='exam_api_run'),
+                path(
+                    'api/question/<str:question_type>/<int:question_id>/',
+                    api.exam_api_question,
+                    name='exam_api_question',
+                ),
+                path(
+                    'api/question/<str:question_type>/<int:question_id>/answer/',
+                    api.exam_api_answer,
+                    name='exam_api_answer',
+                ),
             ]
         ),
     ),
@@ -1,20 +1,47 @@
-from django.http import Http404, HttpRequest, HttpResponse
-from django.shortcuts import render, get_object_or_404, redirect
+import datetime
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, HttpRequest, HttpResponse, HttpResponseBadRequest
+from django.shortcuts import aget_object_or_404, render, get_object_or_404, redirect
+from django.template.loader import render_to_string
+from django.utils import timezone
 from django.contrib.auth import login
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import permission_required
 from django.contrib.auth.forms import AuthenticationForm
-from django.core.paginator import Paginator
-
-from apps.tasks.forms import ExamOptionsQuestionForm
-from apps.tasks.services.selectors.tasks import exam_get_prev_and_next_question, exam_get_questions
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET
+
+from apps.core.decorators import acondition, login_required
+from apps.core.pagination import KeysetPaginator
+from apps.core.streaming import streaming_csv_response
+from apps.tasks.forms import ExamOptionsQuestionForm, ExamResultsExportForm
+from apps.tasks.services.cache import cache_object_key, cache_version_get, cache_versioned_key
+from apps.tasks.services.selectors.blank_statistics import task_blank_statistics_page
+from apps.tasks.services.selectors.exam_results import (
+    EXAM_QUESTION_RESULTS_EXPORT_COLUMNS,
+    EXAM_RESULTS_EXPORT_COLUMNS,
+    exam_question_results_export_queryset,
+    exam_results_export_queryset,
+)
+from apps.tasks.services.selectors.exam_snapshots import ExamSnapshot, aexam_snapshot_get, exam_snapshot_get
+from apps.tasks.services.selectors.tasks import aexam_get_prev_and_next_question
 from apps.tasks.services.tasks import (
+    EXAM_RESULT_PAGE_CACHE_NAMESPACE,
+    TASK_DETAIL_PAGE_CACHE_NAMESPACE,
+    TASK_LIST_CACHE_OBJECT_ID,
+    TASK_LIST_PAGE_CACHE_NAMESPACE,
+    aexam_options_question_answer_set,
+    aexam_options_question_incorrect_word_answer_set,
+    aexam_set_finished_at,
     exam_create_by_task,
-    exam_options_question_incorrect_word_answer_set,
-    exam_set_finished_at,
+    exam_result_body_render,
 )
 from apps.tasks.models import (
     EXAM_QUESTION_MODEL_BY_TYPE,
     ExamIncorrectWordQuestion,
+    ExamOptionsQuestion,
     QuestionTypes,
     Task,
     UserExam,
@@ -22,6 +49,57 @@ from apps.tasks.models import (
 )
 
 
+# Ключ сессии с идентификатором испытания, которое проходит пользователь.
+EXAM_SNAPSHOT_SESSION_KEY = 'tasks_exam_id'
+
+
+def _page_cache_timeout() -> int:
+    """Срок хранения отрисованных страниц в кэше."""
+    return getattr(settings, 'TASKS_PAGE_CACHE_TIMEOUT', 60 * 60)
+
+
+def _user_page_etag(request: HttpRequest, *parts) -> str:
+    """
+    Возвращает ETag страницы для текущего пользователя.
+
+    Общий шаблон страниц содержит имя пользователя и CSRF-токен, поэтому они входят в ETag.
+    """
+    raw_etag = ':'.join(str(x) for x in (*parts, request.user.pk, request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')))
+
+    return hashlib.sha256(raw_etag.encode()).hexdigest()
+
+
+def _task_list_etag(request: HttpRequest) -> str:
+    """ETag страницы со списком задач."""
+    version = cache_version_get(namespace=TASK_LIST_PAGE_CACHE_NAMESPACE, object_id=TASK_LIST_CACHE_OBJECT_ID)
+
+    return _user_page_etag(request, 'task_list', version, request.GET.get('cursor', ''))
+
+
+def _task_detail_etag(request: HttpRequest, task_id: int) -> str:
+    """ETag страницы с информацией о задании."""
+    version = cache_version_get(namespace=TASK_DETAIL_PAGE_CACHE_NAMESPACE, object_id=task_id)
+
+    return _user_page_etag(request, 'task_detail', task_id, version)
+
+
+async def _aexam_finished_at(request: HttpRequest, exam_id: int) -> datetime.datetime | None:
+    """Возвращает дату завершения испытания. Запрос к БД выполняется один раз за обработку запроса."""
+    if not hasattr(request, '_exam_finished_at'):
+        request._exam_finished_at = (
+            await UserExam.objects.filter(id=exam_id).values_list('finished_at', flat=True).afirst()
+        )
+
+    return request._exam_finished_at
+
+
+async def _aexam_result_etag(request: HttpRequest, exam_id: int) -> str | None:
+    """ETag страницы с результатами испытания. Для незавершенного испытания не формируется."""
+    finished_at = await _aexam_finished_at(request, exam_id)
+
+    return _user_page_etag(request, 'exam_result', exam_id, finished_at.isoformat()) if finished_at else None
+
+
 def home(request: HttpRequest) -> HttpResponse:
     """Домашняя страница."""
     if request.user.is_authenticated:
@@ -39,31 +117,66 @@ def home(request: HttpRequest) -> HttpResponse:
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_task_list_etag)
 def task_list(request: HttpRequest) -> HttpResponse:
     """Страница со списком задач."""
-    tasks_list = Task.objects.all().order_by('id')
+    cursor = request.GET.get('cursor') or ''
 
-    paginator = Paginator(tasks_list, 10)
+    def render_body() -> str:
+        paginator = KeysetPaginator(Task.objects.all(), ordering=('id',), per_page=10)
+        page_obj = paginator.get_page(cursor)
 
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+        return render_to_string('tasks/_task_list_body.html', {'page_obj': page_obj}, request=request)
+
+    cache_key = (
+        f'{cache_versioned_key(namespace=TASK_LIST_PAGE_CACHE_NAMESPACE, object_id=TASK_LIST_CACHE_OBJECT_ID)}:'
+        f'{hashlib.sha256(cursor.encode()).hexdigest()}'
+    )
+    task_list_body = cache.get_or_set(cache_key, render_body, timeout=_page_cache_timeout())
 
-    return render(request, 'tasks/task_list.html', {'page_obj': page_obj})
+    return render(request, 'tasks/task_list.html', {'task_list_body': task_list_body})
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_task_detail_etag)
 def task_detail(request: HttpRequest, task_id: int) -> HttpResponse:
     """Страница с информацией о задании."""
+
+    def render_body() -> str:
+        task = get_object_or_404(Task, id=task_id)
+
+        return render_to_string('tasks/_task_detail_body.html', {'task': task}, request=request)
+
+    cache_key = cache_versioned_key(namespace=TASK_DETAIL_PAGE_CACHE_NAMESPACE, object_id=task_id)
+    task_detail_body = cache.get_or_set(cache_key, render_body, timeout=_page_cache_timeout())
+
+    return render(request, 'tasks/task_detail.html', {'task_id': task_id, 'task_detail_body': task_detail_body})
+
+
+@login_required
+@permission_required('tasks.view_blankstatistics', raise_exception=True)
+@require_GET
+def task_statistics(request: HttpRequest, task_id: int) -> HttpResponse:
+    """Страница со статистикой ответов на вопросы задания для преподавателей."""
     task = get_object_or_404(Task, id=task_id)
+    page_obj = task_blank_statistics_page(task_id=task.id, cursor=request.GET.get('cursor'))
 
-    return render(request, 'tasks/task_detail.html', {'task': task})
+    return render(
+        request, 'tasks/task_statistics.html', {'QuestionTypes': QuestionTypes, 'task': task, 'page_obj': page_obj}
+    )
 
 
 @login_required
 def exam_run(request: HttpRequest, task_id: int) -> HttpResponse:
     """Запускает испытание, перенаправляет на страницу выполнения первого задания."""
     task = get_object_or_404(Task, id=task_id)
-    _x, first_exam_question = exam_create_by_task(task=task, user=request.user)
+    exam, first_exam_question = exam_create_by_task(task=task, user=request.user)
+
+    # Страницы вопросов испытания отображаются по снимку, который загружается один раз.
+    exam_snapshot_get(exam_id=exam.id)
+    request.session[EXAM_SNAPSHOT_SESSION_KEY] = exam.id
 
     if first_exam_question:
         return redirect('exam_question', first_exam_question.QUESTION_TYPE, first_exam_question.id)
@@ -71,29 +184,43 @@ def exam_run(request: HttpRequest, task_id: int) -> HttpResponse:
     return redirect('homepage')
 
 
+async def _aexam_snapshot_from_session(request: HttpRequest) -> ExamSnapshot | None:
+    """Возвращает снимок испытания, которое проходит пользователь."""
+    # Сессия уже загружена при проверке авторизации, поэтому чтение не обращается к БД.
+    exam_id = request.session.get(EXAM_SNAPSHOT_SESSION_KEY)
+
+    return await aexam_snapshot_get(exam_id=exam_id) if exam_id else None
+
+
 @login_required
-def exam_question(request: HttpRequest, question_type: str, question_id: int) -> HttpResponse:
-    """Страница с вопросом испытания."""
+async def exam_question(request: HttpRequest, question_type: str, question_id: int) -> HttpResponse:
+    """
+    Страница с вопросом испытания.
+
+    Вопросы текущего испытания пользователя берутся из снимка испытания без обращения к БД.
+    Повторный ответ по устаревшему снимку отклоняется условным обновлением при сохранении ответа.
+    """
     if question_type not in QuestionTypes:
         raise Http404
 
-    exam_question_model = EXAM_QUESTION_MODEL_BY_TYPE[question_type]
-    exam_question = get_object_or_404(exam_question_model, id=question_id)
+    exam_snapshot = await _aexam_snapshot_from_session(request)
+
+    exam_question = None
+    if exam_snapshot:
+        exam_question = exam_snapshot.get_question(question_type=question_type, question_id=question_id)
+
+    if exam_question is None:
+        exam_question_model = EXAM_QUESTION_MODEL_BY_TYPE[question_type]
+        exam_question = await aget_object_or_404(exam_question_model, id=question_id)
 
     exam_question_form = None
     if question_type == QuestionTypes.OPTIONS:
         exam_question_form = ExamOptionsQuestionForm(request.POST or None, instance=exam_question)
 
         if request.POST and exam_question_form.is_valid():
-            exam_question_form.save()
+            await aexam_options_question_answer_set(question=exam_question, **exam_question_form.cleaned_data)
 
-            _x, next_question = exam_get_prev_and_next_question(question=exam_question)
-
-            if next_question:
-                return redirect('exam_question', next_question.QUESTION_TYPE, next_question.id)
-
-            exam_set_finished_at(exam=exam_question.exam)
-            return redirect('exam_result', exam_question.exam_id)
+            return await _exam_next_question_redirect(exam_question, exam_snapshot)
 
     context = {
         'QuestionTypes': QuestionTypes,
@@ -105,53 +232,121 @@ def exam_question(request: HttpRequest, question_type: str, question_id: int) ->
 
 
 @login_required
-def exam_question_incorrect_word_answer(request: HttpRequest, question_id: int, letter_index: int) -> HttpResponse:
+async def exam_question_incorrect_word_answer(
+    request: HttpRequest, question_id: int, letter_index: int
+) -> HttpResponse:
     """Фиксация ответа на вопрос с некорректным словом."""
-    exam_question = get_object_or_404(ExamIncorrectWordQuestion, id=question_id)
-    exam_options_question_incorrect_word_answer_set(question=exam_question, letter_index=letter_index)
+    exam_snapshot = await _aexam_snapshot_from_session(request)
+
+    exam_question = None
+    if exam_snapshot:
+        exam_question = exam_snapshot.get_question(question_type=QuestionTypes.INCORRECT_WORD, question_id=question_id)
+
+    if exam_question is None:
+        exam_question = await aget_object_or_404(ExamIncorrectWordQuestion, id=question_id)
+
+    # Повторный ответ не сохраняется, пользователь переходит к следующему вопросу.
+    await aexam_options_question_incorrect_word_answer_set(question=exam_question, letter_index=letter_index)
+
+    return await _exam_next_question_redirect(exam_question, exam_snapshot)
+
+
+async def _exam_next_question_redirect(
+    exam_question: ExamIncorrectWordQuestion | ExamOptionsQuestion, exam_snapshot: ExamSnapshot | None
+) -> HttpResponse:
+    """
+    Перенаправляет на следующий вопрос испытания после ответа.
 
-    _x, next_question = exam_get_prev_and_next_question(question=exam_question)
+    Следующий вопрос определяется по снимку испытания, если вопрос относится к нему, иначе по БД.
+    После ответа на последний вопрос испытание завершается и выполняется переход к результатам.
+    """
+    if exam_snapshot and exam_snapshot.exam_id == exam_question.exam_id:
+        _x, next_question = exam_snapshot.get_prev_and_next_question(question=exam_question)
+    else:
+        _x, next_question = await aexam_get_prev_and_next_question(question=exam_question)
 
     if next_question:
-        return redirect('exam_question', next_question.QUESTION_TYPE, next_question.id)
+        return redirect('exam_question', next_question.question_type, next_question.id)
+
+    # Испытание могло быть завершено ранее, в том числе по истечении времени.
+    exam = await UserExam.objects.aget(id=exam_question.exam_id)
+    if not exam.is_finished():
+        await aexam_set_finished_at(exam=exam)
 
-    exam_set_finished_at(exam=exam_question.exam)
     return redirect('exam_result', exam_question.exam_id)
 
 
 @login_required
-def exam_result(request, exam_id: int):
-    """Страница с результатами испытания."""
-    exam = get_object_or_404(UserExam, id=exam_id)
+@cache_control(private=True, no_cache=True)
+@acondition(etag_func=_aexam_result_etag, last_modified_func=_aexam_finished_at)
+async def exam_result(request, exam_id: int):
+    """
+    Страница с результатами испытания.
 
-    context = {
-        'QuestionTypes': QuestionTypes,
-        'exam_result': UserExamResults(exam=exam),
-        'exam_questions': exam_get_questions(exam=exam),
-    }
+    Результаты завершенного испытания не меняются, поэтому их отрисовка сохраняется в кэше.
+    """
+
+    async def render_body() -> str:
+        exam = await aget_object_or_404(UserExam.objects.select_related('task'), id=exam_id)
+        exam_questions = (await aexam_snapshot_get(exam_id=exam.id)).questions
+
+        return exam_result_body_render(exam=exam, exam_questions=exam_questions, request=request)
+
+    if await _aexam_finished_at(request, exam_id):
+        cache_key = cache_object_key(namespace=EXAM_RESULT_PAGE_CACHE_NAMESPACE, object_id=exam_id)
+        exam_result_body = await cache.aget(cache_key)
+
+        if exam_result_body is None:
+            exam_result_body = await render_body()
+            await cache.aset(cache_key, exam_result_body, timeout=_page_cache_timeout())
+    else:
+        exam_result_body = await render_body()
 
-    return render(request, 'tasks/exam_result.html', context=context)
+    return render(request, 'tasks/exam_result.html', context={'exam_result_body': exam_result_body})
 
 
 @login_required
-def exam_list(request: HttpRequest) -> HttpResponse:
+async def exam_list(request: HttpRequest) -> HttpResponse:
     """Страница со списком испытаний."""
-    exams = (
-        UserExam.objects.filter(user=request.user)
-        .select_related('task')
-        .prefetch_related('examincorrectwordquestion_set', 'examoptionsquestion_set')
-        .order_by('-created_at')
-    )
-
-    paginator = Paginator(exams, 10)
+    exams = UserExam.objects.filter(user=request.user).select_related('task')
 
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(exams, ordering=('-created_at', '-id'), per_page=10, with_estimated_total=True)
+    page_obj = await paginator.aget_page(request.GET.get('cursor'))
 
     return render(
         request,
         'tasks/exam_list.html',
         {
+            'page_obj': page_obj,
             'exams_results': [UserExamResults(exam=e) for e in page_obj],
         },
     )
+
+
+@login_required
+@permission_required('tasks.view_userexam', raise_exception=True)
+@require_GET
+def exam_results_export(request: HttpRequest) -> HttpResponse:
+    """
+    Выгрузка результатов испытаний в CSV для преподавателей.
+
+    Параметры запроса - см. ExamResultsExportForm: строки по испытаниям или по отвеченным вопросам,
+    отбор по заданию, пользователю и периоду. Выгрузка формируется потоком.
+    """
+    form = ExamResultsExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text(), content_type='text/plain; charset=utf-8')
+
+    if form.per_question:
+        queryset = exam_question_results_export_queryset(**form.get_export_filters())
+        header = EXAM_QUESTION_RESULTS_EXPORT_COLUMNS
+    else:
+        queryset = exam_results_export_queryset(**form.get_export_filters())
+        header = EXAM_RESULTS_EXPORT_COLUMNS
+
+    return streaming_csv_response(
+        request,
+        queryset=queryset,
+        header=header,
+        filename=f'exam_results_{timezone.localdate():%Y%m%d}.csv',
+    )
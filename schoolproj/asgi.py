@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'schoolproj.settings')
+# Асинхронный код обращается к БД из разных потоков, поэтому постоянные соединения не переиспользуются
+# между запросами и накапливаются. Для ASGI по умолчанию используется соединение на запрос.
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
@@ -34,11 +34,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.core.middleware.request_metrics_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.core.middleware.database_routing_middleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -47,7 +49,7 @@ ROOT_URLCONF = 'schoolproj.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'apps.core.instrumentation.InstrumentedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -64,6 +66,65 @@ TEMPLATES = [
 WSGI_APPLICATION = 'schoolproj.wsgi.application'
 
 
+def env_bool(name: str, default: bool = False) -> bool:
+    """Возвращает логическое значение переменной окружения."""
+    value = os.environ.get(name)
+    return default if value is None else value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# База данных настраивается переменными окружения. Без DB_NAME используется SQLite для разработки.
+# DB_CONN_MAX_AGE - время жизни постоянного соединения, секунд, по умолчанию 60 (0 - соединение
+# на каждый запрос, none - без ограничения). Точка входа ASGI по умолчанию устанавливает 0, см. schoolproj/asgi.py.
+# DB_CONN_HEALTH_CHECKS - проверка постоянного соединения перед повторным использованием.
+if os.environ.get('DB_NAME'):
+    db_conn_max_age = os.environ.get('DB_CONN_MAX_AGE', '60')
+
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ['DB_NAME'],
+            'USER': os.environ.get('DB_USER', ''),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', ''),
+            'PORT': os.environ.get('DB_PORT', ''),
+            'CONN_MAX_AGE': None if db_conn_max_age.lower() == 'none' else int(db_conn_max_age),
+            'CONN_HEALTH_CHECKS': env_bool('DB_CONN_HEALTH_CHECKS', default=True),
+            'OPTIONS': {},
+        },
+    }
+
+    if os.environ.get('DB_REPLICA_HOST'):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'HOST': os.environ['DB_REPLICA_HOST'],
+            'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        },
+    }
+
+    if os.environ.get('DB_REPLICA_NAME'):
+        DATABASES['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ['DB_REPLICA_NAME'],
+            'TEST': {'MIRROR': 'default'},
+        }
+
+# Чтение моделей приложений DATABASE_REPLICA_APP_LABELS при обработке HTTP-запросов выполняется из реплики,
+# если она настроена. После записи чтение в той же сессии выполняется из основной БД
+# DATABASE_REPLICA_STICKY_TIMEOUT секунд, значение должно превышать задержку репликации.
+# Тестовая БД реплики - зеркало основной, отдельная тестовая реплика настроена в schoolproj.settings_test.
+DATABASE_ROUTERS = ['apps.core.db_routers.PrimaryReplicaRouter']
+DATABASE_REPLICA_ALIAS = 'replica'
+DATABASE_REPLICA_APP_LABELS = ('tasks',)
+DATABASE_REPLICA_STICKY_TIMEOUT = int(os.environ.get('DB_REPLICA_STICKY_TIMEOUT', 5))
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -104,6 +165,99 @@ STATIC_URL = '/static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Кэш процесса по умолчанию. При запуске нескольких процессов следует использовать общий кэш
+# (Redis, Memcached), иначе сброс кэша при изменении данных затронет только текущий процесс.
+# С кэшем процесса фоновые задачи не заполняют кэш страниц (см. apps.tasks.services.cache.cache_is_shared).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+# Стратегия случайной выборки заготовок вопросов при создании испытания
+# (см. apps.tasks.services.selectors.blanks.BLANK_SAMPLING_STRATEGIES).
+TASKS_BLANK_SAMPLING_STRATEGY = 'cached'
+
+# Стратегия difficulty выбирает чаще заготовки, доля правильных ответов на которые входит в диапазон
+# TASKS_BLANK_DIFFICULTY_BAND. Вес остальных заготовок - TASKS_BLANK_OUTSIDE_BAND_WEIGHT, заготовки
+# с количеством ответов меньше TASKS_BLANK_DIFFICULTY_MIN_ANSWERS считаются входящими в диапазон.
+# Веса заготовок задания хранятся в памяти процесса и пересчитываются раз в TASKS_BLANK_WEIGHTS_TIMEOUT секунд.
+TASKS_BLANK_DIFFICULTY_BAND = (0.5, 0.85)
+TASKS_BLANK_OUTSIDE_BAND_WEIGHT = 0.2
+TASKS_BLANK_DIFFICULTY_MIN_ANSWERS = 5
+TASKS_BLANK_WEIGHTS_TIMEOUT = 5 * 60
+
+# Интервалы повторения заготовки по уровням для стратегии spaced_repetition, дней. Верный ответ
+# повышает уровень, неверный - сбрасывает до нулевого.
+TASKS_SPACED_REPETITION_INTERVALS = (0, 1, 3, 7, 21, 60)
+
+# Срок хранения пула заготовок задания в кэше, секунд.
+TASKS_BLANK_POOL_CACHE_TIMEOUT = 60 * 60
+
+# Срок хранения отрисованных страниц заданий и результатов испытаний в кэше, секунд.
+TASKS_PAGE_CACHE_TIMEOUT = 60 * 60
+
+# Срок хранения снимка вопросов испытания в кэше, секунд.
+TASKS_EXAM_SNAPSHOT_CACHE_TIMEOUT = 60 * 60
+
+# Фоновые задачи выполняются командой run_jobs (см. apps.core.jobs). Задача, выполняемая дольше
+# JOBS_LOCK_TIMEOUT секунд, считается брошенной и передается другому обработчику. После ошибки задача
+# повторяется через JOBS_RETRY_DELAY секунд, задержка удваивается с каждой попыткой до JOBS_RETRY_MAX_DELAY,
+# после JOBS_MAX_ATTEMPTS попыток задача переводится в состояние failed.
+JOBS_LOCK_TIMEOUT = 5 * 60
+JOBS_RETRY_DELAY = 10
+JOBS_RETRY_MAX_DELAY = 60 * 60
+JOBS_MAX_ATTEMPTS = 5
+
+# Показатели обработки запросов (см. apps.core.middleware.request_metrics_middleware)
+# и ошибки фоновых задач. Показатели каждого запроса пишутся с уровнем DEBUG
+# (REQUEST_METRICS_LOG_LEVEL=DEBUG), превышение бюджета запросов к БД - с уровнем WARNING.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'apps.core.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_METRICS_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+        'apps.core.jobs': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Передавать показатели запроса в заголовке Server-Timing.
+REQUEST_METRICS_SERVER_TIMING = env_bool('REQUEST_METRICS_SERVER_TIMING', default=DEBUG)
+
+# Бюджеты количества запросов к БД по именам представлений. При превышении пишется предупреждение,
+# при REQUEST_QUERY_BUDGETS_RAISE выбрасывается исключение (включается в тестах).
+# Значения соответствуют пустому кэшу и не зависят от количества вопросов в испытании. Ключ - имя
+# представления или имя представления и метод запроса через двоеточие. Ответ на последний вопрос
+# дополнительно завершает испытание.
+REQUEST_QUERY_BUDGETS = {
+    'exam_run': 15,
+    'exam_question': 3,
+    'exam_question:POST': 12,
+    'exam_question_incorrect_word_answer': 12,
+    'exam_result': 5,
+    'exam_list': 3,
+}
+REQUEST_QUERY_BUDGETS_RAISE = env_bool('REQUEST_QUERY_BUDGETS_RAISE')
+
+# Каталог файлов метрик процессов (см. apps.core.metrics.exposition). Обязателен при нескольких
+# процессах приложения и должен очищаться перед их запуском.
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+# Максимальный интервал записи метрик процесса в файл, секунд.
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 1.0))
+# Токен доступа к /metrics/. Без токена метрики доступны только в режиме отладки.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
 try:
     from schoolproj.local_settings import *  # noqa: F403
 except ImportError:
@@ -0,0 +1,14 @@
+"""
+Настройки тестов с отдельной БД реплики.
+
+Тестовая БД реплики не получает изменений основной БД, поэтому по результату чтения видно,
+из какой БД оно выполнено (apps.core.tests.PrimaryReplicaRouterTests). Запуск:
+DJANGO_SETTINGS_MODULE=schoolproj.settings_test python manage.py test apps
+"""
+
+from schoolproj.settings import *  # noqa: F403
+
+DATABASES['replica'] = {  # noqa: F405
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': BASE_DIR / 'db_replica.sqlite3',  # noqa: F405
+}
@@ -1,8 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from apps.core import views as core_views
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('accounts/', include('django.contrib.auth.urls')),
+    path('metrics/', core_views.metrics, name='metrics'),
     path('', include('apps.tasks.urls')),
 ]